@@ -0,0 +1,70 @@
+"""
+Benchmark of grammar-constrained decoding of the CodeAgent response format.
+
+Runs the same questions with and without the Thought/Code grammar (see
+matvisor.llm.grammar) for every model size, and reports per run the number of steps,
+the steps whose output couldn't be parsed or executed, whether a final answer was
+reached within `max_steps`, and the wall time.
+
+Usage:
+    python benchmarks/code_agent_grammar.py [modelsize ...]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from smolagents.memory import ActionStep
+
+from matvisor.agent import create_agent
+from matvisor.default_system_prompt import DEFAULT_SYSTEM_PROMPT
+from matvisor.llm import load_llama
+
+
+DATABASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "matvisor", "database", "database_test.csv")
+
+QUESTIONS = [
+    "Which country produces Terrazzoplatta?",
+    "What is the carbon impact of Infinity Porcelain Stoneware?",
+]
+
+MAX_STEPS = 6
+
+
+def run(llama, grammar: bool, question: str) -> dict:
+    with tempfile.TemporaryDirectory() as path:
+        agent = create_agent(
+            path=path,
+            llama_model=llama,
+            system_prompt=DEFAULT_SYSTEM_PROMPT,
+            max_steps=MAX_STEPS,
+            database_filename=DATABASE,
+            grammar=grammar,
+        )
+        start = time.perf_counter()
+        result = agent.run(question, return_full_result=True)
+        duration = time.perf_counter() - start
+    steps = [step for step in agent.memory.steps if isinstance(step, ActionStep)]
+    return {
+        "steps": len(steps),
+        "errors": sum(step.error is not None for step in steps),
+        "answered": result.state == "success",
+        "duration": duration,
+    }
+
+
+if __name__ == "__main__":
+    modelsizes = sys.argv[1:] or ["0.6", "1.7", "4"]
+    print(f"{'model':>6} {'grammar':>8} {'question':>9} {'steps':>6} {'errors':>7} {'answered':>9} {'time (s)':>9}")
+    for modelsize in modelsizes:
+        llama = load_llama(modelsize)
+        for grammar in (False, True):
+            for index, question in enumerate(QUESTIONS):
+                llama.reset()
+                r = run(llama, grammar, question)
+                print(
+                    f"{modelsize + 'B':>6} {'yes' if grammar else 'no':>8} {index + 1:>9} "
+                    f"{r['steps']:>6} {r['errors']:>7} {'yes' if r['answered'] else 'no':>9} {r['duration']:>9.1f}"
+                )
+        del llama
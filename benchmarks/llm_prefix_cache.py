@@ -0,0 +1,105 @@
+"""
+Benchmark of KV prefix reuse across agent steps.
+
+Replays agent-like conversations (system prompt with the tool descriptions, then one
+assistant turn and tool observation per step) and reports the time to first token of
+every step:
+
+* "full re-eval": the model state is reset before every call, so the whole prompt is
+  evaluated (what happens without any prefix reuse).
+* "in-context": llama.cpp reuses the KV state of the previous call for the common prefix.
+* "interleaved": two questions alternate step by step on one model, as in a sweep running
+  questions in turn; only the shared system prompt prefix stays in the context.
+* "interleaved + RAM cache": same, with a LlamaRAMCache restoring each conversation's state.
+
+Usage:
+    python benchmarks/llm_prefix_cache.py [modelsize] [steps]
+"""
+
+import sys
+import time
+
+from matvisor.default_system_prompt import DEFAULT_SYSTEM_PROMPT
+from matvisor.llm import load_llama, create_prompt_cache
+from matvisor.tools import SearchByMaterial
+
+
+TOOL_DESCRIPTION = f"- {SearchByMaterial.name}: {SearchByMaterial.description.strip()}"
+SYSTEM_PROMPT = f"<|disable_thought|>{DEFAULT_SYSTEM_PROMPT}\n\nYou have access to these tools:\n{TOOL_DESCRIPTION}"
+
+QUESTIONS = [
+    "Which country produces Terrazzoplatta?",
+    "What is the service life of Infinity Porcelain Stoneware?",
+]
+
+OBSERVATION = (
+    '[{"Material Name":"Terrazzoplatta 12mm","Plant Address":"Via Prealpi, 21, 37023 '
+    'Stallavena-lugo VR, Italy","Carbon Impact (GWP per m2) - kgCO2e":29.54}]'
+)
+
+
+def conversation_steps(question: str, steps: int) -> list:
+    """
+    Message lists sent at each step of a run.
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"New task:\n{question}"},
+    ]
+    result = [list(messages)]
+    for step in range(1, steps):
+        messages.append({
+            "role": "assistant",
+            "content": f"Thought: step {step}, search the database.\n<code>\nprint(search_by_material(material='Terrazzoplatta'))\n</code>",
+        })
+        messages.append({"role": "user", "content": f"Observation:\n{OBSERVATION}"})
+        result.append(list(messages))
+    return result
+
+
+def time_to_first_token(llama, messages: list) -> float:
+    start = time.perf_counter()
+    stream = llama.create_chat_completion(messages=messages, max_tokens=8, temperature=0.0, stream=True)
+    ttft = None
+    for chunk in stream:
+        if ttft is None and chunk["choices"][0]["delta"].get("content"):
+            ttft = time.perf_counter() - start
+    return ttft if ttft is not None else time.perf_counter() - start
+
+
+def run(llama, runs: list, reset: bool) -> list:
+    """
+    TTFT of every step of the first run, with the runs' steps interleaved.
+    """
+    ttfts = []
+    for step in range(len(runs[0])):
+        for index, steps in enumerate(runs):
+            if reset:
+                llama.reset()
+            ttft = time_to_first_token(llama, steps[step])
+            if index == 0:
+                ttfts.append(ttft)
+    return ttfts
+
+
+if __name__ == "__main__":
+    modelsize = sys.argv[1] if len(sys.argv) > 1 else "8"
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    llama = load_llama(modelsize)
+    first, second = [conversation_steps(question, steps) for question in QUESTIONS]
+
+    modes = {}
+    modes["full re-eval"] = run(llama, [first], reset=True)
+    llama.reset()
+    modes["in-context"] = run(llama, [first], reset=False)
+    llama.reset()
+    modes["interleaved"] = run(llama, [first, second], reset=False)
+    llama.reset()
+    llama.set_cache(create_prompt_cache("ram"))
+    modes["interleaved + RAM cache"] = run(llama, [first, second], reset=False)
+    llama.set_cache(None)
+
+    print(f"Qwen3 {modelsize}B, time to first token per step (s)")
+    print(f"{'mode':>24} " + " ".join(f"{f'step {i + 1}':>7}" for i in range(steps)) + f" {'total':>7}")
+    for mode, ttfts in modes.items():
+        print(f"{mode:>24} " + " ".join(f"{t:>7.2f}" for t in ttfts) + f" {sum(ttfts):>7.2f}")
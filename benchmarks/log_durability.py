@@ -0,0 +1,67 @@
+"""
+Benchmark of Logger durability modes.
+
+Appends the same records with each fsync policy and reports records/s.
+The first row reproduces the former behaviour (open, write and close the file
+for every record, no fsync) as a reference.
+
+Usage:
+    python benchmarks/log_durability.py [records]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+from matvisor.log import Logger
+
+
+PAYLOAD = {
+    "kind": "llm_output",
+    "step": 1,
+    "output": "Thought: I will search the database.\n<code>\nprint(search_by_material(material='Oak'))\n</code>",
+    "duration": 1.25,
+    "time": "2025-01-01 10:00:00",
+}
+
+MODES = [
+    ("none", {"durability": "none"}),
+    ("batch 100 records", {"durability": "batch", "fsync_records": 100, "fsync_interval": 3600}),
+    ("batch 10 ms", {"durability": "batch", "fsync_records": 10 ** 9, "fsync_interval": 0.01}),
+    ("always", {"durability": "always"}),
+    ("always, buffered", {"durability": "always", "buffered": True}),
+]
+
+
+def reopen_per_record(path: str, n_records: int):
+    for i in range(n_records):
+        line = json.dumps({"id": i, **PAYLOAD}, ensure_ascii=False)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def logger_records(path: str, n_records: int, options: dict):
+    logger = Logger(path, **options)
+    for _ in range(n_records):
+        logger.log(PAYLOAD)
+    logger.close()
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{'mode':>28} {'records/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        elapsed = timed(reopen_per_record, os.path.join(tmp, "reference.jsonl"), n_records)
+        print(f"{'reopen per record (before)':>28} {n_records / elapsed:>12,.0f}")
+        for name, options in MODES:
+            path = os.path.join(tmp, f"{name.replace(' ', '_').replace(',', '')}.jsonl")
+            elapsed = timed(logger_records, path, n_records, options)
+            print(f"{name:>28} {n_records / elapsed:>12,.0f}")
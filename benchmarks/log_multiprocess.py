@@ -0,0 +1,70 @@
+"""
+Stress benchmark for Logger multiprocess mode.
+
+N worker processes append to one shared JSONL file at the same time.
+For each N the script reports throughput and checks that the file holds
+exactly one intact line per record with ids 0..total-1 and no duplicates.
+
+Usage:
+    python benchmarks/log_multiprocess.py [records_per_process]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import multiprocessing
+
+from matvisor.log import Logger
+
+
+PROCESS_COUNTS = [1, 4, 16]
+PAYLOAD = {
+    "kind": "tool_output",
+    "tool": "search_by_material",
+    "output": "x" * 512,
+    "duration": 0.001,
+}
+
+
+def worker(path: str, n_records: int, worker_id: int, buffered: bool):
+    logger = Logger(path, multiprocess=True, buffered=buffered)
+    for i in range(n_records):
+        logger.log({**PAYLOAD, "worker": worker_id, "i": i})
+    logger.close()
+
+
+def check(path: str, total: int):
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    ids = sorted(r["id"] for r in records)
+    assert len(records) == total, f"expected {total} records, found {len(records)}"
+    assert ids == list(range(total)), "ids are not unique and contiguous"
+
+
+def run(n_processes: int, n_records: int, buffered: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.jsonl")
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, n_records, i, buffered))
+            for i in range(n_processes)
+        ]
+        start = time.perf_counter()
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        elapsed = time.perf_counter() - start
+        check(path, n_processes * n_records)
+    return n_processes * n_records / elapsed
+
+
+if __name__ == "__main__":
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{'processes':>9} {'mode':>10} {'records/s':>12}")
+    for buffered in (False, True):
+        for n_processes in PROCESS_COUNTS:
+            rate = run(n_processes, n_records, buffered)
+            mode = "buffered" if buffered else "direct"
+            print(f"{n_processes:>9} {mode:>10} {rate:>12,.0f}")
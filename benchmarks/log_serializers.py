@@ -0,0 +1,61 @@
+"""
+Microbenchmark of the log record serializers.
+
+Serializes the real records from examples/identity_0/results with every available
+serializer (see matvisor.log.serialize) and reports records/s and MB/s.
+
+Usage:
+    python benchmarks/log_serializers.py [repeats]
+"""
+
+import os
+import sys
+import json
+import time
+
+from matvisor.log import iter_records
+from matvisor.log.serialize import available_serializers, get_serializer
+
+
+RESULTS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "examples",
+    "identity_0",
+    "results",
+)
+
+
+def load_records() -> list:
+    records = []
+    for filename in sorted(os.listdir(RESULTS_PATH)):
+        if filename.startswith("log_") and filename.endswith(".jsonl"):
+            records.extend(iter_records(os.path.join(RESULTS_PATH, filename)))
+    return records
+
+
+def bench(dumps, records: list, repeats: int) -> tuple:
+    start = time.perf_counter()
+    size = 0
+    for _ in range(repeats):
+        for record in records:
+            size += len(dumps(record))
+    elapsed = time.perf_counter() - start
+    n = len(records) * repeats
+    return n / elapsed, size / elapsed / 1e6
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    records = load_records()
+    print(f"{len(records)} records, {repeats} repeats")
+
+    # Reference: what Logger did before serializers were pluggable
+    def baseline(record):
+        return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+    print(f"{'serializer':>22} {'records/s':>12} {'MB/s':>8}")
+    rate, mb = bench(baseline, records, repeats)
+    print(f"{'json (no default hook)':>22} {rate:>12,.0f} {mb:>8.1f}")
+    for name in available_serializers():
+        rate, mb = bench(get_serializer(name), records, repeats)
+        print(f"{name:>22} {rate:>12,.0f} {mb:>8.1f}")
@@ -1,15 +1,19 @@
 import os
 import llama_cpp
 from smolagents import CodeAgent, FinalAnswerTool
+from smolagents.memory import FinalAnswerStep
 
 from matvisor.default_system_prompt import DEFAULT_SYSTEM_PROMPT
 from matvisor.llm.smolagent_adaptor import SmolagentsAdapter
+from matvisor.llm.kv_state import warm_start
+from matvisor.llm.response_cache import ResponseCache
+from matvisor.llm.context import ContextWindow
 from matvisor.database import load_materials_from_file
-from matvisor.log import Logger
+from matvisor.log import Logger, Tracer
 from matvisor.tools import (
     SearchByMaterial,
 )
-from matvisor.tools import LoggedTool
+from matvisor.tools import LoggedTool, ToolProfiler, CachedTool, ToolCache, OutputBudget, llama_token_counter, BatchTool
 
 
 def create_instructions(system_prompt: str | None = None, fewshot_examples: list | None = None, thinking: bool = False):
@@ -28,6 +32,30 @@ def create_instructions(system_prompt: str | None = None, fewshot_examples: list
             pass ####
     return instructions
 
+class TracedCodeAgent(CodeAgent):
+    """
+    CodeAgent timing its runs and steps as spans of a Tracer (see matvisor.log.tracing).
+    """
+
+    def __init__(self, *args, tracer: Tracer | None = None, **kwargs):
+        self.tracer = tracer
+        super().__init__(*args, **kwargs)
+
+    def run(self, task: str, stream: bool = False, **kwargs):
+        # A streamed run returns at once, its steps are still traced
+        if self.tracer is None or stream:
+            return super().run(task, stream=stream, **kwargs)
+        with self.tracer.span("run", "run", task=task):
+            return super().run(task, stream=stream, **kwargs)
+
+    def _step_stream(self, memory_step):
+        if self.tracer is None:
+            yield from super()._step_stream(memory_step)
+            return
+        with self.tracer.span(f"step {memory_step.step_number}", "step", step=memory_step.step_number):
+            yield from super()._step_stream(memory_step)
+
+
 def create_agent(
         path: str,
         llama_model: llama_cpp.Llama,
@@ -37,9 +65,58 @@ def create_agent(
         database_filename: str = "database.csv",
         log_filename: str = "log.jsonl",
         reset_log: bool = True,
+        trace_tool_memory: bool = False,
+        tool_cache: ToolCache | None = None,
+        tool_timeouts: dict | None = None,
+        tool_output_tokens: int | None = None,
+        tool_output_rows: int | None = 5,
+        batch_tools: bool = False,
+        trace: bool = False,
+        prompt_cache: str | llama_cpp.BaseLlamaCache | None = None,
+        kv_state_dir: str | None = None,
+        stream_llm: bool = False,
+        think_budget: int | None = None,
+        response_cache: ResponseCache | None = None,
+        grammar: bool = False,
+        thinking: bool = False,
+        context_tokens: int | None = None,
+        temperature: float | None = None,
     ):
     """
     Create a smolagent CodeAgent with tools and logging capabilities.
+    Tool timings are aggregated per tool and logged as a `tool_profile` record
+    at the end of every `agent.run` (see matvisor.tools.profiler), followed by
+    the run's LLM token usage as an `llm_usage` record (see matvisor.llm.usage).
+    With a `tool_cache`, results of deterministic tools are memoized in it;
+    pass the same cache to every agent of a sweep to reuse results across runs,
+    or give it a matvisor.cache.DiskCache to reuse them across processes.
+    `tool_timeouts` maps tool names to wall-clock limits in seconds (see LoggedTool).
+    `tool_output_tokens` caps tool results fed back to the model, counted with the model's
+    tokenizer, keeping at most `tool_output_rows` rows (see matvisor.tools.output_budget);
+    the final answer is returned as it is.
+    With `batch_tools`, thread-safe tools also get a `<name>_batch` tool running several
+    calls in parallel (see matvisor.tools.batch_tool).
+    With `trace`, runs, steps, LLM calls and tool calls are logged as spans
+    (see matvisor.log.tracing).
+    `prompt_cache` ("ram", "disk" or a llama_cpp cache) keeps KV states of earlier prompts;
+    pass the same cache object to every agent of a sweep sharing `llama_model`.
+    With `kv_state_dir`, the model starts from the agent's system prompt evaluated once and
+    kept in that directory across runs and processes (see matvisor.llm.kv_state).
+    With `stream_llm`, generations stop as soon as the code block closes, and after
+    `think_budget` tokens of thinking (see matvisor.llm.streaming).
+    `temperature` is the sampling temperature of the model (0.2 by default).
+    With a `response_cache`, greedy LLM completions are replayed when a rerun sends the
+    same messages, and its hit rate is logged at the end of every run
+    (see matvisor.llm.response_cache); the temperature then defaults to 0.
+    With `grammar`, the model can only answer in the Thought/Code format
+    (see matvisor.llm.grammar).
+    Unless `thinking`, the model can't open a <think> block (see SmolagentsAdapter);
+    otherwise thinking can be capped with `stream_llm` and `think_budget`.
+    With `context_tokens`, the messages sent each step are kept within that many tokens
+    by compacting older turns (see matvisor.llm.context); leave room for the answer,
+    e.g. `llama_model.n_ctx() - 1024`.
+    A model loaded with a draft model, e.g. `load_llama("32", draft="0.6")`, uses speculative
+    decoding, and the share of draft tokens accepted is logged (see matvisor.llm.speculative).
     """
     log_filepath = os.path.join(path, log_filename)
     logger = Logger(log_filepath)
@@ -50,8 +127,24 @@ def create_agent(
     database_filepath = os.path.join(path, database_filename)
     df = load_materials_from_file(database_filepath)
 
-    instructions = create_instructions(system_prompt, fewshot_examples)
-    model = SmolagentsAdapter(llama_model, logger=logger)
+    instructions = create_instructions(system_prompt, fewshot_examples, thinking=thinking)
+    tracer = Tracer(logger) if trace else None
+    context_window = None
+    if context_tokens is not None:
+        context_window = ContextWindow(context_tokens, count_tokens=llama_token_counter(llama_model))
+    model = SmolagentsAdapter(
+        llama_model,
+        logger=logger,
+        tracer=tracer,
+        prompt_cache=prompt_cache,
+        stream=stream_llm,
+        think_budget=think_budget,
+        response_cache=response_cache,
+        grammar=grammar,
+        suppress_thinking=not thinking,
+        context_window=context_window,
+        temperature=temperature,
+    )
 
     tools = [
         FinalAnswerTool(),
@@ -59,19 +152,55 @@ def create_agent(
     ]
 
     # Add logging to tools
+    profiler = ToolProfiler()
+    tool_timeouts = tool_timeouts or {}
+    output_budget = None
+    if tool_output_tokens is not None:
+        output_budget = OutputBudget(
+            max_tokens=tool_output_tokens,
+            max_rows=tool_output_rows,
+            count_tokens=llama_token_counter(llama_model),
+        )
     logged_tools = []
     for t in tools:
-        logged_tools.append(LoggedTool(t, logger))
+        timeout = tool_timeouts.get(t.name)
+        if tool_cache is not None and getattr(t, "deterministic", False):
+            t = CachedTool(t, tool_cache, logger)
+        logged_tools.append(LoggedTool(
+            t,
+            logger,
+            profiler=profiler,
+            trace_memory=trace_tool_memory,
+            timeout=timeout,
+            output_budget=output_budget,
+            tracer=tracer,
+        ))
+        if batch_tools and logged_tools[-1].thread_safe:
+            logged_tools.append(BatchTool(logged_tools[-1]))
 
-    return CodeAgent(
+    # Dump the per-tool timings and LLM token usage of each run once it has its final answer
+    def dump_run_profile(step, agent=None):
+        profiler.dump(logger, reset=True)
+        model.usage.dump(logger, reset=True)
+        if response_cache is not None:
+            response_cache.dump(logger, reset=True)
+
+    agent = TracedCodeAgent(
             tools=logged_tools,
             model=model,
             instructions=instructions,
             add_base_tools=False,
             max_steps=max_steps,
             additional_authorized_imports=[],
+            step_callbacks={FinalAnswerStep: dump_run_profile},
+            tracer=tracer,
         )
 
+    if kv_state_dir is not None:
+        warm_start(llama_model, agent.system_prompt, kv_state_dir, logger=logger)
+
+    return agent
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,221 @@
+"""
+Persistent key-value cache shared across processes and runs, stored in one SQLite file.
+
+Used to keep results of deterministic tools (see matvisor.tools.cached_tool) between the
+runs of a sweep. Entries belong to a namespace (e.g. the tool name), and are evicted
+least recently used first once the cache exceeds `max_bytes`, or when older than `max_age`.
+
+Inspect or clear a cache from the command line:
+
+    python -m matvisor.cache stats tool_cache.sqlite
+    python -m matvisor.cache list tool_cache.sqlite --namespace search_by_material
+    python -m matvisor.cache clear tool_cache.sqlite --older-than 604800
+"""
+
+import os
+import time
+import pickle
+import sqlite3
+import argparse
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_namespace ON entries (namespace);
+"""
+
+
+class DiskCache:
+    """
+    SQLite-backed cache of picklable values. Safe to share between threads and processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int | None = 256 * 2**20, max_age: float | None = None):
+        """
+        path: the SQLite file (created if missing).
+        max_bytes: total size of the stored values above which old entries are evicted.
+        max_age: entries created more than `max_age` seconds ago are treated as missing.
+        """
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit, WAL so that readers in other processes don't block writers
+        self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _execute(self, sql: str, parameters=()) -> list:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def get(self, key: str):
+        """
+        Return (found, value) for `key`.
+        """
+        rows = self._execute("SELECT value, created FROM entries WHERE key = ?", (key,))
+        if not rows:
+            return False, None
+        value, created = rows[0]
+        now = time.time()
+        if self.max_age is not None and created < now - self.max_age:
+            self._execute("DELETE FROM entries WHERE key = ?", (key,))
+            return False, None
+        self._execute("UPDATE entries SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        return True, pickle.loads(value)
+
+    def put(self, key: str, value, namespace: str = ""):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO entries (key, namespace, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, namespace, data, len(data), now, now),
+        )
+        if self.max_bytes is not None:
+            self.evict()
+
+    def evict(self, max_bytes: int | None = None, max_age: float | None = None) -> int:
+        """
+        Remove expired entries, then least recently used ones until the values fit in
+        `max_bytes` (defaults to the cache's limits). Returns the number of removed entries.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            removed = 0
+            if max_age is not None:
+                removed += self._connection.execute(
+                    "DELETE FROM entries WHERE created < ?", (time.time() - max_age,)
+                ).rowcount
+            if max_bytes is not None:
+                total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total > max_bytes:
+                    # Keep the most recently used entries that fit
+                    removed += self._connection.execute(
+                        """
+                        DELETE FROM entries WHERE key IN (
+                            SELECT key FROM (
+                                SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS kept
+                                FROM entries
+                            ) WHERE kept > ?
+                        )
+                        """,
+                        (max_bytes,),
+                    ).rowcount
+            return removed
+
+    def clear(self, namespace: str | None = None, older_than: float | None = None) -> int:
+        """
+        Remove the entries of `namespace` (all if None), optionally only those created
+        more than `older_than` seconds ago. Returns the number of removed entries.
+        """
+        conditions, parameters = [], []
+        if namespace is not None:
+            conditions.append("namespace = ?")
+            parameters.append(namespace)
+        if older_than is not None:
+            conditions.append("created < ?")
+            parameters.append(time.time() - older_than)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            return self._connection.execute(f"DELETE FROM entries{where}", parameters).rowcount
+
+    def entries(self, namespace: str | None = None) -> list:
+        """
+        Metadata of the stored entries, most recently used first.
+        """
+        where, parameters = ("WHERE namespace = ?", (namespace,)) if namespace is not None else ("", ())
+        rows = self._execute(
+            f"SELECT key, namespace, size, created, accessed, hits FROM entries {where} ORDER BY accessed DESC",
+            parameters,
+        )
+        columns = ["key", "namespace", "size", "created", "accessed", "hits"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def stats(self) -> dict:
+        """
+        Number of entries, total size and hits, per namespace and overall.
+        """
+        rows = self._execute(
+            "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM entries GROUP BY namespace"
+        )
+        namespaces = {
+            namespace: {"entries": count, "bytes": size, "hits": hits}
+            for namespace, count, size, hits in rows
+        }
+        return {
+            "path": self.path,
+            "entries": sum(s["entries"] for s in namespaces.values()),
+            "bytes": sum(s["bytes"] for s in namespaces.values()),
+            "hits": sum(s["hits"] for s in namespaces.values()),
+            "namespaces": namespaces,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m matvisor.cache", description="Inspect or clear a matvisor disk cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = subparsers.add_parser("stats", help="Entries, size and hits per namespace.")
+    stats_parser.add_argument("path")
+
+    list_parser = subparsers.add_parser("list", help="List entries, most recently used first.")
+    list_parser.add_argument("path")
+    list_parser.add_argument("--namespace")
+    list_parser.add_argument("--limit", type=int, default=50)
+
+    clear_parser = subparsers.add_parser("clear", help="Remove entries.")
+    clear_parser.add_argument("path")
+    clear_parser.add_argument("--namespace")
+    clear_parser.add_argument("--older-than", type=float, help="Only entries older than this many seconds.")
+
+    evict_parser = subparsers.add_parser("evict", help="Evict entries beyond a size or age.")
+    evict_parser.add_argument("path")
+    evict_parser.add_argument("--max-bytes", type=int)
+    evict_parser.add_argument("--max-age", type=float, help="In seconds.")
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.path):
+        parser.error(f"No cache at {args.path}")
+
+    with DiskCache(args.path, max_bytes=None) as cache:
+        if args.command == "stats":
+            stats = cache.stats()
+            print(f"{stats['path']}: {stats['entries']} entries, {stats['bytes']} bytes, {stats['hits']} hits")
+            for namespace, s in sorted(stats["namespaces"].items()):
+                print(f"  {namespace or '-'}: {s['entries']} entries, {s['bytes']} bytes, {s['hits']} hits")
+        elif args.command == "list":
+            for entry in cache.entries(args.namespace)[:args.limit]:
+                accessed = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["accessed"]))
+                print(f"{entry['key']}  {entry['namespace'] or '-'}  {entry['size']} bytes  {entry['hits']} hits  {accessed}")
+        elif args.command == "clear":
+            print(f"Removed {cache.clear(args.namespace, args.older_than)} entries")
+        elif args.command == "evict":
+            print(f"Removed {cache.evict(args.max_bytes, args.max_age)} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
 from .models import qwen3_models_list
-from .llama import load_llama
-from .smolagent_adaptor import SmolagentsAdapter
\ No newline at end of file
+from .llama import load_llama, create_prompt_cache
+from .smolagent_adaptor import SmolagentsAdapter
+from .usage import LLMUsage
+from .response_cache import ResponseCache
+from .context import ContextWindow
@@ -0,0 +1,153 @@
+"""
+Token budget for the messages sent to the model at each step.
+
+smolagents sends the whole history every step, so prompts grow with the number of steps
+until they overflow the context window (`n_ctx`). ContextWindow bounds them:
+
+* messages are counted with the model's tokenizer (see `llama_token_counter`), and counts
+  are cached, since the same messages come back every step;
+* the system prompt, the task (first user message) and the last `keep_last` messages are
+  kept as they are;
+* once the total exceeds `max_tokens`, older messages, oldest first, are cut to
+  `compact_tokens` tokens, with a note of how much was left out, e.g.
+    Observation:
+    [{"Material Name":"Oak",...
+    (Compacted: 412 of 448 tokens left out.)
+  until the total is back under `target_tokens`, then dropped if that isn't enough.
+
+Compacting below `max_tokens` means it only happens once every few steps, and a message
+compacted once stays compacted identically, so the start of the prompt is unchanged
+between compactions and llama.cpp can keep reusing its KV state.
+
+The total stays under `max_tokens` as long as the kept messages fit in it.
+"""
+
+import threading
+from collections import OrderedDict
+
+from matvisor.tools.output_budget import estimate_tokens
+
+
+class ContextWindow:
+
+    def __init__(
+            self,
+            max_tokens: int,
+            target_tokens: int | None = None,
+            keep_last: int = 4,
+            compact_tokens: int = 48,
+            count_tokens=None,
+            message_overhead: int = 4,
+            cache_size: int = 4096,
+        ):
+        """
+        max_tokens: budget of the messages, e.g. n_ctx minus the tokens left for the answer.
+        target_tokens: total to get back under when compacting (defaults to 3/4 of max_tokens).
+        keep_last: number of latest messages never compacted.
+        compact_tokens: tokens kept of a compacted message.
+        count_tokens: a function counting the tokens of a text; estimated without one.
+        message_overhead: tokens added by the chat template around each message.
+        """
+        self.max_tokens = max_tokens
+        self.target_tokens = target_tokens if target_tokens is not None else max_tokens * 3 // 4
+        self.keep_last = keep_last
+        self.compact_tokens = compact_tokens
+        self.count_tokens = count_tokens or estimate_tokens
+        self.message_overhead = message_overhead
+        self.cache_size = cache_size
+        self._counts = OrderedDict()  # text -> tokens
+        self._compacted = OrderedDict()  # text -> compacted text
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value, maxsize: int):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > maxsize:
+            cache.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        """
+        Tokens of a text, cached.
+        """
+        with self._lock:
+            if text in self._counts:
+                self._counts.move_to_end(text)
+                return self._counts[text]
+        tokens = self.count_tokens(text)
+        with self._lock:
+            self._remember(self._counts, text, tokens, self.cache_size)
+        return tokens
+
+    def message_tokens(self, message: dict) -> int:
+        return self.count(message["content"]) + self.message_overhead
+
+    def compact(self, text: str) -> str:
+        """
+        The start of `text` within `compact_tokens` tokens, and a note. Cached.
+        """
+        with self._lock:
+            if text in self._compacted:
+                return self._compacted[text]
+        tokens = self.count(text)
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(text[:middle]) <= self.compact_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        kept = self.count_tokens(text[:low])
+        compacted = f"{text[:low].rstrip()}\n(Compacted: {tokens - kept} of {tokens} tokens left out.)"
+        with self._lock:
+            self._remember(self._compacted, text, compacted, self.cache_size)
+        return compacted
+
+    def _protected(self, messages: list) -> set:
+        protected = set(range(max(0, len(messages) - self.keep_last), len(messages)))
+        if messages and messages[0]["role"] == "system":
+            protected.add(0)
+        for index, message in enumerate(messages):
+            if message["role"] == "user":
+                protected.add(index)  # The task
+                break
+        return protected
+
+    def fit(self, messages: list) -> tuple:
+        """
+        Messages (dicts with "role" and "content") within the budget.
+        Returns (messages, info) with info = {"tokens_before", "tokens", "compacted", "dropped"}.
+        """
+        tokens = [self.message_tokens(m) for m in messages]
+        total = sum(tokens)
+        info = {"tokens_before": total, "tokens": total, "compacted": 0, "dropped": 0}
+        if total <= self.max_tokens:
+            return messages, info
+
+        messages = list(messages)
+        older = [i for i in range(len(messages)) if i not in self._protected(messages)]
+        for index in older:
+            if total <= self.target_tokens:
+                break
+            if tokens[index] - self.message_overhead <= self.compact_tokens:
+                continue
+            message = {**messages[index], "content": self.compact(messages[index]["content"])}
+            compacted_tokens = self.message_tokens(message)
+            if compacted_tokens >= tokens[index]:
+                continue
+            messages[index] = message
+            total -= tokens[index] - compacted_tokens
+            tokens[index] = compacted_tokens
+            info["compacted"] += 1
+
+        dropped = set()
+        for index in older:
+            if total <= self.target_tokens:
+                break
+            dropped.add(index)
+            total -= tokens[index]
+        if dropped:
+            messages = [m for i, m in enumerate(messages) if i not in dropped]
+            info["dropped"] = len(dropped)
+        info["tokens"] = total
+        return messages, info
@@ -0,0 +1,55 @@
+"""
+GBNF grammar of the CodeAgent response format, for grammar-constrained decoding.
+
+Small models often answer in a shape smolagents can't parse (no code block, a code block
+without its opening tag, prose after the code, ...), and every parse error costs a whole
+step. Given to SmolagentsAdapter, the grammar only lets llama.cpp sample responses of the
+form described in matvisor.default_system_prompt:
+
+    Thought: <reasoning>
+    <code>
+    <python lines>
+    </code>
+
+Generation ends as soon as the code block is closed, since the grammar then only allows
+the end of the text.
+
+The thought can't contain the first character of the closing tag ("<"), and code lines
+can't start with it, so that the closing tag is the only way out of the code block.
+With `allow_think`, an optional <think> block (without "<" either) can precede the thought.
+"""
+
+import json
+import llama_cpp
+
+
+def _literal(text: str) -> str:
+    return json.dumps(text, ensure_ascii=False)
+
+
+def _excluded(chars: str) -> str:
+    """
+    Character class matching any character but `chars`.
+    """
+    escaped = "".join("\\" + c if c in "]\\^-[" else c for c in chars).replace("\n", "\\n")
+    return f"[^{escaped}]"
+
+
+def code_agent_grammar(code_block_tags: tuple = ("<code>", "</code>"), allow_think: bool = False) -> str:
+    """
+    GBNF text of the Thought/Code response format.
+    """
+    opening, closing = code_block_tags
+    marker = closing[0]
+    rules = [
+        f"root ::= {'think? ' if allow_think else ''}\"Thought:\" thought {_literal(opening + chr(10))} code-line* {_literal(closing)}",
+        f"thought ::= {_excluded(marker)}+",
+        f"code-line ::= ({_excluded(marker + chr(10))} {_excluded(chr(10))}*)? \"\\n\"",
+    ]
+    if allow_think:
+        rules.append(f"think ::= \"<think>\" {_excluded('<')}* \"</think>\" [ \\n]*")
+    return "\n".join(rules) + "\n"
+
+
+def code_agent_llama_grammar(code_block_tags: tuple = ("<code>", "</code>"), allow_think: bool = False) -> llama_cpp.LlamaGrammar:
+    return llama_cpp.LlamaGrammar.from_string(code_agent_grammar(code_block_tags, allow_think), verbose=False)
@@ -0,0 +1,194 @@
+"""
+Precomputed KV state of a system prompt, kept on disk.
+
+Every agent run starts by evaluating the same system prompt (instructions and tool
+descriptions) before the first token. `warm_start` evaluates it once, saves the model
+state in a cache directory, and later loads it in any process using the same model, so
+fresh runs only evaluate the task. llama.cpp then reuses the loaded prefix like the
+prefix of a previous call.
+
+The state file is named after a hash of the model file, the context size, the llama_cpp
+version, the chat template and the system prompt, and starts with a JSON header:
+    {"version": 1, "key": <hash>, "n_tokens": <prefix tokens>, "state_size": <bytes>, ...}
+followed by the prefix token ids (int32) and the llama.cpp state. Files that don't match
+are recomputed.
+
+llama.cpp saves the logits of the last evaluated batch with the state. The last token of
+the system prompt is evaluated alone, so that is one row of n_vocab floats even for models
+loaded with `logits_all=True` (e.g. with a draft model), where a batch has a row per token.
+`llama.scores` isn't restored, so `logprobs` of the prefix aren't available after loading.
+"""
+
+import os
+import json
+import time
+import ctypes
+import hashlib
+import numpy as np
+import llama_cpp
+
+from matvisor.log import Logger
+
+
+STATE_VERSION = 1
+_HASHED_BYTES = 1 << 20  # Bytes hashed at each end of the model file
+
+_model_fingerprints = {}
+
+
+def model_fingerprint(model_path: str) -> str:
+    """
+    Hash identifying a model file: its name, size, and first and last MiB.
+    """
+    stat = os.stat(model_path)
+    cache_key = (model_path, stat.st_size, stat.st_mtime_ns)
+    if cache_key not in _model_fingerprints:
+        digest = hashlib.sha256()
+        digest.update(f"{os.path.basename(model_path)}:{stat.st_size}".encode("utf-8"))
+        with open(model_path, "rb") as f:
+            digest.update(f.read(_HASHED_BYTES))
+            f.seek(max(0, stat.st_size - _HASHED_BYTES))
+            digest.update(f.read(_HASHED_BYTES))
+        _model_fingerprints[cache_key] = digest.hexdigest()
+    return _model_fingerprints[cache_key]
+
+
+def state_key(llama: llama_cpp.Llama, system_prompt: str) -> str:
+    parts = [
+        model_fingerprint(llama.model_path),
+        llama.n_ctx(),
+        llama_cpp.__version__,
+        llama.chat_format,
+        llama.metadata.get("tokenizer.chat_template", ""),
+        system_prompt,
+    ]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _common_prefix(a: list, b: list) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def evaluate_system_prompt(llama: llama_cpp.Llama, system_prompt: str) -> int:
+    """
+    Leave the model with only the system prompt part of the chat prompt evaluated.
+    Returns its number of tokens.
+
+    The part is found without knowing the chat template: two prompts differing only in the
+    user message are evaluated, and their common tokens kept.
+    """
+    prompts = []
+    for probe in ("A", "B"):
+        llama.create_chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": probe},
+            ],
+            max_tokens=1,
+            temperature=0.0,
+        )
+        prompts.append(llama._input_ids.tolist())
+    n_tokens = _common_prefix(*prompts)
+    # Evaluate the last prefix token again, alone, so the logits kept in the state are
+    # those of the prefix (not of the probe) and only one row
+    llama.n_tokens = max(0, n_tokens - 1)
+    llama._ctx.kv_cache_seq_rm(-1, llama.n_tokens, -1)
+    if n_tokens:
+        llama.eval(prompts[0][n_tokens - 1:n_tokens])
+    return n_tokens
+
+
+def save_state(llama: llama_cpp.Llama, path: str, key: str):
+    size = llama_cpp.llama_state_get_size(llama._ctx.ctx)
+    buffer = (ctypes.c_uint8 * size)()
+    written = llama_cpp.llama_state_get_data(llama._ctx.ctx, buffer, size)
+    header = {
+        "version": STATE_VERSION,
+        "key": key,
+        "n_tokens": llama.n_tokens,
+        "state_size": written,
+        "n_ctx": llama.n_ctx(),
+        "llama_cpp": llama_cpp.__version__,
+        "model": os.path.basename(llama.model_path),
+    }
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(header).encode("utf-8") + b"\n")
+        f.write(np.asarray(llama._input_ids, dtype=np.int32).tobytes())
+        f.write(memoryview(buffer)[:written])
+    os.replace(tmp, path)
+
+
+def load_state(llama: llama_cpp.Llama, path: str, key: str) -> int | None:
+    """
+    Load a state file into the model. Returns its number of tokens,
+    or None if the file is missing or doesn't match `key`.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None
+        if header.get("version") != STATE_VERSION or header.get("key") != key:
+            return None
+        n_tokens, state_size = header["n_tokens"], header["state_size"]
+        ids = f.read(4 * n_tokens)
+        data = f.read(state_size)
+    if len(ids) != 4 * n_tokens or len(data) != state_size:
+        return None  # Truncated file
+    input_ids = np.frombuffer(ids, dtype=np.int32)
+    buffer = (ctypes.c_uint8 * state_size).from_buffer_copy(data)
+    if llama_cpp.llama_state_set_data(llama._ctx.ctx, buffer, state_size) != state_size:
+        return None
+    llama.input_ids[:n_tokens] = input_ids
+    llama.n_tokens = n_tokens
+    return n_tokens
+
+
+def warm_start(llama: llama_cpp.Llama, system_prompt: str, cache_dir: str, logger: Logger | None = None) -> str:
+    """
+    Put the model in the state right after `system_prompt`, loaded from `cache_dir`
+    or computed and saved there. Returns the path of the state file.
+
+    Logs an `llm_kv_state` record:
+        {"kind": "llm_kv_state", "key": <hash>, "hit": <loaded from disk>, "tokens": <n>, "duration": <s>}
+    """
+    start = time.perf_counter()
+    key = state_key(llama, system_prompt)
+    path = os.path.join(cache_dir, f"{key[:32]}.kvstate")
+    n_tokens = load_state(llama, path, key)
+    hit = n_tokens is not None
+    if not hit:
+        os.makedirs(cache_dir, exist_ok=True)
+        n_tokens = evaluate_system_prompt(llama, system_prompt)
+        save_state(llama, path, key)
+    if logger:
+        logger.log({
+            "kind": "llm_kv_state",
+            "key": key,
+            "hit": hit,
+            "tokens": n_tokens,
+            "duration": time.perf_counter() - start,
+        })
+    return path
+
+
+if __name__ == "__main__":
+    import sys
+
+    from matvisor.llm.llama import load_llama
+
+    cache_dir = sys.argv[1] if len(sys.argv) > 1 else ".cache/kv_state"
+    llama = load_llama("0.6")
+    system_prompt = "<|disable_thought|>You are an expert materials science tutor."
+    for attempt in ("cold", "warm"):
+        start = time.perf_counter()
+        path = warm_start(llama, system_prompt, cache_dir)
+        print(f"{attempt}: {time.perf_counter() - start:.3f} s ({path})")
@@ -4,9 +4,25 @@ from huggingface_hub import hf_hub_download
 from contextlib import redirect_stderr
 
 from matvisor.llm.models import qwen3_models as models
+from matvisor.llm.kv_state import warm_start
+from matvisor.llm.speculative import create_draft_model
 
 
-def load_llama(modelsize: str = "7") -> llama_cpp.Llama:
+def load_llama(
+        modelsize: str = "7",
+        system_prompt: str | None = None,
+        kv_state_dir: str | None = None,
+        draft: str | None = None,
+        num_draft_tokens: int = 8,
+    ) -> llama_cpp.Llama:
+    """
+    Download (once) and load a Qwen3 model.
+    With a `system_prompt` and a `kv_state_dir`, the model starts with the system prompt
+    already evaluated, from a state file precomputed there (see matvisor.llm.kv_state).
+    With a `draft` ("lookup", or the size of a smaller Qwen3 such as "0.6"), generation uses
+    speculative decoding with `num_draft_tokens` tokens per draft (see matvisor.llm.speculative).
+    This keeps the logits of every position, i.e. n_ctx x vocabulary floats (about 5 GB).
+    """
 
     # Choices are: "INFO", "WARN", "ERROR", "NONE"
     os.environ["GGML_LOG_LEVEL"] = "NONE"
@@ -26,6 +42,10 @@ def load_llama(modelsize: str = "7") -> llama_cpp.Llama:
         # but we want it visible here.
     )
 
+    draft_model = None
+    if draft is not None:
+        draft_model = create_draft_model(draft, num_draft_tokens)
+
     # 2) Now suppress native backend noise ONLY during model init
     with open(os.devnull, "w") as devnull, redirect_stderr(devnull):
         llm = llama_cpp.Llama(
@@ -33,11 +53,50 @@ def load_llama(modelsize: str = "7") -> llama_cpp.Llama:
             n_ctx=8192,
             n_gpu_layers=-1,
             verbose=False,
+            draft_model=draft_model,
+            logits_all=draft_model is not None,  # Drafts are checked against the logits of each position
         )
 
+    if system_prompt is not None and kv_state_dir is not None:
+        warm_start(llm, system_prompt, kv_state_dir)
+
     return llm
 
 
+def create_prompt_cache(kind: str = "ram", capacity_bytes: int = 2 << 30, cache_dir: str | None = None) -> llama_cpp.BaseLlamaCache:
+    """
+    KV state cache for `llama.set_cache`: after each completion the model state is stored,
+    keyed by its tokens, and restored for a later prompt starting with the same tokens.
+    kind: "ram" (LlamaRAMCache) or "disk" (LlamaDiskCache in `cache_dir`, kept across processes).
+    """
+    if kind == "ram":
+        return llama_cpp.LlamaRAMCache(capacity_bytes=capacity_bytes)
+    if kind == "disk":
+        return llama_cpp.LlamaDiskCache(cache_dir=cache_dir or ".cache/llama_cache", capacity_bytes=capacity_bytes)
+    raise ValueError(f"Unknown prompt cache '{kind}', expected 'ram' or 'disk'.")
+
+
+def perf_context(llm: llama_cpp.Llama) -> dict | None:
+    """
+    llama.cpp performance counters of the model context since the last reset
+    (None if this llama_cpp version or model doesn't expose them).
+    """
+    if not hasattr(llama_cpp, "llama_perf_context") or getattr(llm, "_ctx", None) is None:
+        return None
+    data = llama_cpp.llama_perf_context(llm._ctx.ctx)
+    return {
+        "prompt_eval_ms": data.t_p_eval_ms,
+        "eval_ms": data.t_eval_ms,
+        "prompt_eval_tokens": data.n_p_eval,
+        "eval_tokens": data.n_eval,
+    }
+
+
+def reset_perf_context(llm: llama_cpp.Llama):
+    if hasattr(llama_cpp, "llama_perf_context_reset") and getattr(llm, "_ctx", None) is not None:
+        llama_cpp.llama_perf_context_reset(llm._ctx.ctx)
+
+
 if __name__ == "__main__":
     # <|disable_thought|> should be added to the system prompt to disable internal thoughts
     messages=[
@@ -0,0 +1,103 @@
+"""
+Cache of LLM responses, to replay the completions of an unchanged experiment.
+
+Rerunning a sweep with the same model, settings and message history regenerates the same
+completions. A ResponseCache given to SmolagentsAdapter keeps them in a DiskCache (see
+matvisor.cache), keyed on a hash of the model file, the messages, the sampling parameters
+and stop sequences, and the adapter's streaming settings, so the early steps of a rerun
+are answered without evaluating anything. The DiskCache bounds its size, evicting the
+least recently used responses first.
+
+Only greedy completions (temperature 0) are cached, unless `sampled=True`, in which case
+the first sample is replayed every time.
+
+`dump()` logs the hit rate:
+    {"kind": "llm_response_cache", "hits": <n>, "misses": <n>, "skipped": <sampled calls>, "hit_rate": <hits / lookups>}
+"""
+
+import json
+import hashlib
+import threading
+
+from matvisor.log import Logger
+from matvisor.cache import DiskCache
+
+
+NAMESPACE = "llm_response"
+
+
+class ResponseCache:
+
+    def __init__(self, cache: DiskCache | str, sampled: bool = False, namespace: str = NAMESPACE):
+        """
+        cache: a DiskCache, or the path of its SQLite file.
+        sampled: also cache completions sampled at a temperature above 0.
+        """
+        self.disk = DiskCache(cache) if isinstance(cache, str) else cache
+        self.sampled = sampled
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.skipped = 0
+
+    def cacheable(self, params: dict) -> bool:
+        return self.sampled or params.get("temperature", 0) == 0
+
+    @staticmethod
+    def key(model: str, messages: list, params: dict, settings: dict | None = None) -> str:
+        """
+        Hash of everything the completion depends on. `settings` holds adapter options
+        changing the returned content (e.g. streaming early stops).
+        """
+        parts = [model, messages, params, settings or {}]
+        text = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Return (found, response) for `key`.
+        """
+        found, response = self.disk.get(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found, response
+
+    def put(self, key: str, response: dict):
+        self.disk.put(key, response, namespace=self.namespace)
+
+    def skip(self):
+        """
+        Count a call that wasn't looked up (not cacheable).
+        """
+        with self._lock:
+            self.skipped += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+    def dump(self, logger: Logger | None = None, reset: bool = False) -> dict:
+        """
+        Log the hit rate as an `llm_response_cache` record (if a logger is given and there
+        were calls) and return it.
+        """
+        stats = self.stats()
+        if logger is not None and (stats["hits"] or stats["misses"] or stats["skipped"]):
+            logger.log({"kind": "llm_response_cache", **stats})
+        if reset:
+            self.reset()
+        return stats
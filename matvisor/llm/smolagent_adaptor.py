@@ -14,31 +14,150 @@ When provided a Logger instance, logs LLM interactions in the following format:
         "input": <llm input content>,
         "time": <time in %Y-%m-%d %H:%M:%S format>,
     }
+* With a `context_window` (see matvisor.llm.context), steps whose history had to be
+  compacted to fit have the following entry after llm_input:
+    {
+        "kind": "llm_context",
+        "step": <step>,
+        "tokens_before": <tokens of the full history>,
+        "tokens": <tokens of the messages sent>,
+        "compacted": <number of older messages cut short>,
+        "dropped": <number of older messages left out>,
+    }
 * Log entries for the llm output have the following structure:
     {
         "kind": "llm_output",
         "step": <step>,
         "output": <llm output content>,
         "duration": <duration in seconds>,
+        "prompt_tokens": <tokens of the prompt>,
+        "completion_tokens": <generated tokens>,
+        "cached_prompt_tokens": <prompt tokens reused from the KV cache instead of evaluated>,
+        "prompt_eval_ms": <time spent evaluating the prompt>,
+        "decode_ms": <time spent generating>,
+        "decode_tokens_per_second": <generated tokens per second of decoding>,
+        "completion_ms": <wall time of the completion>,
+        "effective_tokens_per_second": <generated tokens per second of wall time>,
+        "draft_tokens": <tokens proposed by the draft model, or None without one>,
+        "accepted_draft_tokens": <draft tokens accepted by the model>,
+        "acceptance_rate": <accepted / proposed draft tokens>,
+        "think_tokens": <tokens generated inside <think> blocks>,
+        "think_suppressed": <whether the <think> token was banned>,
+        "stop_reason": <why generation stopped, e.g. "stop", "length", "code_block">,
+        "response_cache": "hit" | "miss" | None (not looked up),
         "time": <time in %Y-%m-%d %H:%M:%S format>,
     }
+* With `stream=True`, tokens are consumed as they are decoded and every chunk is logged
+  (at debug level) before the llm_output record:
+    {
+        "kind": "llm_chunk",
+        "step": <step>,
+        "index": <chunk number>,
+        "text": <chunk text>,
+        "elapsed": <seconds since the request>,
+    }
+  Decoding stops as soon as a stop sequence or a closed code block appears outside
+  <think> blocks, or when thinking exceeds `think_budget` chunks (see matvisor.llm.streaming).
+
+llama.cpp keeps the KV state of the last prompt, so a step whose prompt extends the previous
+one only evaluates the new tokens. A `prompt_cache` ("ram", "disk" or a llama_cpp cache)
+also keeps the states of earlier prompts, which helps when several conversations share a
+model (e.g. questions of a sweep run in turn); see matvisor.llm.llama.create_prompt_cache.
+
+Token counts are also set on the returned ChatMessage (so smolagents counts them), and
+summed in `adapter.usage` (see matvisor.llm.usage); timings come from llama.cpp's perf
+counters and are None if unavailable.
+
+With `suppress_thinking`, the <think> token gets a logit bias of -inf, so Qwen3 answers
+without thinking instead of generating a <think> block that is then discarded.
+
+With a model loaded with `load_llama(draft=...)`, or a `draft_model` ("lookup", a Qwen3
+size, or a LlamaDraftModel) for a model without one, generation uses speculative decoding
+and the draft tokens proposed and accepted are logged (see matvisor.llm.speculative). llama.cpp then counts
+batches of draft tokens as prompt evaluation, so perf timings don't split cleanly into
+prompt evaluation and decoding; `effective_tokens_per_second` is based on wall time.
+
+With `grammar=True` (or a GBNF string or LlamaGrammar), decoding is constrained to the
+Thought/Code response format and ends when the code block closes (see matvisor.llm.grammar).
+
+`temperature` is used when the caller doesn't pass one, which smolagents agents don't.
+It defaults to 0.2, or to 0 with a `response_cache` (see matvisor.llm.response_cache):
+greedy completions are stored and replayed when the model, messages and settings are
+unchanged; replayed calls are not added to `adapter.usage` since nothing was evaluated.
+
+When provided a Tracer, every generation is also timed as an "llm" span (see matvisor.log.tracing).
 """
 
 import re
+import time
 from datetime import datetime
 import llama_cpp
+from llama_cpp.llama_speculative import LlamaDraftModel
 from smolagents.models import ChatMessage, MessageRole, Model
+from smolagents.monitoring import TokenUsage
 
-from matvisor.log import Logger
+from matvisor.log import Logger, Tracer
+from matvisor.llm.kv_state import model_fingerprint
+from matvisor.llm.context import ContextWindow
+from matvisor.llm.grammar import code_agent_llama_grammar
+from matvisor.llm.response_cache import ResponseCache
+from matvisor.llm.llama import create_prompt_cache, perf_context, reset_perf_context
+from matvisor.llm.streaming import StreamMonitor, THINK_OPEN
+from matvisor.llm.usage import LLMUsage, tokens_per_second, acceptance_rate
+from matvisor.llm.speculative import CountingDraft, create_draft_model
 
 
 class SmolagentsAdapter(Model):
 
-    def __init__(self, llama_model: llama_cpp.Llama, logger: Logger = None):
+    def __init__(
+            self,
+            llama_model: llama_cpp.Llama,
+            logger: Logger = None,
+            tracer: Tracer = None,
+            prompt_cache: str | llama_cpp.BaseLlamaCache | None = None,
+            stream: bool = False,
+            think_budget: int | None = None,
+            code_block_tags: tuple | None = ("<code>", "</code>"),
+            response_cache: ResponseCache | None = None,
+            grammar: bool | str | llama_cpp.LlamaGrammar | None = None,
+            suppress_thinking: bool = False,
+            context_window: ContextWindow | None = None,
+            draft_model: str | LlamaDraftModel | None = None,
+            temperature: float | None = None,
+        ):
         super().__init__()
         self.llama = llama_model
         self.logger = logger
+        self.tracer = tracer
         self.step = 1
+        self.stream = stream
+        self.think_budget = think_budget
+        self.code_block_tags = code_block_tags
+        self.usage = LLMUsage()
+        self.response_cache = response_cache
+        self._model_key = None
+        if temperature is None:
+            temperature = 0.0 if response_cache is not None and not response_cache.sampled else 0.2
+        elif response_cache is not None and not response_cache.cacheable({"temperature": temperature}):
+            raise ValueError("A response cache only replays greedy completions: use temperature 0, or ResponseCache(sampled=True).")
+        self.temperature = temperature
+        if grammar is True:
+            grammar = code_agent_llama_grammar(code_block_tags)
+        elif isinstance(grammar, str):
+            grammar = llama_cpp.LlamaGrammar.from_string(grammar, verbose=False)
+        self.grammar = grammar or None
+        self.suppress_thinking = suppress_thinking
+        self._think_bias = None
+        self.context_window = context_window
+        if draft_model is not None:
+            self._set_draft_model(draft_model)
+        elif getattr(self.llama, "draft_model", None) is not None and not isinstance(self.llama.draft_model, CountingDraft):
+            # Count the drafts of a model loaded with its own draft model
+            self.llama.draft_model = CountingDraft(self.llama.draft_model)
+        if isinstance(prompt_cache, str):
+            prompt_cache = create_prompt_cache(prompt_cache)
+        if prompt_cache is not None:
+            self.llama.set_cache(prompt_cache)
 
     def _normalize_content(self, content):
         """
@@ -65,7 +184,141 @@ class SmolagentsAdapter(Model):
         # Fallback: just cast to string
         return str(content)
 
+    @staticmethod
+    def _cached_prompt_tokens(usage: dict, perf: dict | None) -> int | None:
+        """
+        Prompt tokens not evaluated by the last call, i.e. taken from the KV cache.
+        """
+        prompt_tokens = usage.get("prompt_tokens")
+        if perf is None or prompt_tokens is None:
+            return None
+        return max(0, prompt_tokens - perf["prompt_eval_tokens"])
+
+    def _set_draft_model(self, draft_model: str | LlamaDraftModel):
+        # The logits of every position are needed to check drafts (see load_llama)
+        scores = getattr(self.llama, "scores", None)
+        if scores is None or scores.shape[0] < self.llama.n_ctx():
+            raise ValueError("Speculative decoding needs a model loaded with logits_all=True, e.g. load_llama(draft=...).")
+        if isinstance(draft_model, str):
+            if getattr(self.llama, "draft_model", None) is not None:
+                raise ValueError("The model already has a draft model; loading another one would replace it.")
+            draft_model = create_draft_model(draft_model)
+        elif not isinstance(draft_model, CountingDraft):
+            draft_model = CountingDraft(draft_model)
+        self.llama.draft_model = draft_model
+
+    def _draft_stats(self) -> dict:
+        """
+        Draft tokens proposed and accepted since the last call (empty without a draft model).
+        """
+        draft_model = getattr(self.llama, "draft_model", None)
+        if not isinstance(draft_model, CountingDraft):
+            return {}
+        return draft_model.take_stats()
+
+    def _think_logit_bias(self) -> dict:
+        """
+        Logit bias banning the token opening a <think> block.
+        """
+        if self._think_bias is None:
+            ids = self.llama.tokenize(THINK_OPEN.encode("utf-8"), add_bos=False, special=True)
+            if len(ids) != 1:
+                raise ValueError(f"Can't suppress thinking: '{THINK_OPEN}' is not a single token of this model.")
+            self._think_bias = {ids[0]: float("-inf")}
+        return self._think_bias
+
+    def _count_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self.llama.tokenize(text.encode("utf-8"), add_bos=False, special=False))
+
+    def _complete(self, llama_messages: list, params: dict):
+        """
+        Wait for the whole completion. Returns (content, usage, stop reason, thinking tokens).
+        """
+        response = self.llama.create_chat_completion(
+            messages=llama_messages,
+            **params,
+        )
+        choice = response["choices"][0]
+        content = choice["message"]["content"] or ""
+        think_tokens = sum(self._count_tokens(t) for t in re.findall(r"<think>(.*?)(?:</think>|$)", content, flags=re.DOTALL))
+        # Clean the output by removing any <think> blocks
+        content = re.sub(r"<think>.*?</think>\s*", "", content, flags=re.DOTALL).strip()
+        return content, response.get("usage", {}), choice.get("finish_reason"), think_tokens
+
+    def _complete_streaming(self, llama_messages: list, params: dict):
+        """
+        Consume the completion chunk by chunk and stop as early as possible.
+        Returns (content, usage, stop reason, thinking tokens).
+        """
+        # Stop sequences are checked outside <think> blocks by the monitor, not by llama.cpp
+        params = dict(params)
+        monitor = StreamMonitor(params.pop("stop", None), self.code_block_tags, self.think_budget)
+        start = time.perf_counter()
+        finish_reason = None
+        stream = self.llama.create_chat_completion(messages=llama_messages, stream=True, **params)
+        try:
+            for index, chunk in enumerate(stream):
+                choice = chunk["choices"][0]
+                delta = choice["delta"].get("content")
+                if delta:
+                    if self.logger:
+                        self.logger.log({
+                            "kind": "llm_chunk",
+                            "step": self.step,
+                            "index": index,
+                            "text": delta,
+                            "elapsed": time.perf_counter() - start,
+                        })
+                    if monitor.feed(delta):
+                        break
+                finish_reason = choice.get("finish_reason") or finish_reason
+        finally:
+            stream.close()  # Stops decoding
+        monitor.finish()
+        return monitor.visible.strip(), self._stream_usage(), monitor.stop_reason or finish_reason, monitor.think_tokens
+
+    def _stream_usage(self) -> dict:
+        """
+        Token counts of a streamed completion (llama_cpp doesn't report them), from the
+        perf counters: every sampled token but the last is evaluated one at a time.
+        """
+        perf = perf_context(self.llama)
+        if perf is None:
+            return {}
+        return {
+            "prompt_tokens": self.llama.n_tokens - perf["eval_tokens"],
+            "completion_tokens": perf["eval_tokens"] + 1,
+        }
+
+    def _response_cache_key(self, llama_messages: list, params: dict) -> str | None:
+        """
+        Key of the completion in the response cache, or None if it isn't cacheable.
+        """
+        if self.response_cache is None:
+            return None
+        if not self.response_cache.cacheable(params):
+            self.response_cache.skip()
+            return None
+        if self._model_key is None:
+            self._model_key = f"{model_fingerprint(self.llama.model_path)}:{self.llama.chat_format}"
+        settings = {}
+        if self.stream:
+            settings = {"stream": True, "think_budget": self.think_budget, "code_block_tags": self.code_block_tags}
+        if self.suppress_thinking:
+            settings["suppress_thinking"] = True
+        if self.grammar is not None:
+            settings["grammar"] = self.grammar._grammar
+        return self.response_cache.key(self._model_key, llama_messages, params, settings)
+
     def generate(self, messages, stop_sequences=None, **kwargs) -> ChatMessage:
+        if self.tracer is None:
+            return self._generate(messages, stop_sequences, **kwargs)
+        with self.tracer.span("generate", "llm", step=self.step, messages=len(messages)):
+            return self._generate(messages, stop_sequences, **kwargs)
+
+    def _generate(self, messages, stop_sequences=None, **kwargs) -> ChatMessage:
         # Normalize incoming messages (dicts or ChatMessage) to llama_cpp chat format
 
         llama_messages = []
@@ -81,9 +334,12 @@ class SmolagentsAdapter(Model):
             content = self._normalize_content(content)
             llama_messages.append({"role": role, "content": content})
 
+        context = None
+        if self.context_window is not None:
+            llama_messages, context = self.context_window.fit(llama_messages)
 
         params = {
-            "temperature": kwargs.get("temperature", 0.2),
+            "temperature": kwargs.get("temperature", self.temperature),
             "top_p": kwargs.get("top_p"),
             "max_tokens": kwargs.get("max_tokens", 512),
         }
@@ -109,20 +365,58 @@ class SmolagentsAdapter(Model):
                 "input": latest_input,
                 "time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
             })
+            # Log how the history was fitted in the context window
+            if context is not None and (context["compacted"] or context["dropped"]):
+                self.logger.log({"kind": "llm_context", "step": self.step, **context})
 
-        # Use chat completion API correctly: no 'prompt', pass messages=
-        response = self.llama.create_chat_completion(
-            messages=llama_messages,
-            **params,
-        )
+        cache_key = self._response_cache_key(llama_messages, params)
+        cache_status, found = None, False
+        if cache_key is not None:
+            found, response = self.response_cache.get(cache_key)
+            cache_status = "hit" if found else "miss"
+
+        if self.grammar is not None:
+            params["grammar"] = self.grammar
+        if self.suppress_thinking:
+            params["logit_bias"] = self._think_logit_bias()
+
+        draft = {}
+        completion_ms = None
+        if found:
+            content, usage, stop_reason = response["content"], response["usage"], response["stop_reason"]
+            think_tokens = 0
+            perf = None
+        else:
+            # Use chat completion API correctly: no 'prompt', pass messages=
+            reset_perf_context(self.llama)
+            self._draft_stats()
+            completion_start = time.perf_counter()
+            if self.stream:
+                content, usage, stop_reason, think_tokens = self._complete_streaming(llama_messages, params)
+            else:
+                content, usage, stop_reason, think_tokens = self._complete(llama_messages, params)
+            completion_ms = (time.perf_counter() - completion_start) * 1000
+            perf = perf_context(self.llama)
+            draft = self._draft_stats()
+            if cache_key is not None:
+                self.response_cache.put(cache_key, {"content": content, "usage": usage, "stop_reason": stop_reason})
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        cached_prompt_tokens = self._cached_prompt_tokens(usage, perf)
+        prompt_eval_ms = perf["prompt_eval_ms"] if perf else None
+        decode_ms = perf["eval_ms"] if perf else None
+        if not found:
+            self.usage.record(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cached_prompt_tokens=cached_prompt_tokens,
+                prompt_eval_ms=prompt_eval_ms,
+                decode_ms=decode_ms,
+                think_tokens=think_tokens,
+                completion_ms=completion_ms,
+                **draft,
+            )
 
-        content = response["choices"][0]["message"]["content"]
-        
-        # Clean the output by removing any empty <think> tags if present
-        #content = content.replace("<think>\n\n</think>\n\n", "").replace("<think>\n</think>\n\n", "")
-        # Clean the outout by removing any <think> blocks
-        content = re.sub(r"<think>.*?</think>\s*", "", content, flags=re.DOTALL).strip()
-        
         # Log the LLM output
         if self.logger:
             end_time = datetime.now()  # End time for logging
@@ -133,12 +427,30 @@ class SmolagentsAdapter(Model):
                 "step": self.step,
                 "output": content,
                 "duration": duration.total_seconds(),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cached_prompt_tokens": cached_prompt_tokens,
+                "prompt_eval_ms": prompt_eval_ms,
+                "decode_ms": decode_ms,
+                "decode_tokens_per_second": tokens_per_second(completion_tokens, decode_ms),
+                "completion_ms": completion_ms,
+                "effective_tokens_per_second": tokens_per_second(completion_tokens, completion_ms),
+                "draft_tokens": draft.get("draft_tokens"),
+                "accepted_draft_tokens": draft.get("accepted_draft_tokens"),
+                "acceptance_rate": acceptance_rate(draft.get("draft_tokens"), draft.get("accepted_draft_tokens")),
+                "think_tokens": think_tokens,
+                "think_suppressed": self.suppress_thinking,
+                "stop_reason": stop_reason,
+                "response_cache": cache_status,
                 "time": end_time.strftime("%Y-%m-%d %H:%M:%S"),
             })
 
         self.step += 1
 
-        return ChatMessage(role=MessageRole.ASSISTANT, content=content)
+        token_usage = None
+        if prompt_tokens is not None and completion_tokens is not None:
+            token_usage = TokenUsage(input_tokens=prompt_tokens, output_tokens=completion_tokens)
+        return ChatMessage(role=MessageRole.ASSISTANT, content=content, token_usage=token_usage)
     
 
 if __name__ == "__main__":
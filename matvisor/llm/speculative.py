@@ -0,0 +1,94 @@
+"""
+Draft models for speculative decoding.
+
+With a draft model, llama.cpp evaluates the tokens it proposes in one batch with the
+target model and keeps those the target would have sampled itself, so several tokens can
+be accepted for the cost of one evaluation of the (large) target model. Two drafts:
+
+* "lookup": LlamaPromptLookupDecoding, which proposes the tokens that followed the last
+  n-gram earlier in the prompt. Free, and good at copying tool outputs and code.
+* a small Qwen3 (e.g. "0.6" or "1.7"), which shares the tokenizer of the larger ones and
+  greedily generates the next `num_pred_tokens` tokens (ModelDraft).
+
+Both are wrapped in a CountingDraft, which counts proposed and accepted tokens, so that
+SmolagentsAdapter can log the acceptance rate of every call.
+"""
+
+import numpy as np
+import numpy.typing as npt
+import llama_cpp
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+
+
+class ModelDraft(LlamaDraftModel):
+    """
+    Draft tokens greedily generated by a smaller model with the same vocabulary.
+    """
+
+    def __init__(self, llama: llama_cpp.Llama, num_pred_tokens: int = 8):
+        self.llama = llama
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids: npt.NDArray[np.intc], /, **kwargs) -> npt.NDArray[np.intc]:
+        tokens = []
+        # The draft model keeps its own KV state, so only new tokens are evaluated
+        generator = self.llama.generate(input_ids.tolist(), top_k=1, temp=0.0, reset=True)
+        try:
+            for token in generator:
+                if token == self.llama.token_eos() or len(input_ids) + len(tokens) >= self.llama.n_ctx():
+                    break
+                tokens.append(token)
+                if len(tokens) >= self.num_pred_tokens:
+                    break
+        finally:
+            generator.close()
+        return np.array(tokens, dtype=np.intc)
+
+
+class CountingDraft(LlamaDraftModel):
+    """
+    Counts the tokens proposed by a draft model and how many the target model accepted.
+
+    llama.cpp calls the draft with the tokens so far; those of the previous proposal that
+    were accepted are the ones between the previous input and the token sampled after them.
+    """
+
+    def __init__(self, draft: LlamaDraftModel):
+        self.draft = draft
+        self.proposed = 0
+        self.accepted = 0
+        self._pending = None  # (input length, proposed tokens) of the last call
+
+    def __call__(self, input_ids: npt.NDArray[np.intc], /, **kwargs) -> npt.NDArray[np.intc]:
+        length = len(input_ids)
+        if self._pending is not None:
+            previous_length, proposed = self._pending
+            if length > previous_length:  # Else a new completion started
+                self.proposed += len(proposed)
+                self.accepted += min(len(proposed), length - previous_length - 1)
+        proposed = self.draft(input_ids, **kwargs)
+        self._pending = (length, proposed) if len(proposed) else None
+        return proposed
+
+    def take_stats(self) -> dict:
+        """
+        Proposed and accepted tokens since the last call. The last proposal of a completion
+        isn't counted, as its outcome isn't known.
+        """
+        stats = {"draft_tokens": self.proposed, "accepted_draft_tokens": self.accepted}
+        self.proposed = 0
+        self.accepted = 0
+        self._pending = None
+        return stats
+
+
+def create_draft_model(draft: str, num_pred_tokens: int = 8, load=None) -> CountingDraft:
+    """
+    draft: "lookup" for prompt lookup decoding, or the size of a Qwen3 draft model.
+    load: a function loading a model by size (defaults to matvisor.llm.load_llama).
+    """
+    if draft == "lookup":
+        return CountingDraft(LlamaPromptLookupDecoding(num_pred_tokens=num_pred_tokens))
+    if load is None:
+        from matvisor.llm.llama import load_llama as load
+    return CountingDraft(ModelDraft(load(draft), num_pred_tokens=num_pred_tokens))
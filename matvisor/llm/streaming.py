@@ -0,0 +1,114 @@
+"""
+Early stopping of streamed generations.
+
+StreamMonitor is fed the text chunks of a streamed completion and tells when to stop:
+
+* "stop_sequence": a stop sequence (e.g. smolagents' "Observation:") appeared,
+* "code_block": a code block was opened and closed (the closing tag is kept),
+* "think_budget": the model spent more than `think_budget` chunks (about one token each)
+  inside a <think> block.
+
+Stop sequences and code blocks are only looked for in the visible text, outside <think>
+blocks, so reasoning that mentions them doesn't cut the answer. `visible` is the answer
+without <think> blocks, cut at the stop point.
+"""
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+def _partial_suffix(text: str, marker: str) -> int:
+    """
+    Length of the longest end of `text` that starts `marker`.
+    """
+    for length in range(min(len(text), len(marker) - 1), 0, -1):
+        if marker.startswith(text[-length:]):
+            return length
+    return 0
+
+
+class StreamMonitor:
+
+    def __init__(
+            self,
+            stop_sequences: list | None = None,
+            code_block_tags: tuple | None = ("<code>", "</code>"),
+            think_budget: int | None = None,
+        ):
+        self.stop_sequences = [s for s in (stop_sequences or []) if s]
+        self.code_block_tags = code_block_tags
+        self.think_budget = think_budget
+        self.raw = ""
+        self.visible = ""
+        self.in_think = False
+        self.think_tokens = 0
+        self.stop_reason = None
+        self._pending = ""  # Raw text that may hold the start of a think marker
+        self._code_start = None  # Position of the opening code tag in `visible`
+
+    def feed(self, delta: str) -> bool:
+        """
+        Add a chunk. Returns True once generation should stop.
+        """
+        if self.stop_reason is not None:
+            return True
+        self.raw += delta
+        self._pending += delta
+        while True:
+            marker = THINK_CLOSE if self.in_think else THINK_OPEN
+            index = self._pending.find(marker)
+            if index < 0:
+                break
+            if not self.in_think:
+                self._emit(self._pending[:index])
+                if self.stop_reason is not None:
+                    return True
+            self._pending = self._pending[index + len(marker):]
+            self.in_think = not self.in_think
+
+        marker = THINK_CLOSE if self.in_think else THINK_OPEN
+        keep = _partial_suffix(self._pending, marker)
+        ready = self._pending[:len(self._pending) - keep]
+        self._pending = self._pending[len(self._pending) - keep:]
+        if self.in_think:
+            self.think_tokens += 1
+            if self.think_budget is not None and self.think_tokens > self.think_budget:
+                self.stop_reason = "think_budget"
+        else:
+            self._emit(ready)
+        return self.stop_reason is not None
+
+    def finish(self):
+        """
+        Flush the held back text at the end of the stream.
+        """
+        if self.stop_reason is None and not self.in_think:
+            self._emit(self._pending)
+        self._pending = ""
+
+    def _emit(self, text: str):
+        if not text:
+            return
+        start = len(self.visible)
+        self.visible += text
+        longest = max([len(s) for s in self.stop_sequences] + [len(t) for t in self.code_block_tags or ()] + [1])
+        search_from = max(0, start - longest + 1)
+
+        cut, reason = None, None
+        for stop in self.stop_sequences:
+            index = self.visible.find(stop, search_from)
+            if index >= 0 and (cut is None or index < cut):
+                cut, reason = index, "stop_sequence"
+        if self.code_block_tags:
+            opening, closing = self.code_block_tags
+            if self._code_start is None:
+                index = self.visible.find(opening, search_from)
+                if index >= 0:
+                    self._code_start = index
+            if self._code_start is not None:
+                index = self.visible.find(closing, max(search_from, self._code_start + len(opening)))
+                if index >= 0 and (cut is None or index + len(closing) <= cut):
+                    cut, reason = index + len(closing), "code_block"
+        if cut is not None:
+            self.visible = self.visible[:cut]
+            self.stop_reason = reason
@@ -0,0 +1,88 @@
+"""
+Cumulative token usage and throughput of LLM calls.
+
+SmolagentsAdapter adds every call to its LLMUsage; `dump()` logs the totals, e.g. at the
+end of each agent run:
+
+    {
+        "kind": "llm_usage",
+        "calls": <number of LLM calls>,
+        "prompt_tokens": <prompt tokens, including those reused from the KV cache>,
+        "cached_prompt_tokens": <prompt tokens reused from the KV cache>,
+        "completion_tokens": <generated tokens>,
+        "prompt_eval_ms": <time spent evaluating prompts>,
+        "decode_ms": <time spent generating>,
+        "think_tokens": <tokens generated inside <think> blocks>,
+        "completion_ms": <wall time of the completions>,
+        "draft_tokens": <tokens proposed by a draft model (speculative decoding)>,
+        "accepted_draft_tokens": <draft tokens accepted>,
+        "prompt_tokens_per_second": <evaluated prompt tokens per second of prompt evaluation>,
+        "decode_tokens_per_second": <generated tokens per second of decoding>,
+        "effective_tokens_per_second": <generated tokens per second of wall time>,
+        "acceptance_rate": <accepted / proposed draft tokens, None without drafts>,
+    }
+"""
+
+import threading
+
+from matvisor.log import Logger
+
+
+COUNTERS = (
+    "calls", "prompt_tokens", "cached_prompt_tokens", "completion_tokens", "prompt_eval_ms", "decode_ms", "think_tokens",
+    "completion_ms", "draft_tokens", "accepted_draft_tokens",
+)
+
+
+def tokens_per_second(tokens, milliseconds) -> float | None:
+    if not tokens or not milliseconds:
+        return None
+    return tokens / (milliseconds / 1000)
+
+
+def acceptance_rate(draft_tokens, accepted_draft_tokens) -> float | None:
+    if not draft_tokens:
+        return None
+    return accepted_draft_tokens / draft_tokens
+
+
+class LLMUsage:
+    """
+    Sums token counts and timings of LLM calls. Missing values (None) count as 0.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.totals = dict.fromkeys(COUNTERS, 0)
+
+    def record(self, **values):
+        with self._lock:
+            self.totals["calls"] += 1
+            for key, value in values.items():
+                if value is not None:
+                    self.totals[key] += value
+
+    def summary(self) -> dict:
+        with self._lock:
+            totals = dict(self.totals)
+        evaluated = totals["prompt_tokens"] - totals["cached_prompt_tokens"]
+        totals["prompt_tokens_per_second"] = tokens_per_second(evaluated, totals["prompt_eval_ms"])
+        totals["decode_tokens_per_second"] = tokens_per_second(totals["completion_tokens"], totals["decode_ms"])
+        totals["effective_tokens_per_second"] = tokens_per_second(totals["completion_tokens"], totals["completion_ms"])
+        totals["acceptance_rate"] = acceptance_rate(totals["draft_tokens"], totals["accepted_draft_tokens"])
+        return totals
+
+    def dump(self, logger: Logger | None = None, reset: bool = False) -> dict:
+        """
+        Log the totals as an `llm_usage` record (if a logger is given and there were calls) and return them.
+        """
+        summary = self.summary()
+        if logger is not None and summary["calls"]:
+            logger.log({"kind": "llm_usage", **summary})
+        if reset:
+            self.reset()
+        return summary
@@ -0,0 +1,5 @@
+from .logger import Logger
+from .segments import list_segments, iter_records
+from .export import export_log, export_logs, query_logs
+from .reader import LogReader
+from .tracing import Tracer, export_chrome_trace
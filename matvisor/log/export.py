@@ -0,0 +1,247 @@
+"""
+Columnar export of agent logs.
+
+Converts JSONL logs written by Logger into one Parquet table per event kind,
+partitioned by model size and run, so analyses can load only the columns they need:
+
+    <out>/kind=llm_output/model=8/run=case_study_1/log_8B.parquet
+
+* `model` is taken from the log file name (`log_8B.jsonl` -> "8").
+* `run` is the directory of the experiment (`run/case_study_1/results/log_8B.jsonl` -> "case_study_1").
+* `session` counts agent runs within one log file; it increases at every `llm_system_prompt` record.
+
+Known fields get fixed types (see SCHEMAS); other fields are kept with inferred types,
+with lists and dicts stored as JSON strings. Requires `pyarrow`.
+"""
+
+import re
+import json
+from datetime import datetime
+from pathlib import Path
+
+from .segments import iter_records
+
+
+# Column types of the known fields of each event kind, as pyarrow type names
+SCHEMAS = {
+    "llm_system_prompt": {
+        "id": "int64",
+        "system_prompt": "string",
+    },
+    "llm_input": {
+        "id": "int64",
+        "step": "int64",
+        "input": "string",
+        "time": "timestamp",
+    },
+    "llm_output": {
+        "id": "int64",
+        "step": "int64",
+        "output": "string",
+        "duration": "float64",
+        "time": "timestamp",
+    },
+    "tool_input": {
+        "id": "int64",
+        "tool": "string",
+        "args": "json",
+        "kwargs": "json",
+        "time": "timestamp",
+    },
+    "tool_output": {
+        "id": "int64",
+        "tool": "string",
+        "output": "json",
+        "duration": "float64",
+        "wall_ns": "int64",
+        "cpu_ns": "int64",
+        "time": "timestamp",
+    },
+}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOG_FILENAME = re.compile(r"^log_(?P<model>[\d.]+)B\.jsonl$")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.dataset
+    except ImportError as e:
+        raise ImportError("Columnar log export requires the 'pyarrow' package.") from e
+    return pyarrow
+
+
+def _arrow_type(pa, name: str):
+    if name == "timestamp":
+        return pa.timestamp("s")
+    if name == "json":
+        return pa.string()
+    return getattr(pa, name)()
+
+
+def _to_json(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _to_time(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value, TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def partition_of(log_path) -> tuple:
+    """
+    Return the (model, run) partition of a log file from its name and location.
+    """
+    log_path = Path(log_path)
+    match = LOG_FILENAME.match(log_path.name)
+    model = match.group("model") if match else log_path.stem
+    directory = log_path.parent
+    if directory.name == "results":
+        directory = directory.parent
+    run = directory.name or "default"
+    return model, run
+
+
+def records_to_tables(records) -> dict:
+    """
+    Group log records by kind and build one pyarrow Table per kind.
+    """
+    pa = _require_pyarrow()
+
+    rows = {}
+    session = -1
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        kind = record.get("kind")
+        if kind is None:
+            continue
+        if kind == "llm_system_prompt":
+            session += 1
+        row = {k: v for k, v in record.items() if k != "kind"}
+        row["session"] = max(session, 0)
+        rows.setdefault(kind, []).append(row)
+
+    tables = {}
+    for kind, kind_rows in rows.items():
+        schema = SCHEMAS.get(kind, {"id": "int64"})
+        names = list(schema) + ["session"]
+        for row in kind_rows:
+            for key in row:
+                if key not in names:
+                    names.append(key)
+
+        arrays = []
+        fields = []
+        for name in names:
+            values = [row.get(name) for row in kind_rows]
+            type_name = schema.get(name, "int64" if name == "session" else None)
+            if type_name == "timestamp":
+                values = [_to_time(v) for v in values]
+            elif type_name == "json" or type_name is None and any(isinstance(v, (list, dict, tuple)) for v in values):
+                values = [_to_json(v) for v in values]
+            if type_name is None:
+                array = pa.array(values)
+            else:
+                array = pa.array(values, type=_arrow_type(pa, type_name))
+            arrays.append(array)
+            fields.append(pa.field(name, array.type))
+        tables[kind] = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+    return tables
+
+
+def export_log(log_path, out_dir, model: str | None = None, run: str | None = None) -> list:
+    """
+    Export one log (including its rotated segments) to Parquet files under `out_dir`.
+    The partition is derived from the log path unless `model`/`run` are given.
+    Returns the written file paths.
+    """
+    pa = _require_pyarrow()
+    log_path = Path(log_path)
+    out_dir = Path(out_dir)
+    default_model, default_run = partition_of(log_path)
+    model = model or default_model
+    run = run or default_run
+
+    written = []
+    for kind, table in records_to_tables(iter_records(log_path)).items():
+        directory = out_dir / f"kind={kind}" / f"model={model}" / f"run={run}"
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"{log_path.stem}.parquet"
+        pa.parquet.write_table(table, target)
+        written.append(target)
+    return written
+
+
+def export_logs(root, out_dir, pattern: str = "log_*B.jsonl") -> list:
+    """
+    Export every log under `root` whose name matches `pattern`.
+    Returns the written file paths.
+    """
+    written = []
+    for log_path in sorted(Path(root).rglob(pattern)):
+        written.extend(export_log(log_path, out_dir))
+    return written
+
+
+def query_logs(
+        out_dir,
+        kind: str,
+        columns: list | None = None,
+        filters: dict | None = None,
+        to_pandas: bool = True,
+    ):
+    """
+    Load exported records of one kind, reading only the requested columns.
+    `columns` may include the partition columns `model` and `run`.
+    `filters` maps column names to a value or a list of accepted values,
+    e.g. {"model": ["8", "14"], "run": "case_study_1"}.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    directory = Path(out_dir) / f"kind={kind}"
+    if not directory.exists():
+        raise FileNotFoundError(f"No exported records of kind '{kind}' in {out_dir}.")
+    dataset = ds.dataset(
+        directory,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("model", pa.string()), ("run", pa.string())]),
+            flavor="hive",
+        ),
+    )
+
+    # Files written by different versions may have different extra columns
+    missing = [c for c in columns or [] if c not in dataset.schema.names]
+    if missing:
+        schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+        schema = pa.unify_schemas(schemas + [dataset.partitioning.schema], promote_options="permissive")
+        dataset = ds.dataset(directory, format="parquet", schema=schema, partitioning=dataset.partitioning)
+
+    expression = None
+    for name, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        condition = ds.field(name).isin(list(values))
+        expression = condition if expression is None else expression & condition
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas() if to_pandas else table
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python -m matvisor.log.export <logs root> <output directory>")
+        sys.exit(1)
+    files = export_logs(sys.argv[1], sys.argv[2])
+    print(f"Wrote {len(files)} Parquet files to {sys.argv[2]}")
@@ -0,0 +1,1012 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import struct
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .segments import (
+    COMPRESSION_SUFFIXES,
+    compress_segment,
+    list_segments,
+    open_segment,
+    segment_path,
+    zstandard,
+)
+from .serialize import get_serializer
+from .volume import (
+    DEDUP_FIELDS,
+    TRUNCATE_FIELDS,
+    deduplicate,
+    kind_level,
+    level_value,
+    truncate,
+)
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+# Queue markers understood by the background writer
+_FLUSH = object()
+_STOP = object()
+
+# Fast resume reads the file tail in blocks, up to a limit before falling back to a full scan
+_TAIL_BLOCK_SIZE = 64 * 1024
+_TAIL_MAX_SIZE = 16 * 1024 * 1024
+
+# Id sidecar of a file shared by processes: inode and size of the log after the last append,
+# and the next id to use
+_COUNTER = struct.Struct("<QQQ")
+
+
+class _BufferedWriter:
+    """
+    Background writer shared by all buffered Logger instances of one file.
+    Records are queued by `Logger.log` and appended in batches by a daemon thread.
+    A batch is committed once `flush_records` records are pending or
+    `flush_interval` seconds passed since its first record, whichever comes first.
+    A batch that can't be written (e.g. the directory was removed or the disk is full)
+    is counted as dropped and the error kept in `last_error`; the thread keeps running.
+    """
+
+    def __init__(
+            self,
+            path: Path,
+            max_queue: int = 10000,
+            flush_records: int = 64,
+            flush_interval: float = 0.5,
+            block_when_full: bool = True,
+        ):
+        self.path = path
+        self.flush_records = max(1, flush_records)
+        self.flush_interval = flush_interval
+        self.block_when_full = block_when_full
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        # Counters (read by Logger.stats)
+        self._counter_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_error = None
+
+        # Number of Logger instances using this writer
+        self.users = 0
+        self.closed = False
+
+        self.thread = threading.Thread(
+            target=self._run,
+            name=f"Logger-writer[{path.name}]",
+            daemon=True,
+        )
+        self.thread.start()
+
+    @property
+    def alive(self) -> bool:
+        """
+        Whether queued records will still be written.
+        """
+        return not self.closed and self.thread.is_alive()
+
+    def put(self, item) -> bool:
+        """
+        Queue a (logger, payload) pair. Returns False if the record was dropped.
+        """
+        try:
+            if self.block_when_full:
+                self.queue.put(item)
+            else:
+                self.queue.put_nowait(item)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def flush(self):
+        """
+        Commit everything queued so far and wait until it is on disk.
+        """
+        if not self.thread.is_alive():
+            return
+        self.queue.put(_FLUSH)
+        self.queue.join()
+
+    def close(self):
+        """
+        Commit pending records and stop the writer thread.
+        """
+        self.closed = True
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            # Also wake up when written records are due for an fsync ("batch" durability)
+            sync_deadline = Logger._durabilities[self.path].sync_deadline()
+            if sync_deadline is not None:
+                wait = max(0.0, sync_deadline - time.monotonic())
+                timeout = wait if timeout is None else min(timeout, wait)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # Time threshold reached
+                if batch and time.monotonic() < deadline:
+                    Logger._sync_due(self.path)
+                    continue
+
+            if item is not None and item is not _FLUSH and item is not _STOP:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+
+            if batch and (item is None or item is _FLUSH or item is _STOP or len(batch) >= self.flush_records):
+                try:
+                    self._commit(batch)
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+                batch = []
+
+            if item is None:
+                Logger._sync_due(self.path)
+            if item is _FLUSH or item is _STOP:
+                self.queue.task_done()
+            if item is _STOP:
+                return
+
+    def _commit(self, batch: list):
+        try:
+            written, failed = Logger._append(self.path, batch, raise_errors=False)
+        except Exception as e:
+            written, failed = 0, len(batch)
+            self.last_error = f"{type(e).__name__}: {e}"
+        with self._counter_lock:
+            self.written += written
+            self.dropped += failed
+            self.batches += 1
+
+
+class _Rotation:
+    """
+    Size- and time-based rotation state of one log file.
+    The active file is renamed to the next numbered segment once the next write would
+    take it past `max_bytes`, or once it has been written to for `max_age` seconds.
+    Closed segments are compressed in the background, or right away once the
+    interpreter is shutting down.
+    """
+
+    def __init__(self, path: Path, max_bytes: int | None, max_age: float | None, compression: str | None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression = compression
+        self.size = path.stat().st_size if path.exists() else 0
+        self.started = time.monotonic()
+        segments = list_segments(path)
+        self.next_segment = segments[-1][0] + 1 if segments else 1
+        self.pending = []  # compression futures
+
+    def due(self, incoming: int) -> bool:
+        if self.size == 0:
+            return False
+        if self.max_bytes is not None and self.size + incoming > self.max_bytes:
+            return True
+        if self.max_age is not None and time.monotonic() - self.started >= self.max_age:
+            return True
+        return False
+
+    def rotate(self):
+        target = segment_path(self.path, self.next_segment)
+        os.replace(self.path, target)
+        self.next_segment += 1
+        self.size = 0
+        self.started = time.monotonic()
+        if self.compression:
+            self.pending = [f for f in self.pending if not f.done()]
+            try:
+                self.pending.append(Logger._compressor().submit(compress_segment, target, self.compression))
+            except RuntimeError:
+                # The pool no longer takes work once the interpreter is shutting down
+                # (e.g. a rotation by the last flush at exit): compress right here
+                compress_segment(target, self.compression)
+
+
+class _Durability:
+    """
+    fsync policy of one log file:
+      - "none": leave writing back to the OS (a crash of the machine can lose the tail)
+      - "batch": fsync once `fsync_records` records were written or `fsync_interval` seconds
+        passed since the last fsync. The interval is checked on append, flush and close,
+        and when idle by the background writer (buffered mode) or a timer started by the
+        first unsynced write, so records are synced at most `fsync_interval` seconds after
+        being written.
+      - "always": fsync after every append (once per batch in buffered mode)
+    """
+
+    MODES = ("none", "batch", "always")
+
+    def __init__(self, mode: str = "none", fsync_records: int = 100, fsync_interval: float = 1.0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown durability '{mode}', expected one of {list(self.MODES)}.")
+        self.mode = mode
+        self.fsync_records = fsync_records
+        self.fsync_interval = fsync_interval
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        self.fsyncs = 0
+        self.timer = None  # Pending fsync of an idle unbuffered file (see Logger._arm_sync)
+
+    def stronger_than(self, other) -> bool:
+        return self.MODES.index(self.mode) > self.MODES.index(other.mode)
+
+    def after_write(self, fd: int, n_records: int):
+        if self.mode == "none":
+            return
+        self.pending += n_records
+        if (
+            self.mode == "always"
+            or self.pending >= self.fsync_records
+            or time.monotonic() - self.last_sync >= self.fsync_interval
+        ):
+            self.sync(fd)
+
+    def sync_deadline(self) -> float | None:
+        """
+        Monotonic time at which written records are due for an fsync ("batch" mode).
+        """
+        if self.mode != "batch" or not self.pending:
+            return None
+        return self.last_sync + self.fsync_interval
+
+    def sync(self, fd: int):
+        if self.pending and self.mode != "none":
+            os.fsync(fd)
+            self.pending = 0
+            self.last_sync = time.monotonic()
+            self.fsyncs += 1
+
+
+class Logger:
+    """
+    JSONL logger with:
+      - per-instance run_id (UUID)  # Not needed anymore
+      - per-file globally incremental id starting from 0
+      - safe for multiple Logger instances & threads in the same process
+      - optional buffered mode, where a background thread appends records in batches
+      - constant-time startup on large files: the next id is recovered from the file tail
+      - optional multiprocess mode, where several processes can share one file
+      - optional size- and time-based rotation into numbered, compressed segments
+      - pluggable JSON serializer (orjson/msgspec on request, see `matvisor.log.serialize`)
+      - volume control: levels, sampling per kind, field truncation and deduplication
+        (see `matvisor.log.volume`)
+      - one append-only file descriptor per file, shared by all instances, and a selectable
+        fsync policy (durability "none", "batch" or "always")
+
+    In buffered mode `log` only queues the record; ids are still assigned in file order
+    when the batch is written. Call `flush()` to force pending records to disk and
+    `close()` when done (pending records are also flushed at interpreter exit).
+    Write errors of the background writer drop the batch (see `stats()`) instead of
+    stopping it; should its thread die anyway, `log` falls back to synchronous writes.
+
+    In multiprocess mode every append takes an exclusive `fcntl.flock` on the file and
+    writes the whole batch with a single O_APPEND write. If another process appended in
+    the meantime, the next id is read from a small sidecar file (`<path>.next`) that every
+    append updates; the file tail is only read when the sidecar doesn't match the log
+    (e.g. after a crash between the two writes). Requires a POSIX system.
+
+    With rotation enabled, the file at `path` always holds the newest records and
+    closed segments sit next to it (see `matvisor.log.segments`); ids continue
+    across segments and `iter_records(path)` reads them all as one stream.
+
+    The shared file descriptor is reopened if the file is removed or replaced from outside
+    (ids then restart from what the new file holds), and in forked child processes. It is
+    closed when the last Logger of the file is closed, or at interpreter exit.
+    """
+
+    # Shared across all Logger instances (per process)
+    _global_lock = threading.Lock()
+    _file_locks = {}      # path -> threading.Lock()
+    _next_ids = {}        # path -> int (next id to use)
+    _writers = {}         # path -> _BufferedWriter (buffered mode only)
+    _shared_paths = set() # paths shared with other processes (multiprocess mode)
+    _synced_sizes = {}    # path -> file size after our last write (multiprocess mode)
+    _rotations = {}       # path -> _Rotation (rotation only)
+    _compression_pool = None
+    _seen_hashes = {}     # path -> hashes of deduplicated values already written
+    _seen_files = {}      # path -> (st_ino, st_dev) of the file holding those values
+    _handles = {}         # path -> O_APPEND file descriptor
+    _counters = {}        # path -> descriptor of the id sidecar (multiprocess mode)
+    _handle_users = {}    # path -> number of open Logger instances
+    _durabilities = {}    # path -> _Durability
+
+    def __init__(
+            self,
+            path: str = "log.jsonl",
+            buffered: bool = False,
+            max_queue: int = 10000,
+            flush_records: int = 64,
+            flush_interval: float = 0.5,
+            block_when_full: bool = True,
+            fast_resume: bool = True,
+            multiprocess: bool = False,
+            max_bytes: int | None = None,
+            max_age: float | None = None,
+            compression: str | None = "gzip",
+            serializer: str = "json",
+            level: str = "debug",
+            sample_rates: dict | None = None,
+            sample_seed: int | None = None,
+            max_field_length: int | None = None,
+            truncate_fields: tuple = TRUNCATE_FIELDS,
+            dedup: bool = False,
+            dedup_fields: tuple = DEDUP_FIELDS,
+            durability: str = "none",
+            fsync_records: int = 100,
+            fsync_interval: float = 1.0,
+        ):
+        """
+        path: JSONL file to append to.
+        buffered: queue records and write them from a background thread.
+        max_queue: maximum number of queued records (buffered mode).
+        flush_records: write a batch once this many records are pending (buffered mode).
+        flush_interval: write a batch at the latest this many seconds after its first record (buffered mode).
+        block_when_full: if the queue is full, wait for space instead of dropping the record (buffered mode).
+        fast_resume: find the last id of an existing file from its tail instead of scanning it all.
+        multiprocess: lock the file with fcntl on every append, so other processes can write to it too.
+        max_bytes: rotate the file before it grows past this size.
+        max_age: rotate the file after writing to it for this many seconds (checked on append).
+        compression: "gzip", "zstd" or None, for closed segments (rotation only).
+        serializer: "json" (standard library), or "orjson", "msgspec" or "auto" for faster,
+            compact output that writes NaN and Infinity as null.
+        level: minimum level of the records to write ("debug" writes everything).
+        sample_rates: share of records to keep per kind, e.g. {"llm_input": 0.1}.
+        sample_seed: seed for sampling, for reproducible logs.
+        max_field_length: cut longer `truncate_fields` values to this many characters.
+        truncate_fields: fields that `max_field_length` applies to.
+        dedup: write each distinct `dedup_fields` value once per file, then only its hash.
+        dedup_fields: fields that `dedup` applies to.
+        durability: "none", "batch" (fsync every `fsync_records` records or `fsync_interval` seconds) or "always".
+        fsync_records: records between fsyncs ("batch" durability).
+        fsync_interval: maximum seconds between a write and its fsync ("batch" durability).
+        """
+        durability = _Durability(durability, fsync_records, fsync_interval)
+        if multiprocess and fcntl is None:
+            raise RuntimeError("Logger multiprocess mode requires fcntl (POSIX systems only).")
+        rotate = max_bytes is not None or max_age is not None
+        if rotate and multiprocess:
+            raise ValueError("Logger rotation is not supported in multiprocess mode.")
+        if compression is not None and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {list(COMPRESSION_SUFFIXES)}.")
+        if rotate and compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package.")
+
+        self.path = Path(path)
+        self.fast_resume = fast_resume
+        self.run_id = str(uuid.uuid4())
+        self.buffered = buffered
+        self.multiprocess = multiprocess
+        self._dumps = get_serializer(serializer)
+        self.level = level_value(level)
+        self.sample_rates = dict(sample_rates or {})
+        self._random = random.Random(sample_seed)
+        self.max_field_length = max_field_length
+        self.truncate_fields = tuple(truncate_fields)
+        self.dedup_fields = tuple(dedup_fields) if dedup else ()
+        self.skipped = 0
+        self._writer = None
+        self._closed = False
+
+        # Ensure directory exists
+        if self.path.parent:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Ensure per-file lock and id counter are initialized once
+        with Logger._global_lock:
+            # Create a lock for this file path if not present
+            if self.path not in Logger._file_locks:
+                Logger._file_locks[self.path] = threading.Lock()
+
+            # Once one Logger shares the file with other processes, all appends to it take the file lock
+            if multiprocess:
+                Logger._shared_paths.add(self.path)
+
+            # Initialize the next id for this file if not present
+            if self.path not in Logger._next_ids:
+                # Lock the file while we inspect existing contents
+                # to avoid races with other threads in this process.
+                file_lock = Logger._file_locks[self.path]
+                with file_lock:
+                    if self.path in Logger._shared_paths:
+                        # ... and with other processes
+                        with Logger._process_lock(self.path):
+                            Logger._next_ids[self.path] = self._compute_initial_next_id()
+                            self._terminate_partial_line()
+                    else:
+                        Logger._next_ids[self.path] = self._compute_initial_next_id()
+                        self._terminate_partial_line()
+
+            # Rotation settings are per file; the first Logger to ask for rotation sets them
+            if rotate and self.path not in Logger._rotations:
+                Logger._rotations[self.path] = _Rotation(self.path, max_bytes, max_age, compression)
+
+            if self.path not in Logger._seen_hashes:
+                Logger._seen_hashes[self.path] = set()
+
+            # The strictest durability asked for a file applies to all its appends
+            current = Logger._durabilities.get(self.path)
+            if current is None or durability.stronger_than(current):
+                Logger._durabilities[self.path] = durability
+
+            Logger._handle_users[self.path] = Logger._handle_users.get(self.path, 0) + 1
+
+            # Share one background writer per file
+            if buffered:
+                writer = Logger._writers.get(self.path)
+                if writer is None:
+                    writer = _BufferedWriter(
+                        self.path,
+                        max_queue=max_queue,
+                        flush_records=flush_records,
+                        flush_interval=flush_interval,
+                        block_when_full=block_when_full,
+                    )
+                    Logger._writers[self.path] = writer
+                writer.users += 1
+                self._writer = writer
+
+    def _compute_initial_next_id(self) -> int:
+        """
+        Find the last used `id` of the existing log file (if any).
+        Returns the next id to use. Starts from 0 if no valid id is found.
+        The file tail is tried first; a full scan is the fallback for corrupted tails.
+        If the file has no ids (e.g. it was just rotated), the newest segment decides.
+        """
+        if not self.path.exists():
+            return self._segments_next_id()
+
+        if self.fast_resume:
+            last_id = self._tail_last_id()
+            if last_id is not None and last_id >= 0:
+                return last_id + 1
+
+        next_id = self._scan_next_id()
+        return next_id if next_id > 0 else self._segments_next_id()
+
+    def _segments_next_id(self) -> int:
+        """
+        Return the id after the largest one in the newest segment that has ids (0 if none).
+        """
+        for _, segment in reversed(list_segments(self.path)):
+            last_id = -1
+            with open_segment(segment) as f:
+                for line in f:
+                    try:
+                        _id = json.loads(line).get("id")
+                    except (json.JSONDecodeError, AttributeError):
+                        continue
+                    if isinstance(_id, int) and _id > last_id:
+                        last_id = _id
+            if last_id >= 0:
+                return last_id + 1
+        return 0
+
+    def _tail_last_id(self) -> int | None:
+        """
+        Read the file backwards from the end and return the largest id among the
+        complete lines of the tail (-1 for an empty file).
+        Returns None if the last line is not valid JSON with an int `id`,
+        or if no complete line fits in the tail size limit.
+        """
+        with self.path.open("rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while True:
+                if len(data) >= _TAIL_MAX_SIZE:
+                    return None
+                step = min(_TAIL_BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+                lines = data.split(b"\n")
+                # The first piece may be the end of a line that starts before `pos`
+                if pos > 0:
+                    lines = lines[1:]
+                if pos == 0 or any(line.strip() for line in lines):
+                    break
+
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return -1 if pos == 0 else None
+
+        # The last line must be intact, otherwise the tail is corrupted
+        try:
+            last = json.loads(lines[-1])
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if not isinstance(last, dict) or not isinstance(last.get("id"), int):
+            return None
+
+        # Take the maximum over the tail, in case concurrent writers appended slightly out of order
+        last_id = last["id"]
+        for line in lines[:-1]:
+            try:
+                obj = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            _id = obj.get("id") if isinstance(obj, dict) else None
+            if isinstance(_id, int) and _id > last_id:
+                last_id = _id
+        return last_id
+
+    def _terminate_partial_line(self):
+        """
+        If the file ends in the middle of a line (e.g. after a crash), end that line
+        so new records start on a line of their own.
+        """
+        if not self.path.exists():
+            return
+        with self.path.open("rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _scan_next_id(self) -> int:
+        """
+        Scan the whole existing log file and find the last used `id`.
+        Returns the next id to use. Starts from 0 if no valid id is found.
+        """
+        last_id = -1
+
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                # Backward compatible: only care if id exists and is int-like
+                _id = obj.get("id")
+                if isinstance(_id, int) and _id > last_id:
+                    last_id = _id
+
+        # If no id found, start at 0; else continue from last_id + 1
+        return last_id + 1 if last_id >= 0 else 0
+
+    def _format(self, entry_id: int, payload: dict) -> bytes:
+        """
+        Serialize one record to a JSON line.
+        """
+        record = dict(
+            id=entry_id,
+            #run_id=self.run_id,
+            **payload,
+        )
+        return self._dumps(record) + b"\n"
+
+    def _prepare(self, payload: dict, seen: set, new: set) -> dict:
+        """
+        Apply deduplication and truncation to a payload about to be written.
+        Hashes of values written in full go to `new`.
+        """
+        if self.dedup_fields:
+            payload = deduplicate(payload, seen, self.dedup_fields, new)
+        if self.max_field_length is not None:
+            payload = truncate(payload, self.max_field_length, self.truncate_fields)
+        return payload
+
+    @staticmethod
+    def _format_items(next_id: int, items: list, raise_errors: bool, seen: set) -> tuple:
+        """
+        Serialize (logger, payload) pairs with consecutive ids starting at `next_id`,
+        deduplicating against `seen`.
+        Returns (lines, next_id, failed, new hashes); records that cannot be serialized are
+        skipped without using an id, unless `raise_errors` is set.
+        """
+        lines = []
+        failed = 0
+        new = set()
+        for logger, payload in items:
+            record_new = set()
+            try:
+                lines.append(logger._format(next_id, logger._prepare(payload, seen | new, record_new)))
+            except (TypeError, ValueError):
+                if raise_errors:
+                    raise
+                failed += 1
+                continue
+            new |= record_new
+            next_id += 1
+        return lines, next_id, failed, new
+
+    @staticmethod
+    @contextmanager
+    def _process_lock(path: Path):
+        """
+        Open `path` for appending and hold an exclusive fcntl lock on it.
+        Yields the O_APPEND file descriptor; closing it releases the lock.
+        """
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _handle(path: Path, owner, keep_seen: bool = False) -> int:
+        """
+        Return the shared O_APPEND descriptor of `path`, opening it on first use.
+        If the file was removed or replaced since it was opened, the descriptor is reopened
+        and the next id is recovered from the new file. Call with the file lock held.
+        Deduplicated values are written in full again to a new or empty file, unless
+        `keep_seen` (a rotation, whose segments are read as one stream).
+        """
+        fd = Logger._handles.get(path)
+        if fd is not None:
+            try:
+                current = os.stat(path)
+                opened = os.fstat(fd)
+                if (current.st_ino, current.st_dev) == (opened.st_ino, opened.st_dev):
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+            del Logger._handles[path]
+            Logger._next_ids[path] = owner._compute_initial_next_id()
+            Logger._synced_sizes.pop(path, None)
+            rotation = Logger._rotations.get(path)
+            if rotation is not None:
+                rotation.size = path.stat().st_size if path.exists() else 0
+
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        Logger._handles[path] = fd
+        opened = os.fstat(fd)
+        identity = (opened.st_ino, opened.st_dev)
+        if not keep_seen and (Logger._seen_files.get(path) != identity or opened.st_size == 0):
+            Logger._seen_hashes[path] = set()
+        Logger._seen_files[path] = identity
+        return fd
+
+    @staticmethod
+    def _counter(path: Path) -> int:
+        """
+        Descriptor of the id sidecar of `path`, opened on first use.
+        """
+        counter = Logger._counters.get(path)
+        if counter is None:
+            counter = os.open(path.with_name(path.name + ".next"), os.O_RDWR | os.O_CREAT, 0o644)
+            Logger._counters[path] = counter
+        return counter
+
+    @staticmethod
+    def _read_counter(path: Path, current: os.stat_result) -> int | None:
+        """
+        Next id kept in the sidecar of `path`, or None if the sidecar doesn't describe the
+        log as it is now (`current`). Call with the file lock and flock held.
+        """
+        data = os.pread(Logger._counter(path), _COUNTER.size, 0)
+        if len(data) != _COUNTER.size:
+            return None
+        inode, size, next_id = _COUNTER.unpack(data)
+        if (inode, size) != (current.st_ino, current.st_size):
+            return None
+        return next_id
+
+    @staticmethod
+    def _write_counter(path: Path, inode: int, size: int, next_id: int):
+        """
+        Record the next id and the log's size after our append in the sidecar.
+        """
+        os.pwrite(Logger._counter(path), _COUNTER.pack(inode, size, next_id), 0)
+        Logger._synced_sizes[path] = size
+
+    @staticmethod
+    def _sync_due(path: Path):
+        """
+        fsync the file if its durability interval has expired since the last write.
+        """
+        with Logger._file_locks[path]:
+            durability = Logger._durabilities[path]
+            deadline = durability.sync_deadline()
+            fd = Logger._handles.get(path)
+            if deadline is None or time.monotonic() < deadline:
+                return
+            if fd is None:
+                durability.pending = 0  # The file was closed or lost, nothing left to sync
+            else:
+                durability.sync(fd)
+
+    @staticmethod
+    def _arm_sync(path: Path):
+        """
+        Start a timer that fsyncs written records once the durability interval expires,
+        unless one is pending or a background writer does it. Call with the file lock held.
+        """
+        durability = Logger._durabilities[path]
+        deadline = durability.sync_deadline()
+        if deadline is None or durability.timer is not None or path in Logger._writers:
+            return
+        timer = threading.Timer(max(0.0, deadline - time.monotonic()), Logger._timed_sync, args=(path,))
+        timer.daemon = True
+        durability.timer = timer
+        timer.start()
+
+    @staticmethod
+    def _timed_sync(path: Path):
+        Logger._sync_due(path)
+        with Logger._file_locks[path]:
+            Logger._durabilities[path].timer = None
+            # Records written since the last fsync but not due yet
+            Logger._arm_sync(path)
+
+    @staticmethod
+    def _close_handle(path: Path):
+        """
+        fsync pending records (per the durability policy) and close the shared descriptor.
+        Call with the file lock held.
+        """
+        counter = Logger._counters.pop(path, None)
+        if counter is not None:
+            os.close(counter)
+        fd = Logger._handles.pop(path, None)
+        if fd is None:
+            return
+        durability = Logger._durabilities.get(path)
+        if durability is not None:
+            durability.sync(fd)
+        os.close(fd)
+
+    @staticmethod
+    def _append(path: Path, items: list, raise_errors: bool = True) -> tuple:
+        """
+        Assign ids to (logger, payload) pairs and append them to `path` with a single write.
+        Ids are taken under the file lock, so they increase in file order.
+        Returns (written, failed).
+        """
+        file_lock = Logger._file_locks[path]
+        shared = path in Logger._shared_paths
+
+        # Only one writer per file at a time (within this process)
+        with file_lock:
+            fd = Logger._handle(path, items[0][0])
+            if shared:
+                # Multiprocess mode: also exclude other processes
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.fstat(fd) if shared else None
+                if shared and current.st_size != Logger._synced_sizes.get(path):
+                    # Another process appended since our last write: take the next id it
+                    # left in the sidecar, or resume from the file tail
+                    next_id = Logger._read_counter(path, current)
+                    if next_id is None:
+                        next_id = items[0][0]._compute_initial_next_id()
+                    Logger._next_ids[path] = next_id
+
+                seen = Logger._seen_hashes[path]
+                lines, next_id, failed, new = Logger._format_items(Logger._next_ids[path], items, raise_errors, seen)
+                if lines:
+                    data = b"".join(lines)
+                    rotation = Logger._rotations.get(path)
+                    if rotation is not None and rotation.due(len(data)):
+                        Logger._close_handle(path)
+                        rotation.rotate()
+                        fd = Logger._handle(path, items[0][0], keep_seen=True)
+
+                    written = 0
+                    while written < len(data):
+                        written += os.write(fd, data[written:])
+                    # Values count as written once their record is on file
+                    seen |= new
+                    if rotation is not None:
+                        rotation.size += len(data)
+                    Logger._durabilities[path].after_write(fd, len(lines))
+                    Logger._arm_sync(path)
+
+                Logger._next_ids[path] = next_id
+                if shared and lines:
+                    # No one else appends while we hold the flock
+                    Logger._write_counter(path, current.st_ino, current.st_size + len(data), next_id)
+            finally:
+                if shared:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        return len(lines), failed
+
+    def enabled(self, kind: str, level: str | None = None) -> bool:
+        """
+        Whether records of this kind (or explicit level) pass the Logger's level.
+        Callers can use it to skip building expensive payloads.
+        """
+        value = kind_level(kind) if level is None else level_value(level)
+        return value >= self.level
+
+    def _reduce(self, payload: dict, level: str | None) -> dict | None:
+        """
+        Apply level and sampling to a payload (deduplication and truncation are applied
+        when it is written, see `_prepare`). Returns None if the record should not be written.
+        """
+        kind = payload.get("kind")
+        if not self.enabled(kind, level):
+            return None
+        rate = self.sample_rates.get(kind)
+        if rate is not None and self._random.random() >= rate:
+            return None
+        return payload
+
+    def log(self, payload: dict, level: str | None = None):
+        """
+        Append a JSON line with:
+          - global incremental `id` per file
+          - per-instance `run_id`  # Not needed anymore
+          - user payload fields
+        Thread-safe across instances in this process.
+        In buffered mode the record is queued and written later by the background writer.
+        `level` overrides the level derived from the payload's `kind`.
+        """
+        reduced = self._reduce(payload, level)
+        if reduced is None:
+            self.skipped += 1
+            return
+        if self._writer is not None and not self._closed and self._writer.alive:
+            # Copy so later changes by the caller don't leak into the queued record
+            self._writer.put((self, dict(reduced)))
+            return
+        Logger._append(self.path, [(self, reduced)])
+
+    def flush(self):
+        """
+        Block until all records queued so far are written (buffered mode), fsync them
+        (unless durability is "none") and wait until closed segments are compressed (rotation).
+        """
+        if self._writer is not None and not self._closed and self._writer.alive:
+            self._writer.flush()
+        with Logger._file_locks[self.path]:
+            fd = Logger._handles.get(self.path)
+            if fd is not None:
+                Logger._durabilities[self.path].sync(fd)
+        rotation = Logger._rotations.get(self.path)
+        if rotation is not None:
+            for future in list(rotation.pending):
+                future.result()
+
+    @staticmethod
+    def _compressor() -> ThreadPoolExecutor:
+        """
+        Background pool that compresses closed segments (created on first rotation).
+        Its thread is joined at interpreter exit, so started compressions complete.
+        """
+        with Logger._global_lock:
+            if Logger._compression_pool is None:
+                Logger._compression_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Logger-compress")
+            return Logger._compression_pool
+
+    def close(self):
+        """
+        Flush pending records. The background writer and the shared file descriptor
+        are closed once the last Logger of the file is closed.
+        Further `log` calls write synchronously (reopening the file if needed).
+        """
+        if self._closed:
+            return
+        writer = self._writer
+        if writer is not None:
+            with Logger._global_lock:
+                writer.users -= 1
+                stop = writer.users <= 0 and Logger._writers.get(self.path) is writer
+                if stop:
+                    del Logger._writers[self.path]
+            if stop:
+                writer.close()
+        self.flush()
+        self._closed = True
+        with Logger._file_locks[self.path]:
+            Logger._handle_users[self.path] -= 1
+            if Logger._handle_users[self.path] <= 0:
+                Logger._close_handle(self.path)
+
+    def stats(self) -> dict:
+        """
+        Return writer counters: queue depth, written, dropped and committed batches,
+        the records this Logger skipped because of its level or sampling,
+        and the number of fsyncs of the file.
+        """
+        fsyncs = Logger._durabilities[self.path].fsyncs
+        writer = self._writer
+        if writer is None:
+            return {"buffered": False, "queue_depth": 0, "written": 0, "dropped": 0, "batches": 0, "skipped": self.skipped, "fsyncs": fsyncs}
+        with writer._counter_lock:
+            return {
+                "buffered": True,
+                "queue_depth": writer.queue.qsize(),
+                "queue_capacity": writer.queue.maxsize,
+                "written": writer.written,
+                "dropped": writer.dropped,
+                "batches": writer.batches,
+                "last_error": writer.last_error,
+                "skipped": self.skipped,
+                "fsyncs": fsyncs,
+            }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _close_all():
+        """
+        Flush and stop every background writer, then fsync and close every shared
+        file descriptor (registered with atexit).
+        """
+        with Logger._global_lock:
+            writers = list(Logger._writers.values())
+            Logger._writers.clear()
+        for writer in writers:
+            writer.close()
+        for path in list(Logger._handles):
+            with Logger._file_locks[path]:
+                Logger._close_handle(path)
+
+
+    @staticmethod
+    def _after_fork():
+        """
+        Reset the shared state in a forked child: locks may have been held by threads that
+        don't exist in the child, writer threads are gone, and inherited descriptors share
+        their flock with the parent, so they are reopened on the next append.
+        """
+        Logger._global_lock = threading.Lock()
+        Logger._file_locks = {path: threading.Lock() for path in Logger._file_locks}
+        for fd in list(Logger._handles.values()) + list(Logger._counters.values()):
+            os.close(fd)
+        Logger._handles.clear()
+        Logger._counters.clear()
+        Logger._writers.clear()
+        Logger._synced_sizes.clear()
+        Logger._compression_pool = None
+        for durability in Logger._durabilities.values():
+            durability.timer = None
+
+
+atexit.register(Logger._close_all)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=Logger._after_fork)
+
+
+if __name__ == "__main__":
+    log_path = Path("agent_trace_example.jsonl")
+    logger1 = Logger(path=log_path)
+    logger2 = Logger(path=log_path)
+
+    logger1.log({"event": "demo", "details": "from logger1"})
+    logger2.log({"event": "demo", "details": "from logger2"})
+    logger1.log({"event": "demo", "details": "again from logger1"})
+
+    # Buffered logger sharing the same file and id sequence
+    with Logger(path=log_path, buffered=True) as logger3:
+        logger3.log({"event": "demo", "details": "from buffered logger3"})
+        print(logger3.stats())
+
+    print(log_path.read_text(encoding="utf-8").strip())
+    log_path.unlink(missing_ok=True)
@@ -0,0 +1,328 @@
+"""
+Indexed reader for logs written by Logger.
+
+LogReader keeps an offset index of the log next to it (`log_8B.jsonl.idx`), so records
+can be fetched by `id` and filtered by `kind`, `step` and `tool` without parsing the whole
+log. The index covers rotated segments too and is updated incrementally: `refresh()` only
+reads what was appended since the last call, which makes `follow()` cheap on a live run.
+
+* The index file is a JSONL file. Its first line is a header:
+    {"version": 2, "log": <log file name>, "active": [<inode>, <device>]}
+  where "active" identifies the active file the entries were read from.
+* Every other line describes one record:
+    [<segment>, <offset>, <length>, <id>, <kind>, <step>, <tool>]
+  where <segment> is the segment number, or 0 for the active file, and
+  <offset>/<length> locate the line in the (decompressed) file.
+"""
+
+import io
+import os
+import json
+import time
+from pathlib import Path
+from collections import namedtuple
+
+from .segments import list_segments, open_segment
+
+
+INDEX_VERSION = 2
+ACTIVE = 0  # Segment number of the active file
+
+IndexEntry = namedtuple("IndexEntry", ["segment", "offset", "length", "id", "kind", "step", "tool"])
+
+
+class LogReader:
+    """
+    Lazily read and filter the records of a (possibly rotated) JSONL log.
+    """
+
+    def __init__(self, path: str, index_path: str | None = None, refresh: bool = True):
+        """
+        path: the log file (the active file if the log is rotated).
+        index_path: where to keep the index (defaults to `<path>.idx`).
+        refresh: bring the index up to date right away.
+        """
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else self.path.with_name(self.path.name + ".idx")
+        self.entries = []
+        self._by_id = {}
+        self._handles = {}
+        self._index_valid = False  # Whether the index file can be appended to
+        self._active_identity = None  # (inode, device) of the indexed active file
+        self._load_index()
+        if refresh:
+            self.refresh()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return self.records()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+    # Index maintenance
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            return
+        with self.index_path.open("r", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError:
+                return
+            if header.get("version") != INDEX_VERSION or header.get("log") != self.path.name:
+                return
+            self._active_identity = tuple(header["active"]) if header.get("active") else None
+            for line in f:
+                try:
+                    entry = IndexEntry(*json.loads(line))
+                except (json.JSONDecodeError, TypeError):
+                    return  # Partially written tail, the rest is re-indexed on refresh
+                self._add(entry)
+        self._index_valid = True
+
+    def _add(self, entry: IndexEntry):
+        self.entries.append(entry)
+        if entry.id is not None:
+            self._by_id[entry.id] = entry
+
+    def _rewrite_index(self):
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": INDEX_VERSION, "log": self.path.name, "active": self._active_identity}) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(list(entry), ensure_ascii=False) + "\n")
+        os.replace(tmp, self.index_path)
+        self._index_valid = True
+
+    def _indexed_active_size(self) -> int:
+        """
+        Number of bytes of the active file covered by the index.
+        """
+        for entry in reversed(self.entries):
+            if entry.segment == ACTIVE:
+                return entry.offset + entry.length
+        return 0
+
+    def _current_identity(self) -> tuple | None:
+        if not self.path.exists():
+            return None
+        stat = self.path.stat()
+        return (stat.st_ino, stat.st_dev)
+
+    def _active_replaced(self) -> bool:
+        """
+        True if the active file was rotated, truncated or recreated since it was indexed.
+        """
+        active = [e for e in self.entries if e.segment == ACTIVE]
+        if not active:
+            return False
+        if not self.path.exists() or self.path.stat().st_size < self._indexed_active_size():
+            return True
+        if self._current_identity() != self._active_identity:
+            return True
+        # A recreated file can get the same inode back: check the first and last indexed
+        # lines are still where they were (a rerun can write the same first record)
+        return not (self._entry_intact(active[0]) and self._entry_intact(active[-1]))
+
+    def _entry_intact(self, entry: IndexEntry) -> bool:
+        with self.path.open("rb") as f:
+            if entry.offset > 0:
+                f.seek(entry.offset - 1)
+                if f.read(1) != b"\n":
+                    return False
+            line = f.read(entry.length)
+        if not line.endswith(b"\n"):
+            return False
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return False
+        return isinstance(record, dict) and (record.get("id"), record.get("kind")) == (entry.id, entry.kind)
+
+    def _scan(self, segment: int, file: Path, start: int) -> list:
+        """
+        Index the complete lines of `file` from byte `start`.
+        """
+        self._close_handle(segment)
+        new = []
+        with open_segment(file, "rb") as f:
+            if start:
+                f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written
+                length = len(line)
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        record = None
+                    if isinstance(record, dict):
+                        new.append(IndexEntry(
+                            segment,
+                            offset,
+                            length,
+                            record.get("id"),
+                            record.get("kind"),
+                            record.get("step"),
+                            record.get("tool"),
+                        ))
+                offset += length
+        return new
+
+    def refresh(self) -> int:
+        """
+        Index records appended since the last refresh. Returns the number of new records.
+        """
+        return len(self._refresh())
+
+    def _refresh(self) -> list:
+        segments = dict(list_segments(self.path))
+        rewrite = False
+
+        # Entries of the active file move to a segment when it rotates: index that segment again
+        if self._active_replaced():
+            self.entries = [e for e in self.entries if e.segment != ACTIVE]
+            self._close_handle(ACTIVE)
+            rewrite = True
+        # Segments removed by hand
+        if any(e.segment != ACTIVE and e.segment not in segments for e in self.entries):
+            self.entries = [e for e in self.entries if e.segment == ACTIVE or e.segment in segments]
+            rewrite = True
+        if rewrite:
+            self._by_id = {}
+            for entry in self.entries:
+                if entry.id is not None:
+                    self._by_id[entry.id] = entry
+
+        new = []
+        indexed_segments = {e.segment for e in self.entries}
+        for number, file in segments.items():
+            if number not in indexed_segments:
+                new.extend(self._scan(number, file, 0))
+        if self.path.exists():
+            new.extend(self._scan(ACTIVE, self.path, self._indexed_active_size()))
+
+        if new and not rewrite and self.entries:
+            # Keep segment order: closed segments first, then the active file
+            if any(e.segment != ACTIVE for e in new) and any(e.segment == ACTIVE for e in self.entries):
+                rewrite = True
+        # Record which active file the entries come from
+        identity = self._current_identity()
+        if identity != self._active_identity and any(e.segment == ACTIVE for e in self.entries + new):
+            self._active_identity = identity
+            rewrite = True
+
+        for entry in new:
+            self._add(entry)
+        if rewrite or new and not self._index_valid:
+            self.entries.sort(key=lambda e: (e.segment == ACTIVE, e.segment, e.offset))
+            self._rewrite_index()
+        elif new:
+            with self.index_path.open("a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(list(e), ensure_ascii=False) + "\n" for e in new))
+        return new
+
+    # Reading
+
+    def _close_handle(self, segment: int):
+        handle = self._handles.pop(segment, None)
+        if handle is not None:
+            handle.close()
+
+    def _file_of(self, segment: int) -> Path:
+        if segment == ACTIVE:
+            return self.path
+        return dict(list_segments(self.path))[segment]
+
+    def _read_entry(self, entry: IndexEntry) -> dict:
+        handle = self._handles.get(entry.segment)
+        if handle is None:
+            file = self._file_of(entry.segment)
+            handle = open_segment(file, "rb")
+            if file.suffix == ".zst":
+                # zstd streams only seek forward: keep the (bounded) segment in memory
+                with handle:
+                    handle = io.BytesIO(handle.read())
+            self._handles[entry.segment] = handle
+        handle.seek(entry.offset)
+        return json.loads(handle.read(entry.length))
+
+    @staticmethod
+    def _matches(entry: IndexEntry, kind: str | None, step: int | None, tool: str | None) -> bool:
+        return (
+            (kind is None or entry.kind == kind)
+            and (step is None or entry.step == step)
+            and (tool is None or entry.tool == tool)
+        )
+
+    def select(self, kind: str | None = None, step: int | None = None, tool: str | None = None) -> list:
+        """
+        Return the index entries matching all given filters, in log order.
+        """
+        return [e for e in self.entries if self._matches(e, kind, step, tool)]
+
+    def records(self, kind: str | None = None, step: int | None = None, tool: str | None = None):
+        """
+        Yield the records matching all given filters, in log order, reading only those lines.
+        """
+        for entry in self.select(kind=kind, step=step, tool=tool):
+            yield self._read_entry(entry)
+
+    def get(self, entry_id: int) -> dict:
+        """
+        Return the record with the given `id`.
+        """
+        if entry_id not in self._by_id:
+            raise KeyError(f"No record with id {entry_id} in {self.path}.")
+        return self._read_entry(self._by_id[entry_id])
+
+    def follow(
+            self,
+            kind: str | None = None,
+            step: int | None = None,
+            tool: str | None = None,
+            poll_interval: float = 0.5,
+            from_start: bool = False,
+        ):
+        """
+        Yield matching records as they are appended to a live log (runs until interrupted).
+        With `from_start`, records already in the log are yielded first.
+        """
+        # Ids only grow, so they tell new records from segments re-indexed after a rotation
+        last_id = max(self._by_id, default=-1)
+        if from_start:
+            for entry in self.select(kind=kind, step=step, tool=tool):
+                yield self._read_entry(entry)
+        while True:
+            new = self._refresh()
+            for entry in new:
+                if entry.id is not None and entry.id <= last_id:
+                    continue
+                if entry.id is not None:
+                    last_id = entry.id
+                if self._matches(entry, kind, step, tool):
+                    yield self._read_entry(entry)
+            if not new:
+                time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    import sys
+
+    with LogReader(sys.argv[1]) as reader:
+        print(f"{len(reader)} records indexed")
+        for record in reader.records(kind="tool_output"):
+            print(record["id"], record.get("tool"), record.get("duration"))
@@ -0,0 +1,143 @@
+"""
+Segment files of a rotated JSONL log.
+
+When a Logger rotates `log_8B.jsonl`, the active file is renamed to a numbered
+segment next to it and a new active file is started:
+
+    log_8B.000001.jsonl.gz    <- closed segments, compressed in the background
+    log_8B.000002.jsonl.gz
+    log_8B.000003.jsonl       <- closed, compression still pending
+    log_8B.jsonl              <- active file, always the newest records
+
+Ids continue across segments, so reading all segments in order followed by the
+active file gives the same stream as one unrotated file.
+"""
+
+import io
+import os
+import re
+import gzip
+import json
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Compression methods and the suffix of their segment files
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+def _segment_pattern(path: Path):
+    return re.compile(
+        rf"^{re.escape(path.stem)}\.(\d+){re.escape(path.suffix)}(\.gz|\.zst)?$"
+    )
+
+
+def segment_path(path: Path, number: int) -> Path:
+    """
+    Uncompressed file name of segment `number` of the log at `path`.
+    """
+    path = Path(path)
+    return path.with_name(f"{path.stem}.{number:06d}{path.suffix}")
+
+
+def list_segments(path) -> list:
+    """
+    Return the closed segments of the log at `path` as (number, Path) pairs in order.
+    If a segment exists both compressed and uncompressed (compression was interrupted
+    before the original was removed), the uncompressed file is used.
+    """
+    path = Path(path)
+    directory = path.parent if str(path.parent) else Path(".")
+    if not directory.exists():
+        return []
+    pattern = _segment_pattern(path)
+
+    segments = {}
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if not match:
+            continue
+        number = int(match.group(1))
+        compressed = match.group(2) is not None
+        if number not in segments or not compressed:
+            segments[number] = directory / name
+    return sorted(segments.items())
+
+
+def open_segment(path: Path, mode: str = "rt"):
+    """
+    Open a segment or active log file, decompressing based on its suffix.
+    zstd segments can't seek backwards.
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode, encoding="utf-8" if "t" in mode else None)
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise ImportError("Reading .zst log segments requires the 'zstandard' package.")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        # Buffered so it can be read line by line; it can only seek forward
+        return io.TextIOWrapper(stream, encoding="utf-8") if "t" in mode else io.BufferedReader(stream)
+    return open(path, mode, encoding="utf-8" if "t" in mode else None)
+
+
+def compress_segment(path: Path, method: str = "gzip") -> Path:
+    """
+    Compress a closed segment next to itself and remove the original.
+    The compressed file is written under a temporary name and renamed when complete,
+    so readers never see a partial segment.
+    """
+    path = Path(path)
+    target = path.with_name(path.name + COMPRESSION_SUFFIXES[method])
+    tmp = target.with_name(target.name + ".tmp")
+
+    with open(path, "rb") as src:
+        if method == "gzip":
+            with gzip.open(tmp, "wb") as dst:
+                while chunk := src.read(1024 * 1024):
+                    dst.write(chunk)
+        else:
+            with open(tmp, "wb") as raw:
+                zstandard.ZstdCompressor().copy_stream(src, raw)
+
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+
+def iter_records(path, include_invalid: bool = False):
+    """
+    Yield the records of a log as one stream: all closed segments in order, then the active file.
+    Lines that are not valid JSON are skipped, unless `include_invalid` is set,
+    in which case they are yielded as raw strings.
+    """
+    path = Path(path)
+    files = [segment for _, segment in list_segments(path)]
+    if path.exists():
+        files.append(path)
+
+    for file in files:
+        with open_segment(file) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    if include_invalid:
+                        yield line
+
+
+if __name__ == "__main__":
+    import sys
+
+    for record in iter_records(sys.argv[1]):
+        print(record.get("id"), record.get("kind"))
@@ -0,0 +1,142 @@
+"""
+JSON serializers for log records.
+
+Logger turns every record into one line of JSON through a serializer from this module:
+
+* "json" (the default): standard library, same format as earlier logs
+  (`{"id": 0, "kind": ...}`, with NaN and Infinity written as such)
+* "orjson": fastest, compact output (`{"id":0,"kind":...}`)
+* "msgspec": fast, compact output
+* "auto": the first of orjson, msgspec and json that is installed
+
+The fast serializers are opt-in because their output differs: besides being compact,
+they write NaN and Infinity as `null`, so a metric that was NaN reads back as missing.
+
+All serializers share the `default` hook, so values tools commonly return
+(numpy scalars and arrays, pandas DataFrames/Series/Timestamps, datetimes, bytes, sets, ...)
+are logged instead of failing. If a fast serializer still rejects a record
+(e.g. integers beyond 64 bits), it is serialized again with the standard library.
+"""
+
+import json
+import base64
+from decimal import Decimal
+from pathlib import PurePath
+from datetime import date, datetime, time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def default(obj):
+    """
+    Convert values the JSON encoders don't support to JSON-compatible ones.
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return base64.b64encode(data).decode("ascii")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, PurePath):
+        return str(obj)
+    # pandas DataFrame: list of row dicts, like the tools return
+    if hasattr(obj, "to_dict") and hasattr(obj, "columns"):
+        return obj.to_dict(orient="records")
+    # pandas Series
+    if hasattr(obj, "to_dict") and hasattr(obj, "index"):
+        return {str(k): v for k, v in obj.to_dict().items()}
+    # pandas Timestamp/Timedelta and similar
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    # numpy scalars and arrays
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+def _stdlib_dumps(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False, default=default).encode("utf-8")
+
+
+def _orjson_dumps(record: dict) -> bytes:
+    return orjson.dumps(
+        record,
+        default=default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=default)
+
+    def _msgspec_dumps(record: dict) -> bytes:
+        return _msgspec_encoder.encode(record)
+else:
+    _msgspec_dumps = None
+
+
+SERIALIZERS = {
+    "orjson": _orjson_dumps if orjson is not None else None,
+    "msgspec": _msgspec_dumps,
+    "json": _stdlib_dumps,
+}
+
+
+def available_serializers() -> list:
+    """
+    Names of the serializers that can be used in this environment.
+    """
+    return [name for name, dumps in SERIALIZERS.items() if dumps is not None]
+
+
+def get_serializer(name: str = "json"):
+    """
+    Return a function serializing a record dict to JSON bytes (without a newline).
+    """
+    if name == "auto":
+        name = available_serializers()[0]
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer '{name}', expected 'auto' or one of {list(SERIALIZERS)}.")
+    dumps = SERIALIZERS[name]
+    if dumps is None:
+        raise ImportError(f"The '{name}' serializer requires the '{name}' package.")
+    if dumps is _stdlib_dumps:
+        return dumps
+
+    def dumps_with_fallback(record: dict) -> bytes:
+        try:
+            return dumps(record)
+        except (TypeError, ValueError, OverflowError):
+            return _stdlib_dumps(record)
+
+    dumps_with_fallback.__name__ = f"{name}_dumps"
+    return dumps_with_fallback
+
+
+if __name__ == "__main__":
+    import numpy as np
+    import pandas as pd
+
+    record = {
+        "kind": "tool_output",
+        "output": pd.DataFrame({"Material Name": ["Oak"], "Density": [np.float64(0.7)]}),
+        "score": np.int64(3),
+        "time": datetime.now(),
+        "raw": b"\x00\xff",
+    }
+    for name in available_serializers():
+        print(name, get_serializer(name)(record))
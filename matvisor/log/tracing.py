@@ -0,0 +1,196 @@
+"""
+Tracing spans of agent runs.
+
+A Tracer times nested spans (a run, its steps, and the LLM and tool calls of each step)
+and logs every span through its Logger when it ends:
+
+    {
+        "kind": "span",
+        "span_kind": "run" | "step" | "llm" | "tool",
+        "name": <span name, e.g. the tool name>,
+        "trace_id": <id shared by all spans of a run>,
+        "span_id": <id of the span>,
+        "parent_id": <id of the enclosing span, or None>,
+        "start_ns": <start time in nanoseconds since the epoch>,
+        "end_ns": <end time in nanoseconds since the epoch>,
+        "duration_ns": <duration in nanoseconds (perf_counter_ns)>,
+        "pid": <process id>,
+        "thread": <thread id>,
+        "status": "ok" | "error" | "cancelled",
+        "error": <exception, only if status is "error">,
+        "attributes": <dict of span attributes, e.g. {"step": 2}>,
+    }
+
+The current span follows the code through context variables, so spans opened in threads
+started with a copy of the context (LoggedTool timeouts and batches) get the right parent.
+Threads that don't inherit the context (e.g. the one smolagents runs agent code in) fall
+back to the innermost open run or step span of the tracer.
+
+`export_chrome_trace` converts the spans of a log to the Chrome trace-event format, which
+can be opened in Perfetto (https://ui.perfetto.dev) or chrome://tracing:
+
+    python -m matvisor.log.tracing run/case_study_1/results/log_8B.jsonl trace.json
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from .logger import Logger
+from .segments import iter_records
+
+
+# Span kinds used as parents by threads that don't inherit the context
+AMBIENT_KINDS = ("run", "step")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """
+    An open span. Attributes can be added until it ends.
+    """
+
+    def __init__(self, tracer, name: str, kind: str, parent, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else _new_id()
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._start_perf = time.perf_counter_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class Tracer:
+    """
+    Creates spans and logs them through a Logger.
+    """
+
+    def __init__(self, logger: Logger):
+        self.logger = logger
+        self._ambient = []  # Open run and step spans, innermost last
+        self._lock = threading.Lock()
+
+    def current(self) -> Span | None:
+        """
+        The innermost open span of this tracer in the current context.
+        """
+        span = _current_span.get()
+        if span is not None and span.tracer is self:
+            return span
+        with self._lock:
+            return self._ambient[-1] if self._ambient else None
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attributes):
+        """
+        Time the enclosed code as a child of the current span.
+        """
+        parent = self.current()
+        span = Span(self, name, kind, parent, attributes)
+        token = _current_span.set(span)
+        if kind in AMBIENT_KINDS:
+            with self._lock:
+                self._ambient.append(span)
+        status, error = "ok", None
+        try:
+            yield span
+        except GeneratorExit:
+            status = "cancelled"
+            raise
+        except BaseException as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration_ns = time.perf_counter_ns() - span._start_perf
+            if kind in AMBIENT_KINDS:
+                with self._lock:
+                    self._ambient.remove(span)
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Ended in another context (e.g. a generator closed elsewhere)
+                _current_span.set(parent)
+            record = {
+                "kind": "span",
+                "span_kind": kind,
+                "name": name,
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "start_ns": span.start_ns,
+                "end_ns": span.start_ns + duration_ns,
+                "duration_ns": duration_ns,
+                "pid": os.getpid(),
+                "thread": threading.get_ident(),
+                "status": status,
+                "attributes": span.attributes,
+            }
+            if error is not None:
+                record["error"] = error
+            self.logger.log(record)
+
+
+def chrome_trace_events(records) -> list:
+    """
+    Chrome trace "complete" events (times in microseconds) of the span records.
+    """
+    events = []
+    for record in records:
+        if not isinstance(record, dict) or record.get("kind") != "span":
+            continue
+        args = dict(record.get("attributes") or {})
+        args.update({
+            "trace_id": record["trace_id"],
+            "span_id": record["span_id"],
+            "parent_id": record["parent_id"],
+            "status": record.get("status"),
+        })
+        if "error" in record:
+            args["error"] = record["error"]
+        events.append({
+            "name": record["name"],
+            "cat": record["span_kind"],
+            "ph": "X",
+            "ts": record["start_ns"] / 1000,
+            "dur": record["duration_ns"] / 1000,
+            "pid": record.get("pid", 0),
+            "tid": record.get("thread", 0),
+            "args": args,
+        })
+    events.sort(key=lambda event: event["ts"])
+    return events
+
+
+def export_chrome_trace(log_path: str, out_path: str) -> int:
+    """
+    Write the spans of a (possibly rotated) log as a Chrome trace JSON file.
+    Returns the number of spans written.
+    """
+    events = chrome_trace_events(iter_records(log_path))
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python -m matvisor.log.tracing <log file> <output trace.json>")
+        sys.exit(1)
+    count = export_chrome_trace(sys.argv[1], sys.argv[2])
+    print(f"Wrote {count} spans to {sys.argv[2]}")
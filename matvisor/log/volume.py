@@ -0,0 +1,100 @@
+"""
+Log volume control used by Logger.
+
+* Levels: every record has a level, taken from its `kind` (see KIND_LEVELS);
+  records below the Logger's level are not written.
+* Sampling: a rate per `kind` (e.g. {"llm_input": 0.1}) keeps that share of the records.
+* Truncation: string fields longer than `max_field_length` are cut, and the record gets
+  `<field>_sha256` and `<field>_length` so the original can still be identified.
+* Deduplication: fields such as the system prompt are written in full the first time a
+  value appears in a file, with `<field>_sha256`; later records only carry the hash:
+    {"kind": "llm_system_prompt", "system_prompt_sha256": <hash of a prompt logged earlier>}
+"""
+
+import hashlib
+
+
+LEVELS = {
+    "debug": 10,
+    "info": 20,
+    "warning": 30,
+    "error": 40,
+}
+
+# Level of each record kind; kinds not listed are "info"
+KIND_LEVELS = {
+    "llm_system_prompt": "info",
+    "llm_input": "debug",
+    "llm_output": "info",
+    "llm_chunk": "debug",
+    "tool_input": "info",
+    "tool_output": "info",
+    "tool_timeout": "warning",
+}
+
+# Fields truncated by default when `max_field_length` is set
+TRUNCATE_FIELDS = ("system_prompt", "input", "output")
+
+# Fields stored once per file by default when deduplication is on
+DEDUP_FIELDS = ("system_prompt",)
+
+
+def level_value(level) -> int:
+    """
+    Numeric value of a level name (or number).
+    """
+    if isinstance(level, int):
+        return level
+    if level not in LEVELS:
+        raise ValueError(f"Unknown log level '{level}', expected one of {list(LEVELS)}.")
+    return LEVELS[level]
+
+
+def kind_level(kind) -> int:
+    """
+    Numeric level of a record kind.
+    """
+    return LEVELS[KIND_LEVELS.get(kind, "info")]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def truncate(payload: dict, max_length: int, fields=TRUNCATE_FIELDS) -> dict:
+    """
+    Return `payload` with the listed string fields cut to `max_length` characters.
+    """
+    truncated = None
+    for field in fields:
+        value = payload.get(field)
+        if isinstance(value, str) and len(value) > max_length:
+            if truncated is None:
+                truncated = dict(payload)
+            truncated[field] = value[:max_length]
+            truncated[f"{field}_sha256"] = content_hash(value)
+            truncated[f"{field}_length"] = len(value)
+    return payload if truncated is None else truncated
+
+
+def deduplicate(payload: dict, seen: set, fields=DEDUP_FIELDS, new: set | None = None) -> dict:
+    """
+    Return `payload` with values already in `seen` (or `new`) replaced by their hash.
+    New values are kept in full with their hash, and added to `new` if given (for the
+    caller to add to `seen` once the record is written), else to `seen`.
+    """
+    added = seen if new is None else new
+    deduplicated = None
+    for field in fields:
+        value = payload.get(field)
+        if not isinstance(value, str):
+            continue
+        if deduplicated is None:
+            deduplicated = dict(payload)
+        digest = content_hash(value)
+        deduplicated[f"{field}_sha256"] = digest
+        if digest in seen or digest in added:
+            del deduplicated[field]
+        else:
+            added.add(digest)
+    return payload if deduplicated is None else deduplicated
@@ -1,2 +1,6 @@
 from .logged_tool import LoggedTool
+from .batch_tool import BatchTool
+from .profiler import ToolProfiler
+from .cached_tool import CachedTool, ToolCache
+from .output_budget import OutputBudget, llama_token_counter
 from .material_search import SearchByMaterial
\ No newline at end of file
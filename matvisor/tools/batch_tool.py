@@ -0,0 +1,47 @@
+"""
+Agent-facing form of LoggedTool.batch.
+
+Code run by a CodeAgent only sees tools as plain functions, so `LoggedTool.batch` is not
+reachable from it. BatchTool exposes it as a tool of its own, named after the wrapped tool:
+
+    results = search_by_material_batch(calls=[{"material": "Oak"}, {"material": "Pine"}])
+"""
+
+from smolagents import Tool
+
+from matvisor.tools.logged_tool import LoggedTool
+
+
+class BatchTool(Tool):
+    """
+    Runs several calls of a LoggedTool at once (in parallel if the tool is thread-safe).
+    """
+
+    inputs = {
+        "calls": {
+            "type": "array",
+            "description": "One dict of arguments per call.",
+        }
+    }
+    output_type = "array"
+
+    def __init__(self, tool: LoggedTool):
+        self.tool = tool
+        self.name = f"{tool.name}_batch"
+        self.description = (
+            f"Runs `{tool.name}` for several inputs at once, faster than calling it repeatedly. "
+            f"`calls` is a list with one dict of `{tool.name}` arguments per call; "
+            "returns the list of results in the same order."
+        )
+        super().__init__()
+
+    def forward(self, calls: list) -> list:
+        return self.tool.batch(calls)
+
+
+if __name__ == "__main__":
+
+    from matvisor.tools.tool_test import AddNumbers
+
+    batch_tool = BatchTool(LoggedTool(AddNumbers()))
+    print(batch_tool.name, batch_tool(calls=[{"a": 1, "b": 2}, {"a": 3, "b": 4}]))
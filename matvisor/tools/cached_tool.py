@@ -0,0 +1,223 @@
+"""
+A wrapper around smolagents Tool that memoizes results of deterministic tools.
+
+Results are kept in a ToolCache, an in-memory LRU with optional time-to-live, keyed on
+the tool name, the tool's data fingerprint and the canonicalised call arguments.
+A ToolCache can be shared by several tools and agents, e.g. across the runs of a sweep.
+Given a DiskCache (see matvisor.cache), results are also kept on disk and reused by later
+processes; the tool's data fingerprint is part of the key, so a changed database is a miss.
+
+Tools can define `cache_fingerprint()` returning a string that changes whenever their
+backing data changes (see SearchByMaterial); entries made with an older fingerprint
+are dropped on the next call.
+
+When provided a Logger instance, logs cache lookups in the following format:
+
+* Log entries for a cache hit have the following structure:
+    {
+        "kind": "tool_cache_hit",
+        "tool": <tool name>,
+        "key": <hash of the call arguments>,
+        "saved": <duration of the original call in seconds>,
+        "source": "memory" or "disk",
+    }
+* Log entries for a cache miss have the following structure:
+    {
+        "kind": "tool_cache_miss",
+        "tool": <tool name>,
+        "key": <hash of the call arguments>,
+        "duration": <duration of the call in seconds>,
+    }
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from smolagents import Tool
+
+from matvisor.log import Logger
+from matvisor.cache import DiskCache
+from matvisor.log.serialize import default
+
+
+def canonical_arguments(args: tuple, kwargs: dict) -> str:
+    """
+    Stable text form of call arguments: same values give the same text,
+    whatever the keyword order.
+    """
+    return json.dumps([list(args), kwargs], sort_keys=True, ensure_ascii=False, default=default)
+
+
+def arguments_hash(args: tuple, kwargs: dict) -> str:
+    return hashlib.sha256(canonical_arguments(args, kwargs).encode("utf-8")).hexdigest()[:16]
+
+
+class ToolCache:
+    """
+    Thread-safe LRU of tool results with a size bound and an optional time-to-live (seconds),
+    optionally backed by a DiskCache shared across processes.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None, disk: DiskCache | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk = disk
+        self._entries = OrderedDict()  # key -> (result, duration, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def disk_key(key: tuple) -> str:
+        return hashlib.sha256(json.dumps(list(key), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: tuple):
+        """
+        Return (found, result, duration, source) for `key`, counting the hit or miss.
+        `source` is "memory" or "disk" for hits, None for misses.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[0], entry[1], "memory"
+        if self.disk is not None:
+            found, value = self.disk.get(self.disk_key(key))
+            if found:
+                result, duration = value
+                self._remember(key, result, duration)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return True, result, duration, "disk"
+        with self._lock:
+            self.misses += 1
+        return False, None, None, None
+
+    def put(self, key: tuple, result, duration: float):
+        self._remember(key, result, duration)
+        if self.disk is not None:
+            self.disk.put(self.disk_key(key), (result, duration), namespace=key[0])
+
+    def _remember(self, key: tuple, result, duration: float):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (result, duration, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tool: str | None = None, keep_fingerprint: str | None = None):
+        """
+        Drop the in-memory entries of `tool` (all entries if None), except those made with
+        `keep_fingerprint`. Disk entries are left for tools still using the old data.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if (tool is None or key[0] == tool) and (keep_fingerprint is None or key[1] != keep_fingerprint):
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CachedTool(Tool):
+    """
+    Accepts a deterministic smolagents Tool and returns cached results for repeated calls.
+    """
+    def __init__(
+            self,
+            tool: Tool,
+            cache: ToolCache = None,
+            logger: Logger = None,
+        ):
+        # Mirror the tool's required attributes
+        self.name = getattr(tool, "name", tool.__class__.__name__)
+        self.description = getattr(tool, "description", "No description provided.")
+        self.inputs = getattr(tool, "inputs", {})
+        self.output_type = getattr(tool, "output_type", "any")
+
+        # Keep references
+        self.tool = tool
+        self.cache = cache if cache is not None else ToolCache()
+        self.logger = logger
+        self._fingerprint = None
+        self.thread_safe = getattr(tool, "thread_safe", False)  # The cache itself is thread-safe
+
+        # Expose the tool forward (same signature!) before validation
+        self.forward = tool.forward
+
+        super().__init__()
+
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the tool's backing data ("" if the tool doesn't define one).
+        """
+        fingerprint_fn = getattr(self.tool, "cache_fingerprint", None)
+        return fingerprint_fn() if fingerprint_fn is not None else ""
+
+    def __call__(self, *args, **kwargs):
+        fingerprint = self.fingerprint()
+        if fingerprint != self._fingerprint:
+            # Backing data changed: results made from the old data are stale
+            if self._fingerprint is not None:
+                self.cache.invalidate(self.name, keep_fingerprint=fingerprint)
+            self._fingerprint = fingerprint
+
+        key_hash = arguments_hash(args, kwargs)
+        key = (self.name, fingerprint, canonical_arguments(args, kwargs))
+        found, result, duration, source = self.cache.get(key)
+        if found:
+            if self.logger:
+                self.logger.log({
+                    "kind": "tool_cache_hit",
+                    "tool": self.name,
+                    "key": key_hash,
+                    "saved": duration,
+                    "source": source,
+                })
+            return result
+
+        start = time.perf_counter()
+        result = self.tool(*args, **kwargs)
+        duration = time.perf_counter() - start
+        self.cache.put(key, result, duration)
+        if self.logger:
+            self.logger.log({
+                "kind": "tool_cache_miss",
+                "tool": self.name,
+                "key": key_hash,
+                "duration": duration,
+            })
+        return result
+
+
+if __name__ == "__main__":
+
+    from matvisor.tools.tool_test import AddNumbers
+
+    cache = ToolCache(maxsize=2)
+    tool = CachedTool(AddNumbers(), cache)
+    print(tool(2, 3), tool(2, 3), tool(a=2, b=3))
+    print(cache.stats())
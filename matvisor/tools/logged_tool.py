@@ -14,22 +14,107 @@ A wrapper around smolagents Tool that logs tool calls and results.
         "kind": "tool_output",
         "tool": <tool name>,
         "output": <tool result>,
-        "duration": <duration in seconds>,
+        "duration": <wall time in seconds>,
+        "wall_ns": <wall time in nanoseconds (perf_counter_ns)>,
+        "cpu_ns": <process CPU time in nanoseconds (process_time_ns)>,
+        "peak_memory": <peak Python allocation during the call in bytes, only with trace_memory;
+                        null if other traced calls ran meanwhile>,
+        "budget": <reduction of the output, only with an output_budget that changed it>,
         "time": <time in %Y-%m-%d %H:%M:%S format>,
     }
+* With an `output_budget` (see matvisor.tools.output_budget), the result is shrunk to the
+  budget before it is returned to the agent and logged. The final_answer tool is exempt:
+  its result is the answer of the run, not an observation. `budget` then holds e.g.
+    {"tokens": 812, "kept_tokens": 240, "rows": 7, "kept_rows": 3, "truncated": true,
+     "note": "Showing 3 of 7 rows to fit the output budget."}
+* With a `timeout`, a call still running after `timeout` seconds is abandoned and the agent
+  gets this observation instead of the result:
+    {"error": "timeout", "tool": <tool name>, "timeout": <seconds>, "message": <explanation>}
+  The timeout is logged before the usual tool_output record (which carries the observation):
+    {
+        "kind": "tool_timeout",
+        "tool": <tool name>,
+        "timeout": <timeout in seconds>,
+        "args": <args>,
+        "kwargs": <kwargs>,
+        "time": <time in %Y-%m-%d %H:%M:%S format>,
+    }
+
+* Several calls can run at once with `batch` (or `submit`, which returns a Future).
+  Tools declaring `thread_safe = True` run in a shared thread pool, others one after another.
+  The tool_input/tool_output records of the calls carry the same `batch_id`, and the batch
+  is summarized after its calls:
+    {
+        "kind": "tool_batch",
+        "tool": <tool name>,
+        "batch_id": <batch id>,
+        "calls": <number of calls>,
+        "parallel": <whether the calls ran in parallel>,
+        "duration": <wall time of the whole batch in seconds>,
+    }
+  Agents reach `batch` through a BatchTool (see matvisor.tools.batch_tool).
+
+* With a Tracer (see matvisor.log.tracing), every call is also timed as a "tool" span.
+
+Python threads can't be killed, so an abandoned call keeps running in its (daemon) thread
+until it returns on its own; its result is discarded.
+
+CPU time is measured for the whole process, so it includes other threads running meanwhile.
+Peak memory is measured with tracemalloc, which is started on first use and slows down
+all allocations while it runs; enable it only for profiling sessions. Its peak is
+process-wide, so it is only recorded for calls that ran alone: calls overlapping other
+traced calls (in a batch, submitted, or next to an abandoned call still running), and
+abandoned calls, get a null peak_memory.
 """
 
+import time
+import uuid
+import asyncio
+import threading
+import contextvars
+import tracemalloc
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 from smolagents import Tool
 
-from matvisor.log import Logger
+from matvisor.log import Logger, Tracer
+from matvisor.tools.profiler import ToolProfiler
+from matvisor.tools.output_budget import OutputBudget
+
+
+# Id of the batch the current call belongs to (None outside batches)
+current_batch_id = contextvars.ContextVar("current_batch_id", default=None)
 
 
 class LoggedTool(Tool):
     """
     Accepts any smolagents Tool and a Logger instance and wraps the tool to log its calls and results.
+    If a ToolProfiler is given, the timings of every call are also added to it.
+    If a timeout (seconds) is given, calls taking longer return a timeout observation instead.
+    If an OutputBudget is given, results are shrunk to it before they reach the agent.
+    If a Tracer is given, calls are traced as spans.
     """
-    def __init__(self, tool: Tool, logger: Logger = None):
+
+    # Shared by all LoggedTool instances, created on first parallel call
+    _pool = None
+    _pool_lock = threading.Lock()
+    max_workers = 8
+    # Traced calls running (abandoned ones included) and started so far, shared by all
+    # instances since tracemalloc's peak is process-wide
+    _memory_lock = threading.Lock()
+    _memory_running = 0
+    _memory_started = 0
+
+    def __init__(
+            self,
+            tool: Tool,
+            logger: Logger = None,
+            profiler: ToolProfiler = None,
+            trace_memory: bool = False,
+            timeout: float | None = None,
+            output_budget: OutputBudget | None = None,
+            tracer: Tracer | None = None,
+        ):
         # Mirror the tool tool’s required attributes
         self.name = getattr(tool, "name", tool.__class__.__name__)
         self.description = getattr(tool, "description", "No description provided.")
@@ -39,6 +124,13 @@ class LoggedTool(Tool):
         # Keep references
         self.tool = tool
         self.logger = logger
+        self.profiler = profiler
+        self.trace_memory = trace_memory
+        self.timeout = timeout
+        self.timeouts = 0  # Number of abandoned calls
+        # The final answer goes to the caller of the run, not back into the prompt
+        self.output_budget = output_budget if self.name != "final_answer" else None
+        self.tracer = tracer
 
         # CRITICAL: expose the tool forward (same signature!) before validation
         self.forward = tool.forward
@@ -50,34 +142,233 @@ class LoggedTool(Tool):
         """
         Log around execution; delegate to the tool tool’s __call__ method.
         """
+        batch_id = current_batch_id.get()
+        if self.tracer is None:
+            return self._call(args, kwargs, batch_id)
+        attributes = {} if batch_id is None else {"batch_id": batch_id}
+        with self.tracer.span(self.tool.name, "tool", **attributes):
+            return self._call(args, kwargs, batch_id)
+
+    def _call(self, args: tuple, kwargs: dict, batch_id: str | None):
         # Log the tool inputs
         if self.logger:
             start_time = datetime.now()  # Start time for logging
-            self.logger.log({
+            record = {
                 "kind": "tool_input",
                 "tool": self.tool.name,
                 "args": args,
                 "kwargs": kwargs,
                 "time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            })
+            }
+            if batch_id is not None:
+                record["batch_id"] = batch_id
+            self.logger.log(record)
 
         # Actual tool execution
-        result = self.tool(*args, **kwargs)
+        if self.trace_memory:
+            alone, memory_started, memory_start = self._start_memory_trace()
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.process_time_ns()
+
+        finished = True
+        if self.timeout is None:
+            result = self._run(args, kwargs)
+        else:
+            finished, result = self._call_with_timeout(args, kwargs)
+            if not finished:
+                result = self._timed_out(args, kwargs)
+
+        wall_ns = time.perf_counter_ns() - wall_start
+        cpu_ns = time.process_time_ns() - cpu_start
+        peak_memory = None
+        if self.trace_memory and finished:
+            peak_memory = self._peak_memory(alone, memory_started, memory_start)
+
+        if self.profiler is not None:
+            self.profiler.record(self.tool.name, wall_ns, cpu_ns, peak_memory)
+
+        budget = None
+        if self.output_budget is not None and finished:
+            result, budget = self.output_budget.apply(result)
 
         # Log the tool outputs
         if self.logger:
             end_time = datetime.now()  # End time for logging
-            duration = end_time - start_time
-            self.logger.log({
+            record = {
                 "kind": "tool_output",
                 "tool": self.tool.name,
                 "output": result,
-                "duration": duration.total_seconds(),
+                "duration": wall_ns / 1e9,
+                "wall_ns": wall_ns,
+                "cpu_ns": cpu_ns,
                 "time": end_time.strftime("%Y-%m-%d %H:%M:%S"),
-            })
+            }
+            if self.trace_memory:
+                record["peak_memory"] = peak_memory
+            if budget is not None:
+                record["budget"] = budget
+            if batch_id is not None:
+                record["batch_id"] = batch_id
+            self.logger.log(record)
 
         return result
 
+    def _start_memory_trace(self) -> tuple:
+        """
+        Count the call as running and, if no other traced call runs, reset the peak.
+        Returns (alone, number of traced calls started, traced memory at the start).
+        """
+        with LoggedTool._memory_lock:
+            alone = LoggedTool._memory_running == 0
+            LoggedTool._memory_running += 1
+            LoggedTool._memory_started += 1
+            memory_start = 0
+            if alone:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                memory_start = tracemalloc.get_traced_memory()[0]
+            return alone, LoggedTool._memory_started, memory_start
+
+    def _peak_memory(self, alone: bool, memory_started: int, memory_start: int) -> int | None:
+        """
+        Peak allocation of a finished call, or None if another traced call started meanwhile.
+        """
+        with LoggedTool._memory_lock:
+            if not alone or LoggedTool._memory_started != memory_started:
+                return None
+            return max(0, tracemalloc.get_traced_memory()[1] - memory_start)
+
+    def _run(self, args: tuple, kwargs: dict):
+        """
+        Run the tool; a traced call stops counting as running when the tool returns.
+        """
+        try:
+            return self.tool(*args, **kwargs)
+        finally:
+            if self.trace_memory:
+                with LoggedTool._memory_lock:
+                    LoggedTool._memory_running -= 1
+
+    @property
+    def thread_safe(self) -> bool:
+        """
+        Whether calls of the wrapped tool may run at the same time.
+        """
+        return getattr(self.tool, "thread_safe", False)
+
+    @classmethod
+    def _executor(cls) -> ThreadPoolExecutor:
+        with cls._pool_lock:
+            if LoggedTool._pool is None:
+                LoggedTool._pool = ThreadPoolExecutor(max_workers=cls.max_workers, thread_name_prefix="LoggedTool")
+            return LoggedTool._pool
+
+    def submit(self, *args, **kwargs) -> Future:
+        """
+        Start a call and return a Future of its result. Thread-safe tools run in the
+        shared pool; other tools run right away in the calling thread.
+        """
+        context = contextvars.copy_context()
+        if self.thread_safe:
+            return self._executor().submit(context.run, self.__call__, *args, **kwargs)
+        future = Future()
+        try:
+            future.set_result(context.run(self.__call__, *args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    async def acall(self, *args, **kwargs):
+        """
+        Awaitable form of a call.
+        """
+        return await asyncio.wrap_future(self.submit(*args, **kwargs))
+
+    def batch(self, calls: list) -> list:
+        """
+        Run several calls, in parallel if the tool is thread-safe, and return their results
+        in order. Each call is a dict of keyword arguments, a tuple of positional arguments,
+        or a single positional argument. The first exception of a call is raised once all
+        calls finished.
+        """
+        batch_id = uuid.uuid4().hex[:12]
+        token = current_batch_id.set(batch_id)
+        start = time.perf_counter()
+        try:
+            futures = []
+            for call in calls:
+                if isinstance(call, dict):
+                    futures.append(self.submit(**call))
+                elif isinstance(call, (tuple, list)):
+                    futures.append(self.submit(*call))
+                else:
+                    futures.append(self.submit(call))
+            errors = [f.exception() for f in futures]
+        finally:
+            current_batch_id.reset(token)
+        if self.logger:
+            self.logger.log({
+                "kind": "tool_batch",
+                "tool": self.tool.name,
+                "batch_id": batch_id,
+                "calls": len(futures),
+                "parallel": self.thread_safe,
+                "duration": time.perf_counter() - start,
+            })
+        for error in errors:
+            if error is not None:
+                raise error
+        return [f.result() for f in futures]
+
+    def _call_with_timeout(self, args: tuple, kwargs: dict):
+        """
+        Run the tool in a worker thread and wait at most `timeout` seconds.
+        Returns (finished, result); exceptions of the tool are raised here.
+        """
+        outcome = {}
+
+        def target():
+            try:
+                outcome["result"] = self._run(args, kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+
+        # Run in a copy of the caller's context so context variables follow the call
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(target,), name=f"tool-{self.name}", daemon=True)
+        worker.start()
+        worker.join(self.timeout)
+        if worker.is_alive():
+            return False, None
+        if "error" in outcome:
+            raise outcome["error"]
+        return True, outcome["result"]
+
+    def _timed_out(self, args: tuple, kwargs: dict) -> dict:
+        """
+        Log the timeout and build the observation returned to the agent.
+        """
+        self.timeouts += 1
+        if self.logger:
+            self.logger.log({
+                "kind": "tool_timeout",
+                "tool": self.tool.name,
+                "timeout": self.timeout,
+                "args": args,
+                "kwargs": kwargs,
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            })
+        return {
+            "error": "timeout",
+            "tool": self.tool.name,
+            "timeout": self.timeout,
+            "message": (
+                f"Error: tool '{self.tool.name}' did not finish within {self.timeout} seconds. "
+                "Try different arguments or another tool."
+            ),
+        }
+
 
 if __name__ == "__main__":
 
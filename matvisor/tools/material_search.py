@@ -1,4 +1,6 @@
 import json
+import hashlib
+import pandas as pd
 from smolagents import Tool
 from fuzzywuzzy import process
 
@@ -20,11 +22,42 @@ class SearchByMaterial(Tool):
         }
     }
     output_type = "any"
+    deterministic = True  # Same input and database give the same result, so results can be cached
+    thread_safe = True  # Only reads the database, so calls can run in parallel
 
     def __init__(self, materials_df):
         super().__init__()
         self.materials_df = materials_df
 
+    @property
+    def materials_df(self):
+        return self._materials_df
+
+    @materials_df.setter
+    def materials_df(self, materials_df):
+        self._materials_df = materials_df
+        self._fingerprint = None
+
+    def invalidate(self):
+        """
+        Forget the database fingerprint. Call it after editing `materials_df` in place;
+        assigning a new DataFrame does it already.
+        """
+        self._fingerprint = None
+
+    def cache_fingerprint(self) -> str:
+        """
+        Hash of the database contents, computed once per database (see `invalidate`),
+        since hashing the table costs a good part of a search.
+        """
+        if self._fingerprint is None:
+            materials_df = self.materials_df
+            digest = hashlib.sha256()
+            digest.update(json.dumps([str(c) for c in materials_df.columns]).encode("utf-8"))
+            digest.update(pd.util.hash_pandas_object(materials_df, index=True).values.tobytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
     def forward(self, material: str | None = None) -> str:
         if not material:
             return "Error: 'material' is required."
@@ -41,8 +74,10 @@ class SearchByMaterial(Tool):
             if not filtered_matches:
                 return f"Error: No close matches found for material '{material}'."
 
-            # Get all matching materials
+            # Get all matching materials, best matches first
             matching_rows = materials_df[materials_df[material_name_column].isin(filtered_matches)]
+            rank = {match: i for i, match in enumerate(filtered_matches)}
+            matching_rows = matching_rows.iloc[matching_rows[material_name_column].map(rank).argsort(kind="stable")]
 
             # Convert results to a list of dictionaries
             results = matching_rows.to_dict(orient='records')
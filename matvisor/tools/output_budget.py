@@ -0,0 +1,231 @@
+"""
+Token budget for tool outputs fed back to the model.
+
+Tool results are added to the prompt of every later step, so long results slow down
+prompt evaluation for the rest of the run. OutputBudget shrinks a result before the
+agent sees it:
+
+* JSON results (or lists/dicts) lose null, NaN and empty fields and are written compactly,
+* only the first `max_rows` rows of a list are kept, then fewer if still over `max_tokens`,
+  and the list is wrapped with its row counts, e.g.
+    {"rows":[{"Material Name":"Oak",...},{"Material Name":"Oak veneer",...}],"shown":2,"total":7,"truncated":true}
+* long string values are cut (ending with "…") while still over `max_tokens`,
+* plain text still over `max_tokens` is cut, and a note says so.
+
+JSON results stay valid JSON of the same Python type (a JSON string stays a string, a list
+or dict stays an object), so agent code can still parse them; the note on what was left
+out, e.g. "Showing 2 of 7 rows to fit the output budget.", is returned with the reduction
+info, which LoggedTool logs.
+
+Tokens are counted with the model's tokenizer (see `llama_token_counter`), or estimated
+at 4 characters per token without one. Other results (numbers, ...) are left unchanged.
+"""
+
+import json
+import math
+
+import llama_cpp
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+def llama_token_counter(llama_model: llama_cpp.Llama):
+    """
+    Token counter using the tokenizer of a loaded llama model.
+    """
+    def count_tokens(text: str) -> int:
+        return len(llama_model.tokenize(text.encode("utf-8"), add_bos=False, special=False))
+
+    return count_tokens
+
+
+def _is_null(value) -> bool:
+    return value is None or value == "" or (isinstance(value, float) and math.isnan(value))
+
+
+def drop_nulls(value):
+    """
+    Remove null, NaN and empty-string fields from (nested) dicts.
+    """
+    if isinstance(value, dict):
+        return {k: drop_nulls(v) for k, v in value.items() if not _is_null(v)}
+    if isinstance(value, list):
+        return [drop_nulls(v) for v in value]
+    return value
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _shown_rows(rows: list, total: int):
+    """
+    The rows kept of a list, with how many there were if some were left out.
+    """
+    if len(rows) == total:
+        return rows
+    return {"rows": rows, "shown": len(rows), "total": total, "truncated": True}
+
+
+def _string_lengths(value):
+    if isinstance(value, str):
+        yield len(value)
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _string_lengths(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _string_lengths(v)
+
+
+def _cut_strings(value, limit: int):
+    """
+    Cut (nested) string values longer than `limit` characters, marking the cut with "…".
+    """
+    if isinstance(value, str):
+        return value if len(value) <= limit else value[:limit] + "…"
+    if isinstance(value, dict):
+        return {k: _cut_strings(v, limit) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_cut_strings(v, limit) for v in value]
+    return value
+
+
+class OutputBudget:
+    """
+    Shrinks tool outputs to at most `max_tokens` tokens (plus the row counts or a short
+    truncation note).
+    """
+
+    def __init__(
+            self,
+            max_tokens: int = 512,
+            max_rows: int | None = 5,
+            drop_nulls: bool = True,
+            count_tokens=None,
+        ):
+        """
+        max_tokens: token budget of an output.
+        max_rows: rows of a list kept at most (None to only cut rows over the budget).
+        drop_nulls: remove null, NaN and empty fields from JSON outputs.
+        count_tokens: function counting the tokens of a text (e.g. `llama_token_counter(llama)`).
+        """
+        self.max_tokens = max_tokens
+        self.max_rows = max_rows
+        self.drop_nulls = drop_nulls
+        self.count_tokens = count_tokens or estimate_tokens
+
+    def apply(self, output):
+        """
+        Return (budgeted output, info). `info` describes the reduction, or is None if
+        the output was left unchanged.
+        JSON results stay valid JSON, and strings, lists and dicts keep their type; the
+        note on what was left out goes to `info["note"]` (i.e. the log record).
+        """
+        if isinstance(output, str):
+            try:
+                value = json.loads(output)
+            except ValueError:
+                value = None
+            if not isinstance(value, (list, dict)):
+                return self._apply_text(output)
+        elif isinstance(output, (list, dict)):
+            value = output
+        else:
+            return output, None
+
+        original = output if isinstance(output, str) else compact_json(output)
+        info = {"tokens": self.count_tokens(original)}
+        if self.drop_nulls:
+            value = drop_nulls(value)
+
+        notes = []
+        if isinstance(value, list):
+            total = len(value)
+            rows = value if self.max_rows is None else value[:self.max_rows]
+            # Fewest rows that fit, found by halving (token counts grow with rows)
+            if len(rows) > 1 and not self._fits(_shown_rows(rows, total)):
+                low, high = 1, len(rows)
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if self._fits(_shown_rows(rows[:middle], total)):
+                        low = middle
+                    else:
+                        high = middle - 1
+                rows = rows[:low]
+            if len(rows) < total:
+                notes.append(f"Showing {len(rows)} of {total} rows to fit the output budget.")
+            info["rows"] = total
+            info["kept_rows"] = len(rows)
+            value = _shown_rows(rows, total)
+
+        value, cut = self._shorten(value)
+        if cut:
+            notes.append("Long values were cut to fit the output budget.")
+        text = compact_json(value)
+        info["kept_tokens"] = self.count_tokens(text)
+        info["truncated"] = bool(notes)
+        if notes:
+            info["note"] = " ".join(notes)
+        return (text if isinstance(output, str) else value), info
+
+    def _fits(self, value) -> bool:
+        return self.count_tokens(compact_json(value)) <= self.max_tokens
+
+    def _shorten(self, value):
+        """
+        Cut the strings of a JSON value to the longest length within the budget.
+        Returns (value, whether it was cut).
+        """
+        if self._fits(value):
+            return value, False
+        longest = max(_string_lengths(value), default=0)
+        low, high = 0, longest
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._fits(_cut_strings(value, middle)):
+                low = middle
+            else:
+                high = middle - 1
+        if low == longest:
+            return value, False  # Over budget because of its structure, not its strings
+        return _cut_strings(value, low), True
+
+    def _apply_text(self, text: str):
+        tokens = self.count_tokens(text)
+        if tokens <= self.max_tokens:
+            return text, None
+        cut_text, _ = self._cut(text, tokens)
+        cut_text += "\n(Output was cut to fit the output budget.)"
+        return cut_text, {"tokens": tokens, "kept_tokens": self.count_tokens(cut_text), "truncated": True}
+
+    def _cut(self, text: str, tokens: int | None = None):
+        """
+        Longest prefix of `text` within the budget. Returns (text, whether it was cut).
+        """
+        if tokens is None:
+            tokens = self.count_tokens(text)
+        if tokens <= self.max_tokens:
+            return text, False
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(text[:middle]) <= self.max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low], True
+
+
+if __name__ == "__main__":
+
+    rows = [
+        {"Material Name": f"Oak {i}", "Plant Address": "Via Prealpi, 21, 37023 Stallavena-lugo VR, Italy", "Service life (years)": None}
+        for i in range(8)
+    ]
+    budget = OutputBudget(max_tokens=64)
+    text, info = budget.apply(json.dumps(rows, indent=2))
+    print(text)
+    print(info)
@@ -0,0 +1,116 @@
+"""
+Aggregated timings of tool calls.
+
+A ToolProfiler is shared by LoggedTool instances and collects, per tool, the wall time,
+process CPU time and (if traced) peak Python allocation of every call.
+`summary()` reduces them to percentiles and `dump()` logs them:
+
+    {
+        "kind": "tool_profile",
+        "tools": {
+            <tool name>: {
+                "calls": <number of calls>,
+                "wall_ms": {"p50": ..., "p95": ..., "p99": ..., "min": ..., "max": ..., "total": ...},
+                "cpu_ms": {"p50": ..., "p95": ..., "p99": ..., "min": ..., "max": ..., "total": ...},
+                "peak_memory": <largest peak allocation in bytes, or None if not traced>,
+            },
+        },
+    }
+"""
+
+import math
+import random
+import threading
+
+from matvisor.log import Logger
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values) / 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class ToolProfiler:
+    """
+    Collects per-call timings of tools and reports p50/p95/p99 per tool.
+    Keeps at most `max_samples` calls per tool (reservoir sampling beyond that);
+    counts, totals, minima and maxima always cover all calls.
+    """
+
+    def __init__(self, max_samples: int = 10000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}  # tool -> list of (wall_ns, cpu_ns)
+            self._calls = {}
+            self._totals = {}   # tool -> [wall_ns, cpu_ns]
+            self._minima = {}   # tool -> [wall_ns, cpu_ns]
+            self._maxima = {}   # tool -> [wall_ns, cpu_ns]
+            self._peaks = {}
+
+    def record(self, tool: str, wall_ns: int, cpu_ns: int, peak_memory: int | None = None):
+        with self._lock:
+            calls = self._calls.get(tool, 0) + 1
+            self._calls[tool] = calls
+            totals = self._totals.setdefault(tool, [0, 0])
+            totals[0] += wall_ns
+            totals[1] += cpu_ns
+            minima = self._minima.setdefault(tool, [wall_ns, cpu_ns])
+            maxima = self._maxima.setdefault(tool, [wall_ns, cpu_ns])
+            for index, value in enumerate((wall_ns, cpu_ns)):
+                minima[index] = min(minima[index], value)
+                maxima[index] = max(maxima[index], value)
+            samples = self._samples.setdefault(tool, [])
+            if len(samples) < self.max_samples:
+                samples.append((wall_ns, cpu_ns))
+            else:
+                slot = self._random.randrange(calls)
+                if slot < self.max_samples:
+                    samples[slot] = (wall_ns, cpu_ns)
+            if peak_memory is not None:
+                self._peaks[tool] = max(self._peaks.get(tool, 0), peak_memory)
+
+    def summary(self) -> dict:
+        """
+        Per-tool call count, wall and CPU time percentiles in milliseconds, and peak memory.
+        """
+        with self._lock:
+            result = {}
+            for tool, samples in self._samples.items():
+                stats = {"calls": self._calls[tool]}
+                for index, key in enumerate(["wall_ms", "cpu_ms"]):
+                    values = sorted(sample[index] / 1e6 for sample in samples)
+                    stats[key] = {
+                        "p50": percentile(values, 50),
+                        "p95": percentile(values, 95),
+                        "p99": percentile(values, 99),
+                        "min": self._minima[tool][index] / 1e6,
+                        "max": self._maxima[tool][index] / 1e6,
+                        "total": self._totals[tool][index] / 1e6,
+                    }
+                stats["peak_memory"] = self._peaks.get(tool)
+                result[tool] = stats
+            return result
+
+    def dump(self, logger: Logger | None = None, reset: bool = False) -> dict:
+        """
+        Log the summary as a `tool_profile` record (if a logger is given) and return it.
+        """
+        summary = self.summary()
+        if logger is not None and summary:
+            logger.log({
+                "kind": "tool_profile",
+                "tools": summary,
+            })
+        if reset:
+            self.reset()
+        return summary
@@ -0,0 +1,79 @@
+import os
+import json
+import tempfile
+import unittest
+
+from matvisor.log import Logger
+
+
+THINK_ID = 151667
+
+
+def chunks(text: str, size: int = 3) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class LogTestCase(unittest.TestCase):
+    """
+    Logs to log.jsonl in a temporary directory that is removed after each test.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.temp_dir.name, "log.jsonl")
+        self.logger = Logger(self.filepath)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_records(self, kind: str = None) -> list:
+        with open(self.filepath, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        return [r for r in records if kind is None or r["kind"] == kind]
+
+
+class FakeLlama:
+    """
+    Stands in for llama_cpp.Llama: answers every chat completion with a fixed completion,
+    or with completion(call) if it is callable, and records the parameters of the last call.
+    Tokenizes one token per word.
+    """
+
+    def __init__(self, completion="Thought: done.", prompt_tokens: int = 10, completion_tokens: int = 2, model_path: str = None):
+        self.completion = completion
+        self.usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        self.model_path = model_path
+        self.chat_format = "chatml"
+        self.cache = None
+        self.calls = 0
+        self.consumed = 0
+        self.n_tokens = 0
+
+    def set_cache(self, cache):
+        self.cache = cache
+
+    def tokenize(self, text: bytes, add_bos=True, special=False):
+        if special and text == b"<think>":
+            return [THINK_ID]
+        return list(range(len(text.split())))
+
+    def respond(self, messages, params) -> str:
+        return self.completion(self.calls) if callable(self.completion) else self.completion
+
+    def create_chat_completion(self, messages, stream=False, **params):
+        self.calls += 1
+        self.params = params
+        content = self.respond(messages, params)
+        if not stream:
+            return {
+                "choices": [{"message": {"content": content}, "finish_reason": "stop"}],
+                "usage": dict(self.usage),
+            }
+
+        def generate():
+            for piece in chunks(content):
+                self.consumed += 1
+                yield {"choices": [{"delta": {"content": piece}, "finish_reason": None}]}
+            yield {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+
+        return generate()
@@ -0,0 +1,107 @@
+import os
+import io
+import time
+import tempfile
+import unittest
+import multiprocessing
+from contextlib import redirect_stdout
+
+from matvisor.cache import DiskCache, main
+from matvisor.tools import CachedTool, ToolCache
+from matvisor.tools.tool_test import AddNumbers
+
+
+def _put_in_other_process(path):
+    with DiskCache(path) as cache:
+        cache.put("shared", {"from": "child"}, namespace="test")
+
+
+class CountingAdd(AddNumbers):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def forward(self, a: float, b: float) -> float:
+        self.calls += 1
+        return a + b
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_get(self):
+        with DiskCache(self.path) as cache:
+            self.assertEqual(cache.get("missing"), (False, None))
+            cache.put("key", [1, "two", None], namespace="tool")
+            self.assertEqual(cache.get("key"), (True, [1, "two", None]))
+            self.assertEqual(cache.stats()["namespaces"]["tool"]["hits"], 1)
+
+    def test_shared_across_processes(self):
+        process = multiprocessing.get_context("spawn").Process(target=_put_in_other_process, args=(self.path,))
+        process.start()
+        process.join()
+        with DiskCache(self.path) as cache:
+            self.assertEqual(cache.get("shared"), (True, {"from": "child"}))
+
+    def test_size_eviction_keeps_recent(self):
+        with DiskCache(self.path, max_bytes=None) as cache:
+            for i in range(10):
+                cache.put(f"key{i}", "x" * 1000)
+                time.sleep(0.002)
+            cache.get("key0")  # Most recently used now
+            removed = cache.evict(max_bytes=3500)
+            self.assertEqual(removed, 7)
+            keys = {e["key"] for e in cache.entries()}
+            self.assertEqual(keys, {"key0", "key9", "key8"})
+
+    def test_age_eviction(self):
+        with DiskCache(self.path, max_age=0.05) as cache:
+            cache.put("old", 1)
+            time.sleep(0.1)
+            self.assertEqual(cache.get("old"), (False, None))
+            cache.put("older", 1)
+            time.sleep(0.1)
+            cache.put("new", 2)
+            self.assertEqual([e["key"] for e in cache.entries()], ["new"])
+
+    def test_clear_namespace(self):
+        with DiskCache(self.path) as cache:
+            cache.put("a", 1, namespace="one")
+            cache.put("b", 2, namespace="two")
+            self.assertEqual(cache.clear("one"), 1)
+            self.assertEqual([e["key"] for e in cache.entries()], ["b"])
+
+    def test_cli(self):
+        with DiskCache(self.path) as cache:
+            cache.put("a", 1, namespace="search_by_material")
+        out = io.StringIO()
+        with redirect_stdout(out):
+            main(["stats", self.path])
+            main(["clear", self.path])
+        self.assertIn("search_by_material: 1 entries", out.getvalue())
+        self.assertIn("Removed 1 entries", out.getvalue())
+
+    def test_tool_results_reused_by_new_cache(self):
+        """
+        A fresh ToolCache (e.g. the next process of a sweep) reuses results from disk.
+        """
+        first = CountingAdd()
+        with DiskCache(self.path) as disk:
+            CachedTool(first, ToolCache(disk=disk))(a=2, b=3)
+        second = CountingAdd()
+        with DiskCache(self.path) as disk:
+            cache = ToolCache(disk=disk)
+            self.assertEqual(CachedTool(second, cache)(a=2, b=3), 5)
+        self.assertEqual(second.calls, 0)
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
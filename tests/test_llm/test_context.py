@@ -0,0 +1,75 @@
+import unittest
+
+from matvisor.llm import ContextWindow
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def history(steps: int) -> list:
+    messages = [
+        {"role": "system", "content": "You are an agent. " * 20},
+        {"role": "user", "content": "New task: find the material."},
+    ]
+    for step in range(steps):
+        messages.append({"role": "assistant", "content": f"Thought: step {step}.\n<code>\nprint(search())\n</code>"})
+        messages.append({"role": "tool-response", "content": "Observation:\n" + f"row{step} " * 100})
+    return messages
+
+
+class TestContextWindow(unittest.TestCase):
+
+    def window(self, **kwargs) -> ContextWindow:
+        return ContextWindow(max_tokens=600, compact_tokens=20, count_tokens=count_words, message_overhead=0, **kwargs)
+
+    def test_under_budget_unchanged(self):
+        messages = history(1)
+        fitted, info = self.window().fit(messages)
+        self.assertEqual(fitted, messages)
+        self.assertEqual((info["compacted"], info["dropped"]), (0, 0))
+
+    def test_bounded_for_any_number_of_steps(self):
+        window = self.window()
+        for steps in (5, 20, 100):
+            messages = history(steps)
+            fitted, info = window.fit(messages)
+            self.assertLessEqual(info["tokens"], 600)
+            self.assertEqual(info["tokens"], sum(count_words(m["content"]) for m in fitted))
+            # System prompt, task and latest turns kept as they are
+            self.assertEqual(fitted[:2], messages[:2])
+            self.assertEqual(fitted[-4:], messages[-4:])
+
+    def test_compacts_oldest_first(self):
+        messages = history(6)
+        fitted, info = self.window().fit(messages)
+        self.assertGreater(info["compacted"], 0)
+        self.assertEqual(info["dropped"], 0)
+        self.assertIn("(Compacted:", fitted[3]["content"])
+        self.assertTrue(fitted[3]["content"].startswith("Observation:\nrow0"))
+
+    def test_compaction_stable_between_steps(self):
+        """
+        Messages compacted at one step are compacted identically at the next.
+        """
+        window = self.window()
+        first, _ = window.fit(history(5))
+        second, _ = window.fit(history(6))
+        self.assertEqual(first[:4], second[:4])
+
+    def test_counts_cached(self):
+        calls = []
+
+        def counting(text):
+            calls.append(text)
+            return count_words(text)
+
+        window = ContextWindow(max_tokens=10_000, count_tokens=counting)
+        window.fit(history(3))
+        first = len(calls)
+        window.fit(history(4))
+        self.assertEqual(len(calls) - first, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
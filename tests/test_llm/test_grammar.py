@@ -0,0 +1,36 @@
+import unittest
+import llama_cpp
+
+from matvisor.llm import SmolagentsAdapter
+from matvisor.llm.grammar import code_agent_grammar
+
+from tests.helpers import FakeLlama
+
+
+class TestGrammar(unittest.TestCase):
+
+    def test_grammar_rules(self):
+        grammar = code_agent_grammar()
+        self.assertIn('root ::= "Thought:" thought "<code>\\n" code-line* "</code>"', grammar)
+        self.assertNotIn("think", grammar)
+        self.assertIn('think? "Thought:"', code_agent_grammar(allow_think=True))
+
+    def test_custom_tags(self):
+        grammar = code_agent_grammar(("```py", "```"))
+        self.assertIn('"```py\\n" code-line* "```"', grammar)
+        self.assertIn("code-line ::= ([^`\\n] [^\\n]*)?", grammar)
+
+    def test_adapter_passes_grammar(self):
+        llama = FakeLlama("Thought: x\n<code>\nfinal_answer(1)\n")
+        adapter = SmolagentsAdapter(llama, grammar=True)
+        adapter.generate([{"role": "user", "content": "Hi"}], stop_sequences=["</code>"])
+        self.assertIsInstance(llama.params["grammar"], llama_cpp.LlamaGrammar)
+        self.assertEqual(llama.params["grammar"]._grammar, code_agent_grammar())
+
+        adapter = SmolagentsAdapter(llama)
+        adapter.generate([{"role": "user", "content": "Hi"}])
+        self.assertNotIn("grammar", llama.params)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+from matvisor.log import Logger
+from matvisor.llm.kv_state import model_fingerprint, load_state, warm_start, STATE_VERSION
+
+
+SYSTEM_TOKENS = [1, 5, 6, 7]  # Chat prompt tokens up to the user message
+
+
+class FakeContext:
+    """
+    Context whose state is the list of tokens in its KV cache, and the rows of logits
+    of the last batch.
+    """
+
+    def __init__(self):
+        self.ctx = self
+        self.tokens = []
+        self.outputs = 0
+
+    def kv_cache_seq_rm(self, seq_id, p0, p1):
+        del self.tokens[p0:]
+
+    def state(self) -> bytes:
+        return json.dumps([self.tokens, self.outputs]).encode("utf-8")
+
+
+def state_get_size(ctx):
+    return len(ctx.state())
+
+
+def state_get_data(ctx, buffer, size):
+    data = ctx.state()
+    buffer[:len(data)] = data
+    return len(data)
+
+
+def state_set_data(ctx, buffer, size):
+    ctx.tokens, ctx.outputs = json.loads(bytes(buffer[:size]))
+    return size
+
+
+class StateLlama:
+    """
+    Evaluates chat prompts as SYSTEM_TOKENS followed by the characters of the user message,
+    with a row of logits per token of a batch, as with logits_all=True.
+    """
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self.chat_format = "chatml"
+        self.metadata = {}
+        self._ctx = FakeContext()
+        self.input_ids = np.zeros(64, dtype=np.intc)
+        self.n_tokens = 0
+        self.completions = 0
+
+    def n_ctx(self):
+        return 64
+
+    @property
+    def _input_ids(self):
+        return self.input_ids[:self.n_tokens]
+
+    def eval(self, tokens):
+        self._ctx.kv_cache_seq_rm(-1, self.n_tokens, -1)
+        self._ctx.tokens.extend(tokens)
+        self._ctx.outputs = len(tokens)
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+
+    def create_chat_completion(self, messages, **params):
+        self.completions += 1
+        self.n_tokens = 0
+        self.eval(SYSTEM_TOKENS + [ord(c) for c in messages[-1]["content"]])
+
+
+class TestKVStateFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.temp_dir.name, "model.gguf")
+        with open(self.model_path, "wb") as f:
+            f.write(b"GGUF" + bytes(range(256)) * 10)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_model_fingerprint(self):
+        fingerprint = model_fingerprint(self.model_path)
+        self.assertEqual(fingerprint, model_fingerprint(self.model_path))
+        with open(self.model_path, "ab") as f:
+            f.write(b"changed")
+        self.assertNotEqual(model_fingerprint(self.model_path), fingerprint)
+
+    def test_mismatched_files_are_ignored(self):
+        """
+        Missing, corrupted, stale or truncated state files are not loaded (the model is not touched).
+        """
+        path = os.path.join(self.temp_dir.name, "state.kvstate")
+        self.assertIsNone(load_state(None, path, "key"))
+        with open(path, "wb") as f:
+            f.write(b"not a header\n")
+        self.assertIsNone(load_state(None, path, "key"))
+        header = {"version": STATE_VERSION, "key": "other", "n_tokens": 2, "state_size": 4}
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+        self.assertIsNone(load_state(None, path, "key"))
+        header["key"] = "key"
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n" + b"\0" * 6)
+        self.assertIsNone(load_state(None, path, "key"))
+
+
+@mock.patch("llama_cpp.llama_state_set_data", state_set_data)
+@mock.patch("llama_cpp.llama_state_get_data", state_get_data)
+@mock.patch("llama_cpp.llama_state_get_size", state_get_size)
+class TestWarmStart(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.temp_dir.name, "model.gguf")
+        with open(self.model_path, "wb") as f:
+            f.write(b"GGUF")
+        self.cache_dir = os.path.join(self.temp_dir.name, "kv_state")
+        self.filepath = os.path.join(self.temp_dir.name, "log.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """
+        A cold start saves the system prompt prefix with one row of logits; a warm start
+        in a fresh model loads the same state without evaluating anything.
+        """
+        logger = Logger(self.filepath)
+        cold = StateLlama(self.model_path)
+        path = warm_start(cold, "You are an expert.", self.cache_dir, logger=logger)
+        self.assertEqual(cold._ctx.tokens, SYSTEM_TOKENS)
+        self.assertEqual(cold._ctx.outputs, 1)
+
+        warm = StateLlama(self.model_path)
+        self.assertEqual(warm_start(warm, "You are an expert.", self.cache_dir, logger=logger), path)
+        self.assertEqual(warm.completions, 0)
+        self.assertEqual(warm.n_tokens, len(SYSTEM_TOKENS))
+        self.assertEqual(warm._input_ids.tolist(), SYSTEM_TOKENS)
+        self.assertEqual((warm._ctx.tokens, warm._ctx.outputs), (SYSTEM_TOKENS, 1))
+
+        with open(self.filepath, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(r["hit"], r["tokens"]) for r in records], [(False, 4), (True, 4)])
+
+        # Another system prompt is another state
+        other = StateLlama(self.model_path)
+        self.assertNotEqual(warm_start(other, "You are a tutor.", self.cache_dir), path)
+        self.assertEqual(other.completions, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import unittest
+from unittest import mock
+
+import llama_cpp
+
+from matvisor.llm import SmolagentsAdapter
+
+from tests.helpers import FakeLlama, LogTestCase
+
+
+# Perf counters of a call that only evaluated 3 of its 10 prompt tokens
+PERF = {"prompt_eval_ms": 30.0, "eval_ms": 20.0, "prompt_eval_tokens": 3, "eval_tokens": 1}
+
+
+class TestPromptCache(LogTestCase):
+
+    def generate(self, prompt_cache) -> SmolagentsAdapter:
+        adapter = SmolagentsAdapter(FakeLlama(), logger=self.logger, prompt_cache=prompt_cache)
+        with mock.patch("matvisor.llm.smolagent_adaptor.perf_context", return_value=PERF):
+            adapter.generate([{"role": "user", "content": "Hi"}])
+        return adapter
+
+    def test_ram_cache(self):
+        """
+        "ram" sets a LlamaRAMCache; prompt tokens not evaluated are reported as cached.
+        """
+        adapter = self.generate("ram")
+        self.assertIsInstance(adapter.llama.cache, llama_cpp.LlamaRAMCache)
+        output = self.read_records("llm_output")[-1]
+        self.assertEqual(output["cached_prompt_tokens"], 7)
+        self.assertEqual(adapter.usage.summary()["cached_prompt_tokens"], 7)
+
+    def test_disk_cache(self):
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)  # The disk cache is kept under .cache/ of the working directory
+        self.addCleanup(os.chdir, cwd)
+        adapter = self.generate("disk")
+        self.assertIsInstance(adapter.llama.cache, llama_cpp.LlamaDiskCache)
+        self.assertTrue(os.path.isdir(os.path.join(self.temp_dir.name, ".cache", "llama_cache")))
+        self.assertEqual(adapter.usage.summary()["cached_prompt_tokens"], 7)
+
+    def test_cache_instance(self):
+        cache = llama_cpp.LlamaRAMCache(capacity_bytes=1 << 20)
+        adapter = self.generate(cache)
+        self.assertIs(adapter.llama.cache, cache)
+
+    def test_no_cache(self):
+        adapter = self.generate(None)
+        self.assertIsNone(adapter.llama.cache)
+
+    def test_unknown_cache(self):
+        with self.assertRaises(ValueError):
+            SmolagentsAdapter(FakeLlama(), prompt_cache="gpu")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import unittest
+from smolagents import CodeAgent
+
+from matvisor.cache import DiskCache
+from matvisor.llm import SmolagentsAdapter, ResponseCache
+
+from tests.helpers import FakeLlama, LogTestCase
+
+
+def answer(call: int) -> str:
+    return f"Answer {call}"
+
+
+def agent_answer(call: int) -> str:
+    """
+    Answers every step with a final answer in the CodeAgent format.
+    """
+    return f"Thought: Done.\n<code>\nfinal_answer('Answer {call}')\n</code>"
+
+
+class TestResponseCache(LogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.model_path = os.path.join(self.temp_dir.name, "model.gguf")
+        with open(self.model_path, "wb") as f:
+            f.write(b"weights")
+        self.cache_path = os.path.join(self.temp_dir.name, "responses.sqlite")
+
+    def adapter(self, cache: ResponseCache) -> SmolagentsAdapter:
+        return SmolagentsAdapter(FakeLlama(answer, completion_tokens=3, model_path=self.model_path), logger=self.logger, response_cache=cache)
+
+    def test_replay_across_processes(self):
+        messages = [{"role": "user", "content": "Hi"}]
+        with DiskCache(self.cache_path) as disk:
+            first = self.adapter(ResponseCache(disk))
+            self.assertEqual(first.generate(messages, temperature=0).content, "Answer 1")
+
+        with DiskCache(self.cache_path) as disk:
+            cache = ResponseCache(disk)
+            second = self.adapter(cache)
+            message = second.generate(messages, temperature=0)
+            self.assertEqual(message.content, "Answer 1")
+            self.assertEqual(message.token_usage.output_tokens, 3)
+            self.assertEqual(second.llama.calls, 0)
+            self.assertEqual(second.usage.summary()["calls"], 0)
+
+            # Other stop sequences or messages are misses
+            second.generate(messages, stop_sequences=["Observation:"], temperature=0)
+            second.generate(messages + [{"role": "user", "content": "Again"}], temperature=0)
+            self.assertEqual(second.llama.calls, 2)
+            stats = cache.dump(self.logger)
+            self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+            self.assertAlmostEqual(stats["hit_rate"], 1 / 3)
+
+        outputs = [r["response_cache"] for r in self.read_records("llm_output")]
+        self.assertEqual(outputs, ["miss", "hit", "miss", "miss"])
+        self.assertEqual(self.read_records()[-1]["kind"], "llm_response_cache")
+
+    def test_sampled_completions_not_cached(self):
+        with DiskCache(self.cache_path) as disk:
+            cache = ResponseCache(disk)
+            adapter = self.adapter(cache)
+            for _ in range(2):
+                adapter.generate([{"role": "user", "content": "Hi"}], temperature=0.7)
+            self.assertEqual(adapter.llama.calls, 2)
+            self.assertEqual(cache.stats()["skipped"], 2)
+            self.assertEqual(disk.stats()["entries"], 0)
+
+    def test_agent_reruns_replayed(self):
+        """
+        CodeAgent doesn't pass a temperature: with a cache the adapter defaults to 0.
+        """
+        with DiskCache(self.cache_path) as disk:
+            cache = ResponseCache(disk)
+            llama = FakeLlama(agent_answer, completion_tokens=3, model_path=self.model_path)
+            answers = []
+            for _ in range(2):
+                model = SmolagentsAdapter(llama, response_cache=cache)
+                agent = CodeAgent(tools=[], model=model, max_steps=2)
+                answers.append(agent.run("Which country?"))
+            self.assertEqual(answers, ["Answer 1", "Answer 1"])
+            self.assertEqual(llama.calls, 1)
+            self.assertEqual(cache.stats()["hits"], 1)
+
+        with self.assertRaises(ValueError):
+            SmolagentsAdapter(llama, response_cache=cache, temperature=0.7)
+
+
+if __name__ == "__main__":
+    unittest.main()
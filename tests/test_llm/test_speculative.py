@@ -0,0 +1,115 @@
+import unittest
+import numpy as np
+
+from matvisor.llm import LLMUsage, SmolagentsAdapter
+from matvisor.llm.speculative import CountingDraft, ModelDraft
+
+
+class FixedDraft:
+    """
+    Always proposes the same tokens.
+    """
+
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+
+    def __call__(self, input_ids, **kwargs):
+        return np.array(self.tokens, dtype=np.intc)
+
+
+class FakeSmallLlama:
+    """
+    Generates 100, 101, 102, ... after any prompt.
+    """
+
+    def __init__(self):
+        self.prompts = []
+
+    def token_eos(self):
+        return 0
+
+    def n_ctx(self):
+        return 8192
+
+    def generate(self, tokens, **kwargs):
+        self.prompts.append(tokens)
+        token = 100
+        while True:
+            yield token
+            token += 1
+
+
+class TestCountingDraft(unittest.TestCase):
+
+    def test_acceptance(self):
+        draft = CountingDraft(FixedDraft([7, 8, 9, 10]))
+        prompt = np.arange(20, dtype=np.intc)
+        draft(prompt)
+        # Two drafts accepted, then the model sampled its own token
+        draft(np.arange(23, dtype=np.intc))
+        # All four accepted, plus the token sampled after them
+        draft(np.arange(28, dtype=np.intc))
+        self.assertEqual(draft.take_stats(), {"draft_tokens": 8, "accepted_draft_tokens": 6})
+        self.assertEqual(draft.take_stats(), {"draft_tokens": 0, "accepted_draft_tokens": 0})
+
+    def test_new_completion_not_counted(self):
+        draft = CountingDraft(FixedDraft([7, 8]))
+        draft(np.arange(20, dtype=np.intc))
+        draft(np.arange(5, dtype=np.intc))
+        self.assertEqual(draft.take_stats()["draft_tokens"], 0)
+
+
+class TestModelDraft(unittest.TestCase):
+
+    def test_greedy_tokens(self):
+        llama = FakeSmallLlama()
+        draft = ModelDraft(llama, num_pred_tokens=3)
+        tokens = draft(np.array([1, 2, 3], dtype=np.intc))
+        self.assertEqual(tokens.tolist(), [100, 101, 102])
+        self.assertEqual(llama.prompts, [[1, 2, 3]])
+
+
+class TestSpeculativeUsage(unittest.TestCase):
+
+    def test_usage_acceptance_rate(self):
+        usage = LLMUsage()
+        usage.record(completion_tokens=30, completion_ms=1000, draft_tokens=40, accepted_draft_tokens=30)
+        usage.record(completion_tokens=10, completion_ms=1000)
+        summary = usage.summary()
+        self.assertEqual(summary["acceptance_rate"], 0.75)
+        self.assertEqual(summary["effective_tokens_per_second"], 20)
+
+    def test_draft_needs_all_logits(self):
+        class Llama:
+            scores = np.zeros((512, 4), dtype=np.single)
+
+            def n_ctx(self):
+                return 8192
+
+        with self.assertRaises(ValueError):
+            SmolagentsAdapter(Llama(), draft_model=FixedDraft([1]))
+
+    def test_counts_drafts_of_loaded_model(self):
+        class Llama:
+            scores = np.zeros((8192, 4), dtype=np.single)
+
+            def __init__(self):
+                self.draft_model = FixedDraft([1])
+
+            def n_ctx(self):
+                return 8192
+
+        llama = Llama()
+        loaded = llama.draft_model
+        SmolagentsAdapter(llama)
+        self.assertIsInstance(llama.draft_model, CountingDraft)
+        self.assertIs(llama.draft_model.draft, loaded)
+        # The draft loaded with the model is neither wrapped twice nor replaced
+        SmolagentsAdapter(llama)
+        self.assertIs(llama.draft_model.draft, loaded)
+        with self.assertRaises(ValueError):
+            SmolagentsAdapter(llama, draft_model="0.6")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from matvisor.llm import SmolagentsAdapter
+from matvisor.llm.streaming import StreamMonitor
+
+from tests.helpers import FakeLlama, LogTestCase, chunks
+
+
+class TestStreamMonitor(unittest.TestCase):
+
+    def feed_all(self, monitor: StreamMonitor, text: str) -> StreamMonitor:
+        for piece in chunks(text):
+            if monitor.feed(piece):
+                break
+        monitor.finish()
+        return monitor
+
+    def test_stops_after_code_block(self):
+        monitor = self.feed_all(StreamMonitor(), "Thought: x.\n<code>\nprint(1)\n</code>\nThought: more")
+        self.assertEqual(monitor.visible, "Thought: x.\n<code>\nprint(1)\n</code>")
+        self.assertEqual(monitor.stop_reason, "code_block")
+
+    def test_stop_sequence_split_across_chunks(self):
+        monitor = self.feed_all(StreamMonitor(["Observation:"]), "Thought: x\nObservation: y")
+        self.assertEqual(monitor.visible, "Thought: x\n")
+        self.assertEqual(monitor.stop_reason, "stop_sequence")
+
+    def test_think_blocks_hidden_and_not_stopping(self):
+        """
+        Stop sequences and code inside <think> don't stop generation, and are not visible.
+        """
+        text = "<think>Observation: <code>x</code></think>\n\nThought: y.\n<code>\nprint(2)\n</code>"
+        monitor = self.feed_all(StreamMonitor(["Observation:"]), text)
+        self.assertEqual(monitor.visible.strip(), "Thought: y.\n<code>\nprint(2)\n</code>")
+        self.assertEqual(monitor.stop_reason, "code_block")
+        self.assertGreater(monitor.think_tokens, 0)
+
+    def test_think_budget(self):
+        monitor = self.feed_all(StreamMonitor(think_budget=3), "<think>" + "very long reasoning " * 10)
+        self.assertEqual(monitor.stop_reason, "think_budget")
+        self.assertEqual(monitor.think_tokens, 4)
+        self.assertEqual(monitor.visible, "")
+
+    def test_no_stop(self):
+        monitor = self.feed_all(StreamMonitor(), "Just an answer.")
+        self.assertEqual(monitor.visible, "Just an answer.")
+        self.assertIsNone(monitor.stop_reason)
+
+
+class TestStreamingAdapter(LogTestCase):
+
+    def test_stream_stops_early_and_logs_chunks(self):
+        completion = "Thought: add.\n<code>\nfinal_answer(5)\n</code>\n" + "Observation: wasted " * 20
+        llama = FakeLlama(completion)
+        adapter = SmolagentsAdapter(llama, logger=self.logger, stream=True)
+        message = adapter.generate([{"role": "user", "content": "Add 2 and 3."}], stop_sequences=["Observation:"])
+
+        self.assertEqual(message.content, "Thought: add.\n<code>\nfinal_answer(5)\n</code>")
+        self.assertLess(llama.consumed, len(chunks(completion)) // 2)
+        self.assertNotIn("stop", llama.params)
+
+        records = self.read_records()
+        self.assertEqual(len(self.read_records("llm_chunk")), llama.consumed)
+        self.assertEqual(records[-1]["kind"], "llm_output")
+        self.assertEqual(records[-1]["stop_reason"], "code_block")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from matvisor.llm import SmolagentsAdapter
+
+from tests.helpers import THINK_ID, FakeLlama, LogTestCase
+
+
+class ThinkingLlama(FakeLlama):
+    """
+    Thinks before answering unless the <think> token is banned.
+    """
+
+    def respond(self, messages, params) -> str:
+        banned = params.get("logit_bias", {}).get(THINK_ID) == float("-inf")
+        thinking = "" if banned else "<think>\nfour words of reasoning\n</think>\n\n"
+        return thinking + super().respond(messages, params)
+
+
+class TestThinking(LogTestCase):
+
+    def test_thinking_counted(self):
+        adapter = SmolagentsAdapter(ThinkingLlama(), logger=self.logger)
+        message = adapter.generate([{"role": "user", "content": "Hi"}])
+        self.assertEqual(message.content, "Thought: done.")
+        output = self.read_records("llm_output")[-1]
+        self.assertEqual(output["think_tokens"], 4)
+        self.assertFalse(output["think_suppressed"])
+        self.assertEqual(adapter.usage.summary()["think_tokens"], 4)
+
+    def test_thinking_suppressed(self):
+        llama = ThinkingLlama()
+        adapter = SmolagentsAdapter(llama, logger=self.logger, suppress_thinking=True)
+        message = adapter.generate([{"role": "user", "content": "Hi"}])
+        self.assertEqual(message.content, "Thought: done.")
+        self.assertEqual(llama.params["logit_bias"], {THINK_ID: float("-inf")})
+        output = self.read_records("llm_output")[-1]
+        self.assertEqual(output["think_tokens"], 0)
+        self.assertTrue(output["think_suppressed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from matvisor.llm import SmolagentsAdapter, LLMUsage
+
+from tests.helpers import FakeLlama, LogTestCase
+
+
+class TestLLMUsage(unittest.TestCase):
+
+    def test_summary(self):
+        usage = LLMUsage()
+        usage.record(prompt_tokens=100, cached_prompt_tokens=60, completion_tokens=20, prompt_eval_ms=200, decode_ms=1000)
+        usage.record(prompt_tokens=120, cached_prompt_tokens=None, completion_tokens=10, prompt_eval_ms=None, decode_ms=500)
+        summary = usage.summary()
+        self.assertEqual(summary["calls"], 2)
+        self.assertEqual(summary["prompt_tokens"], 220)
+        self.assertEqual(summary["completion_tokens"], 30)
+        self.assertEqual(summary["prompt_tokens_per_second"], 160 / 0.2)
+        self.assertEqual(summary["decode_tokens_per_second"], 30 / 1.5)
+
+    def test_no_timings(self):
+        usage = LLMUsage()
+        usage.record(prompt_tokens=10, completion_tokens=5)
+        self.assertIsNone(usage.summary()["decode_tokens_per_second"])
+
+
+class TestAdapterUsage(LogTestCase):
+
+    def test_token_usage_and_run_totals(self):
+        adapter = SmolagentsAdapter(FakeLlama(prompt_tokens=50, completion_tokens=7), logger=self.logger)
+        for _ in range(2):
+            message = adapter.generate([{"role": "user", "content": "Hi"}])
+        self.assertEqual(message.token_usage.input_tokens, 50)
+        self.assertEqual(message.token_usage.output_tokens, 7)
+
+        totals = adapter.usage.dump(self.logger, reset=True)
+        self.assertEqual(totals["calls"], 2)
+        self.assertEqual(totals["prompt_tokens"], 100)
+        self.assertEqual(adapter.usage.summary()["calls"], 0)
+
+        records = self.read_records()
+        output = [r for r in records if r["kind"] == "llm_output"][-1]
+        self.assertEqual(output["prompt_tokens"], 50)
+        self.assertEqual(output["completion_tokens"], 7)
+        self.assertIn("decode_ms", output)
+        self.assertEqual(records[-1]["kind"], "llm_usage")
+        self.assertEqual(records[-1]["completion_tokens"], 14)
+
+
+if __name__ == "__main__":
+    unittest.main()
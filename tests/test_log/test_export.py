@@ -0,0 +1,48 @@
+import os
+import json
+import tempfile
+import unittest
+import importlib.util
+
+from matvisor.log import Logger, export_logs, query_logs
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestColumnarExport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.logs_path = os.path.join(self.temp_dir.name, "logs")
+        self.out_path = os.path.join(self.temp_dir.name, "parquet")
+        for modelsize in ["0.6", "8"]:
+            filepath = os.path.join(self.logs_path, "case_study_1", "results", f"log_{modelsize}B.jsonl")
+            logger = Logger(filepath)
+            logger.log({"kind": "llm_system_prompt", "system_prompt": "You are an assistant."})
+            logger.log({"kind": "llm_input", "step": 1, "input": "Hi", "time": "2025-01-01 10:00:00"})
+            logger.log({"kind": "llm_output", "step": 1, "output": "Hello", "duration": 1.5, "time": "2025-01-01 10:00:01"})
+            logger.log({"kind": "tool_input", "tool": "search_by_material", "args": [], "kwargs": {"material": "Oak"}, "time": "2025-01-01 10:00:01"})
+            logger.log({"kind": "tool_output", "tool": "search_by_material", "output": [{"a": 1}], "duration": 0.01, "time": "2025-01-01 10:00:01"})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_export_and_query(self):
+        """
+        Each kind is exported per model and run, and queries read only the requested columns.
+        """
+        files = export_logs(self.logs_path, self.out_path)
+        self.assertEqual(len(files), 10)
+
+        df = query_logs(self.out_path, "llm_output", columns=["model", "run", "duration"])
+        self.assertEqual(list(df.columns), ["model", "run", "duration"])
+        self.assertEqual(sorted(df["model"]), ["0.6", "8"])
+        self.assertEqual(set(df["run"]), {"case_study_1"})
+        self.assertEqual(list(df["duration"]), [1.5, 1.5])
+
+        df = query_logs(self.out_path, "tool_input", columns=["kwargs"], filters={"model": "8"})
+        self.assertEqual(len(df), 1)
+        self.assertEqual(json.loads(df["kwargs"][0]), {"material": "Oak"})
+
+
+if __name__ == "__main__":
+    unittest.main()
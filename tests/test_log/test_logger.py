@@ -0,0 +1,307 @@
+import os
+import json
+import shutil
+import tempfile
+import time
+import threading
+import unittest
+import multiprocessing
+from unittest import mock
+
+from matvisor.log import Logger
+
+
+def _write_from_process(path, worker_id, n_records):
+    logger = Logger(path, multiprocess=True)
+    for i in range(n_records):
+        logger.log({"kind": "demo", "worker": worker_id, "i": i})
+
+
+class TestLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.temp_dir.name, "log.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_records(self):
+        with open(self.filepath, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_ids_shared_across_instances(self):
+        """
+        Two loggers on the same file share one incremental id sequence.
+        """
+        logger1 = Logger(self.filepath)
+        logger2 = Logger(self.filepath)
+        logger1.log({"kind": "a"})
+        logger2.log({"kind": "b"})
+        logger1.log({"kind": "c"})
+        records = self.read_records()
+        self.assertEqual([r["id"] for r in records], [0, 1, 2])
+        self.assertEqual([r["kind"] for r in records], ["a", "b", "c"])
+
+    def test_buffered_threads_keep_ids_in_file_order(self):
+        """
+        Buffered records from several threads end up with contiguous ids in file order.
+        """
+        logger = Logger(self.filepath, buffered=True, flush_records=16, flush_interval=0.05)
+
+        def work(n):
+            for i in range(250):
+                logger.log({"kind": "demo", "thread": n, "i": i})
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logger.close()
+
+        records = self.read_records()
+        self.assertEqual([r["id"] for r in records], list(range(1000)))
+        stats = logger.stats()
+        self.assertEqual(stats["written"], 1000)
+        self.assertEqual(stats["dropped"], 0)
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_buffered_flush(self):
+        """
+        flush() makes queued records visible before the time threshold.
+        """
+        logger = Logger(self.filepath, buffered=True, flush_interval=60)
+        logger.log({"kind": "demo"})
+        logger.flush()
+        self.assertEqual(len(self.read_records()), 1)
+        logger.close()
+
+    def test_buffered_skips_unserializable_records(self):
+        """
+        A record that cannot be serialized is counted as dropped and does not use an id.
+        """
+        circular = {}
+        circular["self"] = circular
+        logger = Logger(self.filepath, buffered=True)
+        logger.log({"kind": "a"})
+        logger.log({"kind": "bad", "value": circular})
+        logger.log({"kind": "b"})
+        logger.close()
+        records = self.read_records()
+        self.assertEqual([(r["id"], r["kind"]) for r in records], [(0, "a"), (1, "b")])
+        self.assertEqual(logger.stats()["dropped"], 1)
+
+    def test_buffered_survives_write_errors(self):
+        """
+        A batch that can't be written is dropped; the writer keeps running and flush() returns.
+        """
+        directory = os.path.join(self.temp_dir.name, "run")
+        filepath = os.path.join(directory, "log.jsonl")
+        logger = Logger(filepath, buffered=True, flush_interval=60)
+        logger.log({"kind": "a"})
+        logger.flush()
+        shutil.rmtree(directory)
+        logger.log({"kind": "lost"})
+        logger.flush()
+        stats = logger.stats()
+        self.assertEqual(stats["dropped"], 1)
+        self.assertIn("FileNotFoundError", stats["last_error"])
+
+        os.makedirs(directory)
+        logger.log({"kind": "b"})
+        logger.close()
+        with open(filepath, "r", encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["kind"] for line in f], ["b"])
+
+    def test_resume_from_tail(self):
+        """
+        A new process-level counter continues after the last id of an existing file,
+        including records much larger than one tail block.
+        """
+        with open(self.filepath, "w", encoding="utf-8") as f:
+            for i in range(5):
+                f.write(json.dumps({"id": i, "text": "x" * 100_000}) + "\n")
+        logger = Logger(self.filepath)
+        self.assertEqual(logger._tail_last_id(), 4)
+        self.assertEqual(logger._compute_initial_next_id(), 5)
+
+    def test_resume_falls_back_on_corrupted_tail(self):
+        """
+        A truncated last line makes the fast path give up and the full scan decide.
+        """
+        with open(self.filepath, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"id": 7}) + "\n")
+            f.write(json.dumps({"id": 3}) + "\n")
+            f.write('{"id": 8, "kind": "tru')
+        logger = Logger(self.filepath)
+        self.assertIsNone(logger._tail_last_id())
+        self.assertEqual(logger._compute_initial_next_id(), 8)
+        logger.log({"kind": "after"})
+        last = self.read_lines()[-1]
+        self.assertEqual(json.loads(last)["id"], 8)
+
+    def test_multiprocess_ids_unique(self):
+        """
+        Several processes appending to one file get unique, contiguous ids and intact lines.
+        """
+        Logger(self.filepath, multiprocess=True).log({"kind": "parent"})
+        processes = [
+            multiprocessing.Process(target=_write_from_process, args=(self.filepath, n, 100))
+            for n in range(4)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        records = self.read_records()
+        self.assertEqual(sorted(r["id"] for r in records), list(range(401)))
+
+    def test_multiprocess_next_id_from_sidecar(self):
+        """
+        After another process appended, the next id comes from the sidecar, not the file tail;
+        a sidecar that doesn't match the log falls back to the tail.
+        """
+        logger = Logger(self.filepath, multiprocess=True)
+        logger.log({"kind": "a"})
+        path = logger.path
+        Logger._synced_sizes[path] = -1  # As if another process had appended
+        with mock.patch.object(Logger, "_compute_initial_next_id", side_effect=AssertionError):
+            logger.log({"kind": "b"})
+
+        with open(self.filepath, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": 10, "kind": "other"}) + "\n")
+        logger.log({"kind": "c"})
+        self.assertEqual([r["id"] for r in self.read_records()], [0, 1, 10, 11])
+        self.assertTrue(os.path.exists(self.filepath + ".next"))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_forked_children_reopen_handle(self):
+        """
+        Forked children don't share the parent's descriptor, and so its flock.
+        """
+        Logger(self.filepath, multiprocess=True).log({"kind": "parent"})
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=_write_from_process, args=(self.filepath, n, 100))
+            for n in range(4)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        records = self.read_records()
+        self.assertEqual(sorted(r["id"] for r in records), list(range(401)))
+
+    def test_level_and_sampling(self):
+        """
+        Records below the level are skipped, and sampling keeps about the given share.
+        """
+        logger = Logger(self.filepath, level="info", sample_rates={"tool_output": 0.5}, sample_seed=0)
+        logger.log({"kind": "llm_input", "input": "prompt"})
+        logger.log({"kind": "llm_input", "input": "prompt"}, level="warning")
+        for _ in range(200):
+            logger.log({"kind": "tool_output", "output": "x"})
+        records = self.read_records()
+        self.assertEqual(records[0]["kind"], "llm_input")
+        n_tool = sum(r["kind"] == "tool_output" for r in records)
+        self.assertTrue(60 < n_tool < 140)
+        self.assertEqual(logger.stats()["skipped"], 202 - len(records))
+
+    def test_truncation_and_dedup(self):
+        """
+        Long fields are cut with a hash and length; repeated system prompts are written once.
+        """
+        logger = Logger(self.filepath, max_field_length=10, dedup=True)
+        prompt = "You are an expert. " * 10
+        logger.log({"kind": "llm_system_prompt", "system_prompt": prompt})
+        logger.log({"kind": "llm_system_prompt", "system_prompt": prompt})
+        logger.log({"kind": "tool_output", "output": "y" * 50})
+        first, second, tool = self.read_records()
+        self.assertEqual(first["system_prompt"], prompt[:10])
+        self.assertEqual(first["system_prompt_length"], len(prompt))
+        self.assertNotIn("system_prompt", second)
+        self.assertEqual(second["system_prompt_sha256"], first["system_prompt_sha256"])
+        self.assertEqual(tool["output"], "y" * 10)
+        self.assertEqual(tool["output_length"], 50)
+
+    def test_dedup_restarts_with_new_file(self):
+        """
+        A recreated log gets the full value again, and so does the record after one that
+        couldn't be written.
+        """
+        logger = Logger(self.filepath, dedup=True)
+        prompt = "You are an expert. " * 10
+        logger.log({"kind": "llm_system_prompt", "system_prompt": prompt})
+        os.remove(self.filepath)
+        logger.log({"kind": "llm_system_prompt", "system_prompt": prompt})
+        self.assertEqual(self.read_records()[0]["system_prompt"], prompt)
+
+        other = "You are a tutor. " * 10
+        circular = {}
+        circular["self"] = circular
+        with self.assertRaises((TypeError, ValueError)):
+            logger.log({"kind": "llm_system_prompt", "system_prompt": other, "value": circular})
+        logger.log({"kind": "llm_system_prompt", "system_prompt": other})
+        self.assertEqual(self.read_records()[-1]["system_prompt"], other)
+
+    def test_reopens_removed_file(self):
+        """
+        The shared file handle follows the path: a removed log is recreated and ids restart.
+        """
+        logger = Logger(self.filepath)
+        logger.log({"kind": "a"})
+        logger.log({"kind": "b"})
+        os.remove(self.filepath)
+        logger.log({"kind": "c"})
+        self.assertEqual([(r["id"], r["kind"]) for r in self.read_records()], [(0, "c")])
+
+    def test_durability_modes(self):
+        """
+        "always" fsyncs every append, "batch" every `fsync_records` records.
+        """
+        always = os.path.join(self.temp_dir.name, "always.jsonl")
+        batch = os.path.join(self.temp_dir.name, "batch.jsonl")
+        logger_always = Logger(always, durability="always")
+        logger_batch = Logger(batch, durability="batch", fsync_records=5, fsync_interval=60)
+        for _ in range(10):
+            logger_always.log({"kind": "demo"})
+            logger_batch.log({"kind": "demo"})
+        self.assertEqual(logger_always.stats()["fsyncs"], 10)
+        self.assertEqual(logger_batch.stats()["fsyncs"], 2)
+        logger_always.close()
+        logger_batch.close()
+
+    def test_buffered_syncs_when_idle(self):
+        """
+        In buffered mode the fsync interval expires even if nothing else is written.
+        """
+        logger = Logger(self.filepath, buffered=True, flush_interval=0.01, durability="batch", fsync_records=100, fsync_interval=0.1)
+        logger.log({"kind": "demo"})
+        deadline = time.monotonic() + 5
+        while logger.stats()["fsyncs"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(logger.stats()["fsyncs"], 1)
+        logger.close()
+
+    def test_unbuffered_syncs_when_idle(self):
+        """
+        Without buffering, a timer fsyncs the last records once the interval expires.
+        """
+        logger = Logger(self.filepath, durability="batch", fsync_records=100, fsync_interval=0.1)
+        logger.log({"kind": "demo"})
+        logger.log({"kind": "demo"})
+        self.assertEqual(logger.stats()["fsyncs"], 0)
+        deadline = time.monotonic() + 5
+        while logger.stats()["fsyncs"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(logger.stats()["fsyncs"], 1)
+        logger.close()
+
+    def read_lines(self):
+        with open(self.filepath, "r", encoding="utf-8") as f:
+            return f.read().splitlines()
+
+
+if __name__ == "__main__":
+    unittest.main()
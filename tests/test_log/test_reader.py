@@ -0,0 +1,90 @@
+import os
+import unittest
+
+from matvisor.log import Logger, LogReader
+from matvisor.log.segments import zstandard
+
+from tests.helpers import LogTestCase
+
+
+class TestLogReader(LogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for step in range(1, 4):
+            self.logger.log({"kind": "llm_output", "step": step, "output": f"step {step}"})
+            self.logger.log({"kind": "tool_output", "tool": "search_by_material", "output": "Italy"})
+            self.logger.log({"kind": "tool_output", "tool": "final_answer", "output": "Italy"})
+
+    def test_filters_and_random_access(self):
+        """
+        Records can be filtered by kind, step and tool, and fetched by id.
+        """
+        with LogReader(self.filepath) as reader:
+            self.assertEqual(len(reader), 9)
+            tools = [r["id"] for r in reader.records(kind="tool_output", tool="search_by_material")]
+            self.assertEqual(tools, [1, 4, 7])
+            self.assertEqual([r["output"] for r in reader.records(step=2)], ["step 2"])
+            self.assertEqual(reader.get(5)["tool"], "final_answer")
+
+    def test_incremental_refresh(self):
+        """
+        The on-disk index is reused and only new records are read on refresh.
+        """
+        LogReader(self.filepath).close()
+        self.assertTrue(os.path.exists(self.filepath + ".idx"))
+
+        self.logger.log({"kind": "llm_output", "step": 4, "output": "step 4"})
+        with LogReader(self.filepath, refresh=False) as reader:
+            self.assertEqual(len(reader), 9)
+            self.assertEqual(reader.refresh(), 1)
+            self.assertEqual(reader.get(9)["step"], 4)
+            self.assertEqual(reader.refresh(), 0)
+
+    def test_index_follows_rotation(self):
+        """
+        Records stay reachable after the active file is rotated into a compressed segment.
+        """
+        path = os.path.join(self.temp_dir.name, "rotated.jsonl")
+        logger = Logger(path, max_bytes=300)
+        logger.log({"kind": "demo", "text": "x" * 200})
+        reader = LogReader(path)
+        for _ in range(5):
+            logger.log({"kind": "demo", "text": "x" * 200})
+        logger.flush()
+        reader.refresh()
+        self.assertEqual([r["id"] for r in reader], list(range(6)))
+        reader.close()
+
+    @unittest.skipUnless(zstandard is not None, "needs zstandard")
+    def test_zstd_segments(self):
+        """
+        zstd segments are indexed and their records fetched in any order.
+        """
+        path = os.path.join(self.temp_dir.name, "zstd.jsonl")
+        logger = Logger(path, max_bytes=800, compression="zstd")
+        for i in range(8):
+            logger.log({"kind": "demo", "i": i, "text": "x" * 200})
+        logger.flush()
+        with LogReader(path) as reader:
+            self.assertEqual([r["id"] for r in reader], list(range(8)))
+            self.assertEqual([reader.get(i)["i"] for i in (2, 0, 5, 1)], [2, 0, 5, 1])
+        logger.close()
+
+    def test_rerun_with_same_first_record(self):
+        """
+        A log recreated by a rerun is indexed again, even if it starts with the same record.
+        """
+        LogReader(self.filepath).close()
+        os.remove(self.filepath)
+        self.logger.log({"kind": "llm_output", "step": 1, "output": "step 1"})
+        for step in range(2, 12):
+            self.logger.log({"kind": "llm_output", "step": step, "output": f"rerun step {step}"})
+        with LogReader(self.filepath) as reader:
+            self.assertEqual([r["id"] for r in reader], list(range(11)))
+            self.assertEqual(reader.get(1)["output"], "rerun step 2")
+            self.assertEqual(reader.get(2)["step"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
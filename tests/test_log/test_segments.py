@@ -0,0 +1,86 @@
+import os
+import json
+import tempfile
+import unittest
+
+from matvisor.log import Logger, list_segments, iter_records
+
+
+class TestLogRotation(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.temp_dir.name, "log_8B.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def forget_file(self):
+        """
+        Drop the per-process state of the log file, as if a new process opened it.
+        """
+        for registry in (Logger._next_ids, Logger._rotations):
+            registry.pop(Logger(self.filepath).path, None)
+
+    def test_rotation_by_size(self):
+        """
+        Records are split into compressed segments and read back as one stream with continuous ids.
+        """
+        logger = Logger(self.filepath, max_bytes=1000)
+        for i in range(50):
+            logger.log({"kind": "demo", "text": "x" * 50, "i": i})
+        logger.close()
+
+        segments = list_segments(self.filepath)
+        self.assertGreater(len(segments), 1)
+        self.assertEqual([n for n, _ in segments], list(range(1, len(segments) + 1)))
+        self.assertTrue(all(p.name.endswith(".jsonl.gz") for _, p in segments))
+        self.assertLessEqual(os.path.getsize(self.filepath), 1000)
+
+        records = list(iter_records(self.filepath))
+        self.assertEqual([r["id"] for r in records], list(range(50)))
+        self.assertEqual([r["i"] for r in records], list(range(50)))
+
+    def test_ids_continue_after_restart(self):
+        """
+        A new Logger on a freshly rotated file continues from the newest segment.
+        """
+        logger = Logger(self.filepath, max_bytes=200, compression=None)
+        for i in range(10):
+            logger.log({"kind": "demo", "text": "x" * 150})
+        logger.close()
+        os.remove(self.filepath)  # Only segments left, the last one ends with id 8
+        self.forget_file()
+
+        logger = Logger(self.filepath, max_bytes=200)
+        logger.log({"kind": "after_restart"})
+        logger.close()
+        with open(self.filepath, "r", encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.readline())["id"], 9)
+        self.assertEqual([r["id"] for r in iter_records(self.filepath)], list(range(10)))
+
+    def test_rotation_while_closing_at_exit(self):
+        """
+        A rotation by the last flush at exit, once the compression pool refuses new work,
+        keeps the records and compresses the segment right away.
+        """
+        logger = Logger(self.filepath, buffered=True, flush_interval=60, max_bytes=2000)
+        logger.log({"kind": "demo", "text": "x" * 50, "i": 0})
+        logger.flush()
+        for i in range(1, 40):
+            logger.log({"kind": "demo", "text": "x" * 50, "i": i})
+        pool = Logger._compressor()
+        pool.shutdown()  # As the concurrent.futures exit hook does before Logger._close_all
+        try:
+            Logger._close_all()
+        finally:
+            Logger._compression_pool = None
+        self.assertEqual(logger.stats()["dropped"], 0)
+        segments = list_segments(self.filepath)
+        self.assertTrue(segments)
+        self.assertTrue(all(p.name.endswith(".jsonl.gz") for _, p in segments))
+        self.assertEqual([r["i"] for r in iter_records(self.filepath)], list(range(40)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import json
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from matvisor.log import Logger
+from matvisor.log.serialize import available_serializers, get_serializer
+
+
+class TestSerializers(unittest.TestCase):
+
+    def test_tool_values(self):
+        """
+        Every available serializer handles numpy, pandas, datetime and bytes values the same way.
+        """
+        record = {
+            "kind": "tool_output",
+            "output": pd.DataFrame({"Material Name": ["Oak"], "Density": [np.float64(0.7)]}),
+            "count": np.int64(3),
+            "values": np.array([1.5, 2.5]),
+            "time": datetime(2025, 1, 1, 10, 0, 0),
+            "raw": b"\xff\x00",
+        }
+        expected = {
+            "kind": "tool_output",
+            "output": [{"Material Name": "Oak", "Density": 0.7}],
+            "count": 3,
+            "values": [1.5, 2.5],
+            "time": "2025-01-01T10:00:00",
+            "raw": "/wA=",
+        }
+        for name in available_serializers():
+            with self.subTest(serializer=name):
+                self.assertEqual(json.loads(get_serializer(name)(record)), expected)
+
+    def test_fallback_to_stdlib(self):
+        """
+        Values a fast serializer rejects are serialized by the standard library instead.
+        """
+        record = {"big": 2 ** 80}
+        for name in available_serializers():
+            with self.subTest(serializer=name):
+                self.assertEqual(json.loads(get_serializer(name)(record)), record)
+
+
+    def test_default_keeps_stdlib_format(self):
+        """
+        The default serializer writes what the standard library writes, NaN included.
+        """
+        record = {"id": 0, "kind": "tool_output", "score": float("nan"), "limit": float("inf")}
+        self.assertEqual(get_serializer()(record), json.dumps(record).encode("utf-8"))
+        with tempfile.TemporaryDirectory() as directory:
+            with Logger(os.path.join(directory, "log.jsonl")) as logger:
+                logger.log({"kind": "tool_output", "score": float("nan")})
+            with open(os.path.join(directory, "log.jsonl"), "r", encoding="utf-8") as f:
+                self.assertEqual(f.read(), '{"id": 0, "kind": "tool_output", "score": NaN}\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import json
+import threading
+import unittest
+from smolagents import FinalAnswerTool
+from smolagents.models import ChatMessage, MessageRole, Model
+
+from matvisor.agent import TracedCodeAgent
+from matvisor.log import Tracer, export_chrome_trace, iter_records
+from matvisor.tools import LoggedTool
+from matvisor.tools.tool_test import AddNumbers
+
+from tests.helpers import LogTestCase
+
+
+class ScriptedModel(Model):
+    """
+    Answers every step with the same code, calling a tool and giving the final answer.
+    """
+
+    def generate(self, messages, stop_sequences=None, **kwargs) -> ChatMessage:
+        content = "Thought: add them.\n<code>\nresult = add_numbers(a=2, b=3)\nfinal_answer(result)\n</code>"
+        return ChatMessage(role=MessageRole.ASSISTANT, content=content)
+
+
+class TestTracer(LogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tracer = Tracer(self.logger)
+
+    def spans(self):
+        return {r["name"]: r for r in iter_records(self.filepath) if r["kind"] == "span"}
+
+    def test_nested_spans(self):
+        with self.tracer.span("run", "run"):
+            with self.tracer.span("step 1", "step", step=1) as step:
+                step.set(note="x")
+                with self.tracer.span("add_numbers", "tool"):
+                    pass
+        spans = self.spans()
+        self.assertIsNone(spans["run"]["parent_id"])
+        self.assertEqual(spans["step 1"]["parent_id"], spans["run"]["span_id"])
+        self.assertEqual(spans["add_numbers"]["parent_id"], spans["step 1"]["span_id"])
+        self.assertEqual({s["trace_id"] for s in spans.values()}, {spans["run"]["trace_id"]})
+        self.assertEqual(spans["step 1"]["attributes"], {"step": 1, "note": "x"})
+        run, tool = spans["run"], spans["add_numbers"]
+        self.assertLessEqual(run["start_ns"], tool["start_ns"])
+        self.assertGreaterEqual(run["end_ns"], tool["end_ns"])
+        self.assertIsNone(self.tracer.current())
+
+    def test_other_thread_falls_back_to_open_step(self):
+        with self.tracer.span("step 1", "step"):
+            with self.tracer.span("llm", "llm"):
+                pass
+
+            def run_tool():
+                with self.tracer.span("tool", "tool"):
+                    pass
+
+            worker = threading.Thread(target=run_tool)
+            worker.start()
+            worker.join()
+        spans = self.spans()
+        self.assertEqual(spans["tool"]["parent_id"], spans["step 1"]["span_id"])
+
+    def test_error_status(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("failing", "tool"):
+                raise ValueError("bad")
+        span = self.spans()["failing"]
+        self.assertEqual(span["status"], "error")
+        self.assertEqual(span["error"], "ValueError: bad")
+
+    def test_agent_run_spans_and_chrome_export(self):
+        """
+        A traced agent run gives run > step > tool spans, exported as Chrome trace events.
+        """
+        tools = [LoggedTool(t, self.logger, tracer=self.tracer) for t in [AddNumbers(), FinalAnswerTool()]]
+        agent = TracedCodeAgent(tools=tools, model=ScriptedModel(), max_steps=2, tracer=self.tracer)
+        self.assertEqual(agent.run("Add 2 and 3."), 5)
+
+        spans = self.spans()
+        self.assertEqual(spans["step 1"]["parent_id"], spans["run"]["span_id"])
+        self.assertEqual(spans["add_numbers"]["parent_id"], spans["step 1"]["span_id"])
+        self.assertEqual(spans["final_answer"]["parent_id"], spans["step 1"]["span_id"])
+
+        out_path = os.path.join(self.temp_dir.name, "trace.json")
+        self.assertEqual(export_chrome_trace(self.filepath, out_path), 4)
+        with open(out_path, "r", encoding="utf-8") as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(events[0]["name"], "run")
+        self.assertEqual({e["ph"] for e in events}, {"X"})
+        self.assertEqual({e["cat"] for e in events}, {"run", "step", "tool"})
+
+
+if __name__ == "__main__":
+    unittest.main()
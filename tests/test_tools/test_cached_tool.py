@@ -0,0 +1,113 @@
+import time
+import unittest
+import pandas as pd
+
+from matvisor.tools import CachedTool, ToolCache, LoggedTool, SearchByMaterial
+from matvisor.tools.tool_test import AddNumbers
+
+from tests.helpers import LogTestCase
+
+
+class CountingAdd(AddNumbers):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.data_version = "v1"
+
+    def cache_fingerprint(self):
+        return self.data_version
+
+    def forward(self, a: float, b: float) -> float:
+        self.calls += 1
+        return a + b
+
+
+class TestCachedTool(LogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.inner = CountingAdd()
+        self.cache = ToolCache(maxsize=2)
+        self.tool = CachedTool(self.inner, self.cache, self.logger)
+
+    def test_repeated_call_hits(self):
+        """
+        Equal arguments, whatever the keyword order, reuse the first result.
+        """
+        self.assertEqual(self.tool(a=2, b=3), 5)
+        self.assertEqual(self.tool(b=3, a=2), 5)
+        self.assertEqual(self.inner.calls, 1)
+        kinds = [r["kind"] for r in self.read_records()]
+        self.assertEqual(kinds, ["tool_cache_miss", "tool_cache_hit"])
+        hit = self.read_records()[1]
+        self.assertEqual(hit["tool"], "add_numbers")
+        self.assertEqual(hit["key"], self.read_records()[0]["key"])
+        self.assertEqual(self.cache.stats()["hit_rate"], 0.5)
+
+    def test_lru_eviction(self):
+        """
+        The least recently used entry is dropped beyond `maxsize`.
+        """
+        self.tool(a=1, b=1)
+        self.tool(a=2, b=2)
+        self.tool(a=1, b=1)  # 1+1 is now the most recent
+        self.tool(a=3, b=3)  # Evicts 2+2
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.tool(a=1, b=1)
+        self.assertEqual(self.inner.calls, 3)
+        self.tool(a=2, b=2)
+        self.assertEqual(self.inner.calls, 4)
+
+    def test_ttl_expiry(self):
+        cache = ToolCache(ttl=0.05)
+        tool = CachedTool(self.inner, cache)
+        tool(a=1, b=2)
+        tool(a=1, b=2)
+        self.assertEqual(self.inner.calls, 1)
+        time.sleep(0.1)
+        tool(a=1, b=2)
+        self.assertEqual(self.inner.calls, 2)
+
+    def test_invalidated_on_data_change(self):
+        """
+        A new fingerprint recomputes results and drops the stale entries.
+        """
+        self.tool(a=1, b=2)
+        self.inner.data_version = "v2"
+        self.tool(a=1, b=2)
+        self.assertEqual(self.inner.calls, 2)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_logged_cached_tool(self):
+        """
+        A LoggedTool around a CachedTool still logs every call.
+        """
+        tool = LoggedTool(self.tool, self.logger)
+        tool(a=2, b=3)
+        tool(a=2, b=3)
+        kinds = [r["kind"] for r in self.read_records()]
+        self.assertEqual(kinds.count("tool_output"), 2)
+        self.assertEqual(kinds.count("tool_cache_hit"), 1)
+
+
+class TestMaterialFingerprint(unittest.TestCase):
+
+    def test_fingerprint_follows_data(self):
+        df = pd.DataFrame({"Material Name": ["Oak", "Pine"], "Density": [0.7, 0.5]})
+        tool = SearchByMaterial(materials_df=df)
+        fingerprint = tool.cache_fingerprint()
+        self.assertEqual(fingerprint, SearchByMaterial(materials_df=df.copy()).cache_fingerprint())
+        tool.materials_df = pd.concat([df, pd.DataFrame({"Material Name": ["Ash"], "Density": [0.6]})])
+        self.assertNotEqual(tool.cache_fingerprint(), fingerprint)
+
+        # Cells edited in place, then invalidated
+        fingerprint = tool.cache_fingerprint()
+        tool.materials_df.iloc[0, 1] = 0.8
+        self.assertEqual(tool.cache_fingerprint(), fingerprint)
+        tool.invalidate()
+        self.assertNotEqual(tool.cache_fingerprint(), fingerprint)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import unittest
+from smolagents import FinalAnswerTool
+
+from matvisor.tools import LoggedTool, OutputBudget
+from matvisor.tools.tool_test import AddNumbers
+
+from tests.helpers import LogTestCase
+
+
+ROWS = [
+    {
+        "Material Name": f"Terrazzoplatta {i}",
+        "Plant Address": "Via Prealpi, 21, 37023 Stallavena-lugo VR, Italy",
+        "Service life (years)": None,
+        "Recycled content (%)": float("nan"),
+        "Cost per ft2": "",
+    }
+    for i in range(10)
+]
+
+
+class RowsTool(AddNumbers):
+    output_type = "any"
+
+    def forward(self, a: float, b: float) -> str:
+        return json.dumps(ROWS[:int(a + b)], indent=2)
+
+
+class TestOutputBudget(unittest.TestCase):
+
+    def test_compact_without_nulls(self):
+        text, info = OutputBudget(max_tokens=10000).apply(json.dumps(ROWS[:2], indent=2))
+        self.assertEqual(json.loads(text), [
+            {"Material Name": "Terrazzoplatta 0", "Plant Address": ROWS[0]["Plant Address"]},
+            {"Material Name": "Terrazzoplatta 1", "Plant Address": ROWS[1]["Plant Address"]},
+        ])
+        self.assertNotIn("\n", text)
+        self.assertFalse(info["truncated"])
+        self.assertLess(info["kept_tokens"], info["tokens"])
+
+    def test_max_rows(self):
+        text, info = OutputBudget(max_tokens=10000, max_rows=3).apply(json.dumps(ROWS))
+        shown = json.loads(text)
+        self.assertEqual(len(shown["rows"]), 3)
+        self.assertEqual((shown["shown"], shown["total"], shown["truncated"]), (3, 10, True))
+        self.assertEqual(info["note"], "Showing 3 of 10 rows to fit the output budget.")
+        self.assertEqual((info["rows"], info["kept_rows"]), (10, 3))
+
+    def test_rows_cut_to_token_budget(self):
+        budget = OutputBudget(max_tokens=60, max_rows=None)
+        text, info = budget.apply(json.dumps(ROWS))
+        self.assertLessEqual(budget.count_tokens(text), 60)
+        self.assertEqual(len(json.loads(text)["rows"]), info["kept_rows"])
+        self.assertGreaterEqual(info["kept_rows"], 1)
+        self.assertLess(info["kept_rows"], 10)
+        self.assertTrue(info["truncated"])
+
+    def test_plain_text_cut(self):
+        budget = OutputBudget(max_tokens=10, count_tokens=lambda text: len(text.split()))
+        text, info = budget.apply(" ".join(["word"] * 50))
+        self.assertTrue(text.endswith("(Output was cut to fit the output budget.)"))
+        self.assertEqual(info["tokens"], 50)
+        self.assertEqual(budget.apply("short text"), ("short text", None))
+
+    def test_long_values_cut(self):
+        budget = OutputBudget(max_tokens=30)
+        text, info = budget.apply(json.dumps({"Material Name": "Oak", "Description": "x" * 500}))
+        value = json.loads(text)
+        self.assertEqual(value["Material Name"], "Oak")
+        self.assertTrue(value["Description"].endswith("…"))
+        self.assertLessEqual(budget.count_tokens(text), 30)
+        self.assertEqual(info["note"], "Long values were cut to fit the output budget.")
+
+    def test_lists_and_dicts_keep_their_type(self):
+        budget = OutputBudget(max_tokens=10000, max_rows=2)
+        rows, _ = budget.apply(ROWS)
+        self.assertEqual((rows["shown"], rows["total"]), (2, 10))
+        row, _ = budget.apply(ROWS[0])
+        self.assertEqual(row, {"Material Name": "Terrazzoplatta 0", "Plant Address": ROWS[0]["Plant Address"]})
+
+    def test_other_outputs_unchanged(self):
+        self.assertEqual(OutputBudget().apply(5), (5, None))
+
+
+class TestLoggedToolBudget(LogTestCase):
+
+    def test_budget_applied_and_logged(self):
+        tool = LoggedTool(RowsTool(), self.logger, output_budget=OutputBudget(max_rows=2))
+        result = tool(4, 4)
+        # Agent code can still parse the result
+        shown = json.loads(result)
+        self.assertEqual((len(shown["rows"]), shown["total"]), (2, 8))
+        output = self.read_records()[-1]
+        self.assertEqual(output["output"], result)
+        self.assertEqual(output["budget"]["kept_rows"], 2)
+        self.assertEqual(output["budget"]["note"], "Showing 2 of 8 rows to fit the output budget.")
+
+    def test_final_answer_unchanged(self):
+        tool = LoggedTool(FinalAnswerTool(), self.logger, output_budget=OutputBudget(max_tokens=5, max_rows=2))
+        answer = {"materials": ROWS[:4]}
+        self.assertIs(tool(answer), answer)
+
+
+if __name__ == "__main__":
+    unittest.main()
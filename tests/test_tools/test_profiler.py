@@ -0,0 +1,63 @@
+import unittest
+
+from matvisor.tools import LoggedTool, ToolProfiler
+from matvisor.tools.profiler import percentile
+from matvisor.tools.tool_test import AddNumbers
+
+from tests.helpers import LogTestCase
+
+
+class TestToolProfiling(LogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.profiler = ToolProfiler()
+        self.tool = LoggedTool(AddNumbers(), self.logger, profiler=self.profiler, trace_memory=True)
+
+    def test_call_timings_logged(self):
+        """
+        Each tool_output record carries nanosecond wall/CPU time and peak memory.
+        """
+        self.assertEqual(self.tool(2, 3), 5)
+        output = self.read_records()[-1]
+        self.assertEqual(output["kind"], "tool_output")
+        self.assertIsInstance(output["wall_ns"], int)
+        self.assertIsInstance(output["cpu_ns"], int)
+        self.assertIn("peak_memory", output)
+        self.assertAlmostEqual(output["duration"], output["wall_ns"] / 1e9)
+
+    def test_profile_summary(self):
+        """
+        The profiler aggregates calls per tool and logs a tool_profile record.
+        """
+        for i in range(20):
+            self.tool(i, 1)
+        summary = self.profiler.dump(self.logger, reset=True)
+        stats = summary["add_numbers"]
+        self.assertEqual(stats["calls"], 20)
+        self.assertLessEqual(stats["wall_ms"]["p50"], stats["wall_ms"]["p95"])
+        self.assertLessEqual(stats["wall_ms"]["p95"], stats["wall_ms"]["p99"])
+        self.assertEqual(self.read_records()[-1]["kind"], "tool_profile")
+        self.assertEqual(self.profiler.summary(), {})
+
+
+    def test_nearest_rank_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, q) for q in (50, 95, 99, 100)], [50, 95, 99, 100])
+        values = list(range(1, 11))
+        self.assertEqual([percentile(values, q) for q in (50, 95, 99)], [5, 10, 10])
+        self.assertEqual(percentile([7], 50), 7)
+
+    def test_min_max_cover_all_calls(self):
+        """
+        Minimum and maximum are exact even when only a sample of the calls is kept.
+        """
+        profiler = ToolProfiler(max_samples=5)
+        for ms in range(1, 1001):
+            profiler.record("tool", ms * 1_000_000, ms * 1_000_000)
+        stats = profiler.summary()["tool"]["wall_ms"]
+        self.assertEqual((stats["min"], stats["max"]), (1, 1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
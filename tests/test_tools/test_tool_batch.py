@@ -0,0 +1,104 @@
+import time
+import asyncio
+import unittest
+
+from smolagents.local_python_executor import LocalPythonExecutor
+
+from matvisor.tools import LoggedTool, CachedTool, BatchTool
+from matvisor.tools.tool_test import AddNumbers
+
+from tests.helpers import LogTestCase
+
+
+class SlowAdd(AddNumbers):
+    thread_safe = True
+
+    def forward(self, a: float, b: float) -> float:
+        time.sleep(0.2)
+        return a + b
+
+
+class FailingAdd(AddNumbers):
+    thread_safe = True
+
+    def forward(self, a: float, b: float) -> float:
+        if a < 0:
+            raise ValueError("negative")
+        return a + b
+
+
+class TestToolBatch(LogTestCase):
+
+    def test_parallel_batch(self):
+        """
+        Calls of a thread-safe tool overlap, and keep their order in the results.
+        """
+        tool = LoggedTool(SlowAdd(), self.logger)
+        start = time.perf_counter()
+        results = tool.batch([{"a": 1, "b": 1}, (2, 2), {"a": 3, "b": 3}, {"a": 4, "b": 4}])
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(results, [2, 4, 6, 8])
+
+        records = self.read_records()
+        batch = records[-1]
+        self.assertEqual(batch["kind"], "tool_batch")
+        self.assertEqual(batch["calls"], 4)
+        self.assertTrue(batch["parallel"])
+        calls = [r for r in records if r["kind"] in ("tool_input", "tool_output")]
+        self.assertEqual(len(calls), 8)
+        self.assertEqual({r["batch_id"] for r in calls}, {batch["batch_id"]})
+
+    def test_sequential_batch(self):
+        tool = LoggedTool(AddNumbers(), self.logger)
+        self.assertEqual(tool.batch([(1, 2), (3, 4)]), [3, 7])
+        self.assertFalse(self.read_records()[-1]["parallel"])
+
+    def test_single_calls_have_no_batch_id(self):
+        tool = LoggedTool(SlowAdd(), self.logger)
+        tool.batch([(1, 1)])
+        tool(1, 1)
+        self.assertNotIn("batch_id", self.read_records()[-1])
+
+    def test_batch_error(self):
+        tool = LoggedTool(FailingAdd(), self.logger)
+        with self.assertRaises(ValueError):
+            tool.batch([(1, 1), (-1, 1)])
+
+    def test_futures_and_async(self):
+        tool = LoggedTool(SlowAdd(), self.logger)
+        self.assertEqual(tool.submit(a=1, b=2).result(), 3)
+
+        async def gather():
+            return await asyncio.gather(tool.acall(1, 2), tool.acall(3, 4))
+
+        self.assertEqual(asyncio.run(gather()), [3, 7])
+
+    def test_batch_tool_in_agent_code(self):
+        """
+        Agent code runs a batch through the `<name>_batch` tool.
+        """
+        tool = LoggedTool(SlowAdd(), self.logger)
+        batch_tool = BatchTool(tool)
+        self.assertEqual(batch_tool.name, "add_numbers_batch")
+        executor = LocalPythonExecutor(additional_authorized_imports=[])
+        executor.send_tools({tool.name: tool, batch_tool.name: batch_tool})
+        output = executor('add_numbers_batch(calls=[{"a": 1, "b": 2}, {"a": 3, "b": 4}])')
+        self.assertEqual(output.output, [3, 7])
+
+    def test_parallel_calls_have_no_peak_memory(self):
+        """
+        tracemalloc's peak is process-wide, so it is only kept for calls that ran alone.
+        """
+        tool = LoggedTool(SlowAdd(), self.logger, trace_memory=True)
+        tool.batch([(1, 1), (2, 2), (3, 3)])
+        tool(4, 4)
+        outputs = [r for r in self.read_records() if r["kind"] == "tool_output"]
+        self.assertEqual([r["peak_memory"] for r in outputs[:3]], [None] * 3)
+        self.assertIsInstance(outputs[3]["peak_memory"], int)
+
+    def test_cached_tool_stays_thread_safe(self):
+        self.assertTrue(LoggedTool(CachedTool(SlowAdd())).thread_safe)
+
+
+if __name__ == "__main__":
+    unittest.main()
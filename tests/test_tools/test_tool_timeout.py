@@ -0,0 +1,63 @@
+import time
+import unittest
+import threading
+
+from matvisor.tools import LoggedTool
+from matvisor.tools.tool_test import AddNumbers
+
+from tests.helpers import LogTestCase
+
+
+class SlowAdd(AddNumbers):
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.done = threading.Event()
+
+    def forward(self, a: float, b: float) -> float:
+        time.sleep(self.delay)
+        self.done.set()
+        return a + b
+
+
+class FailingAdd(AddNumbers):
+
+    def forward(self, a: float, b: float) -> float:
+        raise ValueError("bad input")
+
+
+class TestToolTimeout(LogTestCase):
+
+    def test_fast_call_returns_result(self):
+        tool = LoggedTool(AddNumbers(), self.logger, timeout=5)
+        self.assertEqual(tool(2, 3), 5)
+        self.assertEqual([r["kind"] for r in self.read_records()], ["tool_input", "tool_output"])
+
+    def test_slow_call_times_out(self):
+        """
+        A call beyond the timeout returns a timeout observation without waiting for the tool.
+        """
+        inner = SlowAdd(delay=1.0)
+        tool = LoggedTool(inner, self.logger, timeout=0.1)
+        start = time.perf_counter()
+        result = tool(2, 3)
+        self.assertLess(time.perf_counter() - start, 0.9)
+        self.assertEqual(result["error"], "timeout")
+        self.assertEqual(result["tool"], "add_numbers")
+        self.assertEqual(tool.timeouts, 1)
+
+        records = self.read_records()
+        self.assertEqual([r["kind"] for r in records], ["tool_input", "tool_timeout", "tool_output"])
+        self.assertEqual(records[1]["timeout"], 0.1)
+        self.assertEqual(records[2]["output"], result)
+        inner.done.wait(5)  # Let the abandoned call finish before cleanup
+
+    def test_exception_propagates(self):
+        tool = LoggedTool(FailingAdd(), self.logger, timeout=5)
+        with self.assertRaises(ValueError):
+            tool(2, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()